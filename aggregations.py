@@ -0,0 +1,156 @@
+"""
+Módulo de agregaciones del dashboard
+Calcula las métricas de las páginas a partir del DataFrame de vulnerabilidades
+"""
+
+import numpy as np
+import pandas as pd
+
+from tenable_importer import SEVERITIES
+
+SEVERITY_LABELS = {
+    'Critical': 'Crítica',
+    'High': 'Alta',
+    'Medium': 'Media',
+    'Low': 'Baja',
+    'Info': 'Información'
+}
+
+ASSET_TYPES = ['Servidores', 'Workstations', 'Network', 'Cloud', 'IoT']
+
+# Reglas por hostname/sistema operativo, en orden; sin coincidencia -> Servidores
+_ASSET_TYPE_RULES = [
+    ('Network', r'(?i)\b(?:rtr|router|sw|switch|fw|firewall|vpn|gateway)\b|cisco|juniper|fortinet|palo alto'),
+    ('Cloud', r'(?i)\b(?:aws|azure|gcp|ec2|cloud)\b'),
+    ('IoT', r'(?i)\b(?:iot|cam|camera|printer|sensor|plc)\b'),
+    ('Workstations', r'(?i)windows (?:7|8|10|11)\b|mac ?os|\b(?:ws|pc|desktop|laptop)\b')
+]
+
+
+def date_days(values):
+    """Convierte una columna de fechas (texto, categórica o datetime64) en días desde 1970
+
+    Las fechas se repiten mucho, así que solo se interpretan los valores distintos.
+    Las fechas nulas o inválidas quedan como -1.
+    """
+    codes, uniques = pd.factorize(pd.Series(values))
+    parsed = pd.to_datetime(pd.Series(uniques), errors='coerce')
+    days = ((parsed - pd.Timestamp('1970-01-01')) // pd.Timedelta(days=1)).fillna(-1).to_numpy(dtype=np.int64)
+    return np.append(days, -1)[codes]
+
+
+def asset_types(assets):
+    """Tipo de cada activo (ver ASSET_TYPES) deducido de su hostname y sistema operativo"""
+    text = assets['hostname'].astype(object).fillna('') + ' ' + assets['os'].astype(object).fillna('')
+    text = text.astype(str).str.replace(r'[-_.]', ' ', regex=True)
+    codes, uniques = pd.factorize(text)
+    uniques = pd.Series(uniques)
+    types = pd.Series(ASSET_TYPES[0], index=uniques.index)
+    for asset_type, pattern in reversed(_ASSET_TYPE_RULES):
+        types[uniques.str.contains(pattern)] = asset_type
+    return pd.Series(types.to_numpy()[codes], index=assets.index)
+
+
+def asset_summary(data):
+    """Tabla de detalle por activo (mismo orden que data['assets'])
+
+    Cuenta los hallazgos abiertos de cada activo y, entre ellos, los críticos
+    y los altos; el estado se deriva de esos recuentos.
+    """
+
+    assets = data['assets']
+    vulns = data['vulnerabilities']
+
+    asset_codes, asset_ids = pd.factorize(assets['asset_id'].astype(str))
+    vuln_codes = pd.Index(asset_ids).get_indexer(vulns['asset_id'].astype(str))
+    severity = severity_codes(vulns['severity'])
+    is_open = ~vulns['remediated'].to_numpy(dtype=bool) & (vuln_codes >= 0)
+
+    def count(mask):
+        return np.bincount(vuln_codes[mask], minlength=len(asset_ids))[asset_codes]
+
+    total = count(is_open)
+    critical = count(is_open & (severity == SEVERITIES.index('Critical')))
+    high = count(is_open & (severity == SEVERITIES.index('High')))
+
+    return pd.DataFrame({
+        'IP': assets['ip_address'].to_numpy(),
+        'Hostname': assets['hostname'].to_numpy(),
+        'Vulns': total,
+        'Críticas': critical,
+        'Altas': high,
+        'Último Scan': assets['last_scanned'].astype(str).str[:10].to_numpy(),
+        'Estado': np.select([critical > 0, high > 0], ['🔴 Crítico', '🟡 Riesgo'], '🟢 Seguro')
+    })
+
+
+def severity_codes(values):
+    """Posición de cada severidad en SEVERITIES (-1 si no es reconocida)"""
+    codes, uniques = pd.factorize(pd.Series(values))
+    lookup = np.array([SEVERITIES.index(u) if u in SEVERITIES else -1 for u in uniques] + [-1])
+    return lookup[codes]
+
+
+def compute_metrics(data, reference_date=None):
+    """Métricas agregadas de un escaneo (totales, severidades, deltas y MTTR)
+
+    Las ventanas semanales y mensuales se cuentan hacia atrás desde
+    reference_date (por defecto la fecha de descubrimiento más reciente).
+    El MTTR se aproxima como la antigüedad media de los hallazgos remediados
+    en la fecha de referencia, porque las exportaciones no incluyen la fecha
+    de corrección.
+    """
+
+    vulns = data['vulnerabilities']
+    days = date_days(vulns['discovery_date'])
+    severity = severity_codes(vulns['severity'])
+    remediated = vulns['remediated'].to_numpy(dtype=bool)
+    is_open = ~remediated
+
+    known = days >= 0
+    if reference_date is not None:
+        today = int(date_days([reference_date])[0])
+    else:
+        today = int(days[known].max()) if known.any() else 0
+    age = today - days
+
+    def window(start, end):
+        return known & (age >= start) & (age < end)
+
+    this_week, last_week = window(0, 7), window(7, 14)
+    this_month, last_month = window(0, 30), window(30, 60)
+
+    n_sev = len(SEVERITIES)
+    open_by_severity = np.bincount(severity[is_open & (severity >= 0)], minlength=n_sev)
+    week_by_severity = np.bincount(severity[this_week & (severity >= 0)], minlength=n_sev)
+    prev_week_by_severity = np.bincount(severity[last_week & (severity >= 0)], minlength=n_sev)
+
+    # Activos nuevos: su primer hallazgo cae dentro de la última semana
+    asset_codes, asset_ids = pd.factorize(pd.Series(vulns['asset_id']))
+    first_seen = pd.Series(np.where(known, days, np.iinfo(np.int64).max)).groupby(asset_codes).min()
+    affected = np.bincount(asset_codes[is_open & (asset_codes >= 0)], minlength=len(asset_ids)) > 0
+
+    return {
+        'reference_date': str(pd.Timestamp('1970-01-01') + pd.Timedelta(days=today))[:10],
+        'total_assets': int(len(data['assets'])),
+        'new_assets_week': int((today - first_seen < 7).sum()),
+        'total_findings': int(len(vulns)),
+        'open_findings': int(is_open.sum()),
+        'affected_assets': int(affected.sum()),
+        'severity_counts': dict(zip(SEVERITIES, open_by_severity.tolist())),
+        'severity_week_delta': dict(zip(SEVERITIES, (week_by_severity - prev_week_by_severity).tolist())),
+        'new_findings_week': int(this_week.sum()),
+        'new_findings_week_delta': int(this_week.sum() - last_week.sum()),
+        'week_over_week_pct': _pct_change(this_week.sum(), last_week.sum()),
+        'month_over_month_pct': _pct_change(this_month.sum(), last_month.sum()),
+        'mttr_days': _mean(age[remediated & known]),
+        'mean_open_age_days': _mean(age[is_open & known])
+    }
+
+
+def _pct_change(current, previous):
+    return float((current - previous) / previous * 100) if previous else 0.0
+
+
+def _mean(values):
+    return float(values.mean()) if len(values) else 0.0
@@ -1,14 +1,61 @@
 import streamlit as st
 import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
 from datetime import datetime, timedelta
-import numpy as np
 import json
-import time
 import io
 from pathlib import Path
 
+from charts import (
+    asset_type_figure,
+    cumulative_trend_figure,
+    daily_trend_figure,
+    monthly_trend_figure,
+    segment_scatter_figure,
+    severity_figure,
+    show_figure,
+)
+from aggregations import SEVERITY_LABELS
+from asset_table import PAGE_SIZES, AssetTable
+from data_layer import (
+    DATA_STORE_DIR,
+    dataset_version,
+    load_asset_findings,
+    load_asset_search_index,
+    load_asset_table,
+    load_database,
+    load_dataset,
+    load_filtered_findings,
+    load_filtered_metrics,
+    load_job_runner,
+    load_memory_report,
+    load_metrics,
+    load_segment_index,
+    load_segment_metrics,
+    load_segments,
+    load_top_cves,
+)
+from jobs import JOB_STATUSES, api_job, import_file_job, import_files_job, report_job, sync_job
+from sync_daemon import (
+    SYNC_FREQUENCIES,
+    api_configured,
+    daemon_status,
+    last_run,
+    load_config,
+    next_run,
+    read_history,
+    save_config,
+)
+from tenable_api import TenableApiError
+from tenable_importer import TenableDataImporter
+
+NVD_FEED_DIR = "./nvd_feeds"
+SEGMENT_LIMIT = 20
+TOP_CVES = 10
+FILTERED_FINDINGS = 1000
+TREND_MONTHS = 12
+JOB_POLL_SECONDS = 1
+IMPORT_LIST_LIMIT = 20
+
 # ========== CONFIGURACIÓN INICIAL ==========
 st.set_page_config(
     page_title="Defense Center - Security Dashboard",
@@ -188,44 +235,16 @@ st.markdown("""
 if 'current_page' not in st.session_state:
     st.session_state.current_page = "inicio"
 
-if 'tenable_data' not in st.session_state:
-    st.session_state.tenable_data = None
+# Trabajos en segundo plano lanzados desde esta sesión (ids del registro compartido)
+if 'jobs' not in st.session_state:
+    st.session_state.jobs = []
+    st.session_state.jobs_seen = set()
 
-if 'imported_files' not in st.session_state:
-    st.session_state.imported_files = []
+# Versión de los datos fijada para toda la ejecución: todas las páginas y
+# gráficos leen la misma instantánea aunque un import termine a mitad
+data_version = dataset_version()
 
 # ========== FUNCIONES AUXILIARES ==========
-def generate_vulnerability_data():
-    """Genera datos simulados de vulnerabilidades"""
-    np.random.seed(42)
-    
-    # Datos de tendencias
-    months = ['Ene', 'Feb', 'Mar', 'Abr', 'May', 'Jun']
-    vulnerabilities = [2800, 2540, 2529, 3240, 3100, 3350]
-    
-    # Top vulnerabilidades
-    top_vulns = [
-        {'name': 'CVE-2024-1234: Apache 2.4.x < 2.4.55', 'count': 310, 'severity': 'Alta', 'cvss': 8.5},
-        {'name': 'CVE-2023-4567: IP Forwarding Enabled', 'count': 307, 'severity': 'Media', 'cvss': 6.5},
-        {'name': 'CVE-2023-7890: DCOM Services Enum', 'count': 760, 'severity': 'Alta', 'cvss': 7.8},
-        {'name': 'CVE-2024-5678: SSL/TLS Weak Ciphers', 'count': 215, 'severity': 'Media', 'cvss': 5.9},
-        {'name': 'CVE-2024-3456: Default Credentials', 'count': 189, 'severity': 'Crítica', 'cvss': 9.8}
-    ]
-    
-    # Activos críticos
-    critical_assets = [
-        {'ip': '172.22.134.12', 'hostname': 'SRV-DB-PROD-01', 'vulns': 81, 'last_seen': '2024-04-15'},
-        {'ip': '172.22.134.51', 'hostname': 'SRV-WEB-01', 'vulns': 72, 'last_seen': '2024-04-14'},
-        {'ip': '172.22.114.12', 'hostname': 'WS-ADMIN-45', 'vulns': 58, 'last_seen': '2024-04-10'},
-        {'ip': '172.22.111.14', 'hostname': 'SRV-FILE-02', 'vulns': 53, 'last_seen': '2024-04-12'}
-    ]
-    
-    return {
-        'trends': {'months': months, 'vulnerabilities': vulnerabilities},
-        'top_vulnerabilities': top_vulns,
-        'critical_assets': critical_assets
-    }
-
 def simulate_tenable_scan():
     """Simula un escaneo de Tenable"""
     import random
@@ -246,6 +265,121 @@ def simulate_tenable_scan():
     
     return assets
 
+def mostrar_trabajos(kinds):
+    """Progreso y resultados de los trabajos de la sesión de los tipos indicados
+
+    Mientras alguno sigue en curso el panel se refresca solo, sin re-ejecutar
+    el resto de la página.
+    """
+    kinds = [kinds] if isinstance(kinds, str) else kinds
+    runner = load_job_runner()
+    jobs = [runner.get(job_id) for job_id in st.session_state.jobs]
+    jobs = [job for job in jobs if job is not None and job.kind in kinds]
+    if not jobs:
+        return
+    active = any(not job.finished for job in jobs)
+    st.fragment(run_every=JOB_POLL_SECONDS if active else None)(_panel_trabajos)(kinds)
+
+
+def _panel_trabajos(kinds):
+    runner = load_job_runner()
+    jobs = [runner.get(job_id) for job_id in reversed(st.session_state.jobs)]
+    jobs = [job for job in jobs if job is not None and job.kind in kinds]
+    
+    st.markdown("#### ⚙️ Trabajos en segundo plano")
+    for job in jobs:
+        st.progress(job.progress, text=f"{JOB_STATUSES[job.status]} · {job.description}"
+                                       + (f" · {job.message}" if job.status == 'running' and job.message else ""))
+        if job.status == 'failed':
+            st.error(f"❌ {job.description}: {job.error}")
+        elif job.status == 'done':
+            mostrar_resultado(job)
+    
+    # Al terminar todos, una última ejecución completa refresca las métricas de la página
+    if any(job.finished and job.id not in st.session_state.jobs_seen for job in jobs):
+        st.session_state.jobs_seen.update(job.id for job in jobs if job.finished)
+        if all(job.finished for job in jobs):
+            st.rerun()
+
+
+def mostrar_resultado(job):
+    """Resumen del resultado de un trabajo terminado"""
+    result = job.result
+    if job.kind == 'import':
+        stats_col1, stats_col2, stats_col3, stats_col4 = st.columns(4)
+        with stats_col1:
+            st.metric("Registros importados", f"{result['records']:,}")
+        with stats_col2:
+            st.metric("Vulnerabilidades únicas", f"{result['unique_cves']:,}")
+        with stats_col3:
+            st.metric("Activos nuevos", f"{result['new_assets']:,}")
+        with stats_col4:
+            st.metric("Críticas detectadas", f"{result['critical_count']:,}")
+        
+        cve_stats = result['cve_stats']
+        if result['validate_cves'] and cve_stats is None:
+            st.warning(f"⚠️ No hay feeds de NVD en {NVD_FEED_DIR}: se omitió la validación de CVE")
+        elif cve_stats is not None:
+            st.caption(
+                f"🛡️ CVE validadas: {cve_stats['valid']:,} de {cve_stats['checked']:,} | "
+                f"Desconocidas: {cve_stats['unknown']:,} | CVSS actualizados: {cve_stats['cvss_updated']:,}"
+            )
+        
+        if result['duplicates_dropped'] is not None:
+            st.caption(f"🧹 Duplicados eliminados: {result['duplicates_dropped']:,}")
+        
+        if 'files' in result:
+            st.caption(f"⚡ {len(result['files'])} archivos leídos en {result['parse_s']:.1f}s con "
+                       f"{result['workers']} procesos ({result['rows_per_s'] or 0:,.0f} registros/s)")
+            st.dataframe(
+                pd.DataFrame([{
+                    "Archivo": f['filename'],
+                    "Tamaño (MB)": round(f['bytes'] / 1024 / 1024, 2),
+                    "Registros": f['records'],
+                    "Segundos": f['seconds'],
+                    "Registros/s": f['rows_per_s'],
+                    "MB/s": round(f['bytes_per_s'] / 1024 / 1024, 2) if f['bytes_per_s'] else None
+                } for f in result['files']]),
+                use_container_width=True,
+                hide_index=True
+            )
+    
+    stored = result.get('stored') if isinstance(result, dict) else None
+    if stored and 'new' in stored:
+        delta_col1, delta_col2, delta_col3, delta_col4 = st.columns(4)
+        with delta_col1:
+            st.metric("Hallazgos nuevos", f"{stored['new']:,}")
+        with delta_col2:
+            st.metric("Cambios de estado", f"{stored['updated']:,}")
+        with delta_col3:
+            st.metric("Sin cambios", f"{stored['unchanged']:,}")
+        with delta_col4:
+            st.metric("Remediados", f"{stored['remediated']:,}")
+    
+    if job.kind == 'api':
+        stats = result['api_stats']
+        st.caption(
+            f"🔗 {stats['requests']:,} peticiones ({stats['requests_per_s']:.1f}/s) | "
+            f"{stats['bytes'] / 1024 / 1024:,.1f} MB ({stats['bytes_per_s'] / 1024 / 1024:.1f} MB/s) | "
+            f"Respuestas 429: {stats['throttled_responses']:,} | En espera: {stats['throttled_s']:.1f}s | "
+            f"Concurrencia: {stats['concurrency']} (máx. {stats['peak_concurrency']})"
+        )
+    
+    if job.kind == 'sync':
+        run = result['run']
+        st.caption(
+            f"🔄 {run['rows']:,} registros en {run['duration_s']:.1f}s ({run['rows_per_s'] or 0:,.0f}/s) | "
+            f"Nuevos: {run['new']:,} | Remediados: {run['remediated']:,} | "
+            f"Particiones eliminadas: {len(run['partitions_dropped'])}"
+        )
+    
+    if job.kind == 'report':
+        report = result['report']
+        st.caption(
+            f"📄 {result['vulnerabilities_file']} | Hallazgos: {report['summary']['total_vulnerabilities']:,} | "
+            f"Tasa de remediación: {report['summary']['remediation_rate']}"
+        )
+
 # ========== PÁGINAS ==========
 def pagina_inicio():
     """Página de inicio del dashboard"""
@@ -257,52 +391,60 @@ def pagina_inicio():
         st.info("📊 **Estado del Sistema**: Todos los servicios operativos | Último escaneo: Hace 2 horas")
     
     with col2:
+        # Importa los hallazgos de Tenable con la conexión de la sincronización automática
         if st.button("🔄 Ejecutar Escaneo", use_container_width=True):
-            with st.spinner("Ejecutando escaneo..."):
-                time.sleep(2)
-                st.success("Escaneo completado exitosamente")
-                st.rerun()
+            if api_configured(load_config(DATA_STORE_DIR)):
+                job = load_job_runner().submit('sync', "Escaneo de activos", sync_job, DATA_STORE_DIR)
+                st.session_state.jobs.append(job.id)
+            else:
+                st.warning("⚠️ Configura la URL y las claves de Tenable en Importar Datos → Sincronización Automática")
     
     with col3:
         if st.button("📊 Generar Reporte", use_container_width=True):
-            st.success("Reporte generado y enviado a los administradores")
+            job = load_job_runner().submit('report', "Reporte de vulnerabilidades", report_job,
+                                           load_dataset(data_version))
+            st.session_state.jobs.append(job.id)
+    
+    mostrar_trabajos(['sync', 'report'])
     
     # Métricas principales
     st.subheader("📈 Métricas Clave")
+    metrics = load_metrics(data_version)
     col1, col2, col3, col4 = st.columns(4)
     
     with col1:
-        st.markdown("""
+        st.markdown(f"""
         <div class='metric-card'>
             <div style='font-size: 0.9em; color: #BFDBFE;'>Total Activos</div>
-            <div style='font-size: 2.5em; font-weight: bold;'>489</div>
-            <div style='font-size: 0.8em; color: #BFDBFE;'>↗️ +12 esta semana</div>
+            <div style='font-size: 2.5em; font-weight: bold;'>{metrics['total_assets']:,}</div>
+            <div style='font-size: 0.8em; color: #BFDBFE;'>↗️ +{metrics['new_assets_week']:,} esta semana</div>
         </div>
         """, unsafe_allow_html=True)
     
     with col2:
-        st.markdown("""
+        trend = "↗️" if metrics['month_over_month_pct'] > 0 else "↘️"
+        st.markdown(f"""
         <div class='metric-card'>
             <div style='font-size: 0.9em; color: #BFDBFE;'>Vulnerabilidades</div>
-            <div style='font-size: 2.5em; font-weight: bold;'>3,240</div>
-            <div style='font-size: 0.8em; color: #BFDBFE;'>↘️ -5% vs mes anterior</div>
+            <div style='font-size: 2.5em; font-weight: bold;'>{metrics['open_findings']:,}</div>
+            <div style='font-size: 0.8em; color: #BFDBFE;'>{trend} {metrics['month_over_month_pct']:+.0f}% vs mes anterior</div>
         </div>
         """, unsafe_allow_html=True)
     
     with col3:
-        st.markdown("""
+        st.markdown(f"""
         <div class='metric-card critical'>
             <div style='font-size: 0.9em; color: #FECACA;'>Críticas</div>
-            <div style='font-size: 2.5em; font-weight: bold;'>5</div>
+            <div style='font-size: 2.5em; font-weight: bold;'>{metrics['severity_counts']['Critical']:,}</div>
             <div style='font-size: 0.8em; color: #FECACA;'>⚠️ Requieren atención inmediata</div>
         </div>
         """, unsafe_allow_html=True)
     
     with col4:
-        st.markdown("""
+        st.markdown(f"""
         <div class='metric-card high'>
             <div style='font-size: 0.9em; color: #FED7AA;'>Altas</div>
-            <div style='font-size: 2.5em; font-weight: bold;'>24</div>
+            <div style='font-size: 2.5em; font-weight: bold;'>{metrics['severity_counts']['High']:,}</div>
             <div style='font-size: 0.8em; color: #FED7AA;'>📅 Remediar en 72 horas</div>
         </div>
         """, unsafe_allow_html=True)
@@ -313,56 +455,11 @@ def pagina_inicio():
     
     with col_chart1:
         st.subheader("📊 Tendencias Mensuales")
-        data = generate_vulnerability_data()
-        
-        fig = go.Figure()
-        fig.add_trace(go.Scatter(
-            x=data['trends']['months'],
-            y=data['trends']['vulnerabilities'],
-            mode='lines+markers',
-            line=dict(color='#3B82F6', width=4),
-            marker=dict(size=10, color='#1E40AF'),
-            fill='tozeroy',
-            fillcolor='rgba(59, 130, 246, 0.1)'
-        ))
-        
-        fig.update_layout(
-            height=300,
-            plot_bgcolor='rgba(0,0,0,0)',
-            paper_bgcolor='rgba(0,0,0,0)',
-            margin=dict(t=30, b=30),
-            hovermode='x unified'
-        )
-        
-        st.plotly_chart(fig, use_container_width=True)
+        show_figure(monthly_trend_figure(data_version, TREND_MONTHS))
     
     with col_chart2:
         st.subheader("🎯 Distribución por Tipo")
-        
-        types = ['Servidores', 'Workstations', 'Dispositivos de Red', 'IoT', 'Cloud']
-        counts = [45, 30, 15, 7, 3]
-        
-        fig = px.pie(
-            values=counts,
-            names=types,
-            color_discrete_sequence=px.colors.sequential.Blues_r,
-            hole=0.4
-        )
-        
-        fig.update_traces(
-            textposition='inside',
-            textinfo='percent+label',
-            hoverinfo='label+percent',
-            marker=dict(line=dict(color='#1E293B', width=2))
-        )
-        
-        fig.update_layout(
-            height=300,
-            showlegend=False,
-            margin=dict(t=0, b=0)
-        )
-        
-        st.plotly_chart(fig, use_container_width=True)
+        show_figure(asset_type_figure(data_version))
     
     # Alertas recientes
     st.subheader("🚨 Alertas Recientes")
@@ -425,12 +522,30 @@ def pagina_detalle():
     
     metric_cols = st.columns(5)
     
+    # El selector de fechas devuelve una tupla parcial mientras se elige el rango
+    dates = list(date_range) if isinstance(date_range, (list, tuple)) else [date_range]
+    start_date = dates[0] if dates else None
+    end_date = dates[1] if len(dates) > 1 else None
+    severity_keys = {label: sev for sev, label in SEVERITY_LABELS.items()}
+    filters = dict(
+        start_date=start_date,
+        end_date=end_date,
+        severities=tuple(severity_keys[label] for label in severity_filter),
+        asset_types=tuple(asset_type),
+        min_cvss=cvss_score
+    )
+    stats = load_filtered_metrics(data_version, **filters)
+    severity_counts = stats['severity_counts']
+    severity_delta = stats['severity_week_delta']
+    
+    st.caption(f"{stats['total_findings']:,} hallazgos cumplen los filtros")
+    
     metrics = [
-        {"label": "Total", "value": "3,240", "delta": "+12%", "class": ""},
-        {"label": "Críticas", "value": "5", "delta": "-2", "class": "critical"},
-        {"label": "Altas", "value": "24", "delta": "+3", "class": "high"},
-        {"label": "Medias", "value": "189", "delta": "+15", "class": "medium"},
-        {"label": "Tiempo Promedio", "value": "45d", "delta": "-5d", "class": ""}
+        {"label": "Total", "value": f"{stats['open_findings']:,}", "delta": f"{stats['week_over_week_pct']:+.0f}%", "class": ""},
+        {"label": "Críticas", "value": f"{severity_counts['Critical']:,}", "delta": f"{severity_delta['Critical']:+,}", "class": "critical"},
+        {"label": "Altas", "value": f"{severity_counts['High']:,}", "delta": f"{severity_delta['High']:+,}", "class": "high"},
+        {"label": "Medias", "value": f"{severity_counts['Medium']:,}", "delta": f"{severity_delta['Medium']:+,}", "class": "medium"},
+        {"label": "Tiempo Promedio", "value": f"{stats['mttr_days']:.0f}d", "delta": f"Abiertas: {stats['mean_open_age_days']:.0f}d", "class": ""}
     ]
     
     for i, metric in enumerate(metrics):
@@ -443,6 +558,26 @@ def pagina_detalle():
             </div>
             """, unsafe_allow_html=True)
     
+    # Listado de los hallazgos filtrados (consulta a la base local, solo las filas mostradas)
+    with st.expander(f"📄 Hallazgos filtrados (hasta {FILTERED_FINDINGS:,}, de mayor a menor CVSS)"):
+        st.dataframe(
+            load_filtered_findings(data_version, limit=FILTERED_FINDINGS, **filters),
+            column_config={
+                "ip_address": "Dirección IP",
+                "hostname": "Nombre",
+                "cve_id": "CVE",
+                "plugin_id": "Plugin",
+                "severity": "Severidad",
+                "cvss_score": st.column_config.NumberColumn("CVSS", format="%.1f"),
+                "description": "Descripción",
+                "discovery_date": "Descubierta",
+                "remediated": st.column_config.CheckboxColumn("Remediada")
+            },
+            use_container_width=True,
+            hide_index=True,
+            height=300
+        )
+    
     # Gráficos detallados
     st.markdown("<br>", unsafe_allow_html=True)
     
@@ -454,68 +589,18 @@ def pagina_detalle():
         with col1:
             st.subheader("Tendencia Acumulada")
             
-            months = ['Ene', 'Feb', 'Mar', 'Abr', 'May', 'Jun']
-            vulnerabilities = [2800, 2540, 2529, 3240, 3100, 3350]
-            critical = [8, 5, 3, 5, 4, 6]
-            
-            fig = go.Figure()
-            fig.add_trace(go.Scatter(
-                x=months, y=vulnerabilities,
-                name='Total',
-                line=dict(color='#3B82F6', width=3)
-            ))
-            fig.add_trace(go.Scatter(
-                x=months, y=critical,
-                name='Críticas',
-                line=dict(color='#EF4444', width=3)
-            ))
-            
-            fig.update_layout(
-                height=400,
-                plot_bgcolor='rgba(0,0,0,0)',
-                paper_bgcolor='rgba(0,0,0,0)',
-                legend=dict(orientation='h', y=1.1)
-            )
-            
-            st.plotly_chart(fig, use_container_width=True)
+            show_figure(cumulative_trend_figure(data_version))
         
         with col2:
             st.subheader("Distribución por Severidad")
             
-            labels = ['Crítica', 'Alta', 'Media', 'Baja', 'Información']
-            values = [5, 24, 189, 450, 2572]
-            colors = ['#EF4444', '#F97316', '#F59E0B', '#10B981', '#94A3B8']
-            
-            fig = px.bar(
-                x=labels,
-                y=values,
-                color=labels,
-                color_discrete_map=dict(zip(labels, colors))
-            )
-            
-            fig.update_layout(
-                height=400,
-                showlegend=False,
-                plot_bgcolor='rgba(0,0,0,0)',
-                paper_bgcolor='rgba(0,0,0,0)',
-                xaxis_title="",
-                yaxis_title="Cantidad"
-            )
-            
-            st.plotly_chart(fig, use_container_width=True)
+            show_figure(severity_figure(data_version, **filters))
     
     with tab2:
-        st.subheader("Top 10 Vulnerabilidades Más Críticas")
+        st.subheader(f"Top {TOP_CVES} Vulnerabilidades Más Críticas")
         
-        data = [
-            {"CVE": "CVE-2024-1234", "Descripción": "Apache 2.4.x Multiple Vulnerabilities", "CVSS": 9.8, "Activos": 310, "Días": 45},
-            {"CVE": "CVE-2023-4567", "Descripción": "Remote Code Execution", "CVSS": 9.5, "Activos": 289, "Días": 120},
-            {"CVE": "CVE-2024-5678", "Descripción": "Privilege Escalation", "CVSS": 8.8, "Activos": 215, "Días": 30},
-            {"CVE": "CVE-2023-7890", "Descripción": "SQL Injection", "CVSS": 8.5, "Activos": 187, "Días": 90},
-            {"CVE": "CVE-2024-3456", "Descripción": "Cross-Site Scripting", "CVSS": 8.2, "Activos": 165, "Días": 15},
-        ]
-        
-        df = pd.DataFrame(data)
+        # Hallazgos abiertos priorizados por CVSS, severidad, antigüedad, exposición y estado del activo
+        df = load_top_cves(data_version, TOP_CVES)
         
         # Añadir colores según CVSS
         def cvss_color(score):
@@ -536,7 +621,14 @@ def pagina_detalle():
                     help="Puntuación CVSS v3.1"
                 ),
                 "Activos": st.column_config.NumberColumn("Activos Afectados"),
-                "Días": st.column_config.NumberColumn("Días Expuesto")
+                "Días": st.column_config.NumberColumn("Días Expuesto"),
+                "Prioridad": st.column_config.ProgressColumn(
+                    "Prioridad",
+                    format="%.1f",
+                    min_value=0,
+                    max_value=100,
+                    help="CVSS y severidad, ajustados por antigüedad, activos expuestos y estado del activo"
+                )
             },
             hide_index=True,
             use_container_width=True,
@@ -546,40 +638,18 @@ def pagina_detalle():
     with tab3:
         st.subheader("Mapa de Distribución por Segmento")
         
-        # Datos de segmentos
-        segments = pd.DataFrame({
-            'Segmento': ['172.22.11.0/24', '172.22.134.0/24', '172.22.1.0/24', '172.22.113.0/24'],
-            'Activos': [14, 256, 3, 15],
-            'Vulnerabilidades': [310, 1200, 45, 180],
-            'Críticas': [1, 3, 0, 1]
-        })
+        # Segmentos /24 con más hallazgos abiertos
+        segments = load_segments(data_version, limit=SEGMENT_LIMIT)
         
         col1, col2 = st.columns([2, 1])
         
         with col1:
-            # Gráfico de dispersión
-            fig = px.scatter(
-                segments,
-                x='Activos',
-                y='Vulnerabilidades',
-                size='Críticas',
-                color='Segmento',
-                size_max=60,
-                hover_name='Segmento'
-            )
-            
-            fig.update_layout(
-                height=400,
-                title="Vulnerabilidades vs Activos por Segmento",
-                xaxis_title="Número de Activos",
-                yaxis_title="Vulnerabilidades Detectadas"
-            )
-            
-            st.plotly_chart(fig, use_container_width=True)
+            # Gráfico de dispersión (todos los segmentos, agrupados si son muchos)
+            show_figure(segment_scatter_figure(data_version, SEGMENT_LIMIT))
         
         with col2:
             st.subheader("Resumen por Segmento")
-            for _, row in segments.iterrows():
+            for _, row in segments.head(5).iterrows():
                 with st.expander(f"📡 {row['Segmento']}"):
                     st.metric("Activos", row['Activos'])
                     st.metric("Vulnerabilidades", row['Vulnerabilidades'])
@@ -588,33 +658,48 @@ def pagina_detalle():
     with tab4:
         st.subheader("Detalle Completo de Activos")
         
-        # Generar datos de ejemplo para tabla detallada
-        np.random.seed(42)
-        assets_data = []
-        for i in range(50):
-            assets_data.append({
-                'IP': f'172.22.{np.random.randint(1, 200)}.{np.random.randint(1, 255)}',
-                'Hostname': f'SVR-{np.random.choice(["DB", "WEB", "APP"])}-{i:03d}',
-                'Vulns': np.random.randint(1, 100),
-                'Críticas': np.random.randint(0, 5),
-                'Altas': np.random.randint(0, 10),
-                'Último Scan': (datetime.now() - timedelta(days=np.random.randint(0, 30))).strftime('%Y-%m-%d'),
-                'Estado': np.random.choice(['🟢 Seguro', '🟡 Riesgo', '🔴 Crítico'], p=[0.6, 0.3, 0.1])
-            })
+        asset_table = load_asset_table(data_version)
         
-        df_assets = pd.DataFrame(assets_data)
+        col1, col2, col3, col4 = st.columns([3, 2, 1, 1])
         
-        # Filtro rápido
-        search = st.text_input("🔍 Buscar por IP o Hostname")
-        if search:
-            df_assets = df_assets[df_assets['IP'].str.contains(search) | df_assets['Hostname'].str.contains(search)]
+        with col1:
+            # Filtro rápido (texto literal, sin distinguir mayúsculas)
+            search = st.text_input("🔍 Buscar por IP o Hostname", key="asset_search")
+        
+        with col2:
+            sort_by = st.selectbox(
+                "Ordenar por",
+                ["Riesgo", "Vulns", "Críticas", "Altas", "Estado", "IP", "Hostname", "Último Scan"],
+                key="asset_sort"
+            )
+        
+        with col3:
+            descending = st.radio("Orden", ["Desc", "Asc"], horizontal=True, key="asset_order") == "Desc"
+        
+        with col4:
+            page_size = st.selectbox("Filas por página", PAGE_SIZES, index=1, key="asset_page_size")
+        
+        rows = load_asset_search_index(data_version).search(search) if search else None
+        total = asset_table.size if rows is None else len(rows)
+        pages = max(AssetTable.page_count(total, page_size), 1)
+        # La clave depende de la búsqueda y del tamaño: al cambiarlos se vuelve a la página 1
+        page = st.number_input(
+            "Página", min_value=1, max_value=pages, value=1, step=1,
+            key=f"asset_page_{search}_{page_size}"
+        )
+        
+        # Solo se extrae y envía al navegador la página visible
+        df_page, total = asset_table.page(page, page_size, sort_by=sort_by, descending=descending, rows=rows)
         
-        # Mostrar tabla
         st.dataframe(
-            df_assets,
+            df_page,
             column_config={
                 "IP": "Dirección IP",
                 "Hostname": "Nombre",
+                "Riesgo": st.column_config.ProgressColumn(
+                    "Riesgo", format="%.0f", min_value=0, max_value=100,
+                    help="Probabilidad combinada de sus hallazgos abiertos, ponderada por el estado del activo"
+                ),
                 "Vulns": "Total Vulnerabilidades",
                 "Críticas": "Críticas",
                 "Altas": "Altas",
@@ -622,8 +707,43 @@ def pagina_detalle():
                 "Estado": "Estado"
             },
             use_container_width=True,
+            hide_index=True,
             height=400
         )
+        
+        first = (page - 1) * page_size + 1 if total else 0
+        st.caption(f"Mostrando {first:,}-{min(page * page_size, total):,} de {total:,} activos · página {page} de {pages}")
+        
+        # Hallazgos de un activo de la página (consulta puntual a la base local)
+        if len(df_page):
+            detail_col1, detail_col2 = st.columns([3, 1])
+            with detail_col1:
+                position = st.selectbox(
+                    "Ver hallazgos del activo",
+                    df_page.index.tolist(),
+                    format_func=lambda i: f"{df_page.at[i, 'IP']} · {df_page.at[i, 'Hostname']}",
+                    key="asset_detail"
+                )
+            with detail_col2:
+                open_only = st.checkbox("Solo abiertos", value=True, key="asset_detail_open")
+            
+            asset_id = str(load_dataset(data_version)['assets']['asset_id'].iloc[position])
+            findings = load_asset_findings(data_version, asset_id, open_only)
+            st.dataframe(
+                findings,
+                column_config={
+                    "cve_id": "CVE",
+                    "plugin_id": "Plugin",
+                    "severity": "Severidad",
+                    "cvss_score": st.column_config.NumberColumn("CVSS", format="%.1f"),
+                    "description": "Descripción",
+                    "discovery_date": "Descubierta",
+                    "remediated": st.column_config.CheckboxColumn("Remediada")
+                },
+                use_container_width=True,
+                hide_index=True
+            )
+            st.caption(f"{len(findings):,} hallazgos")
 
 def pagina_importar_datos():
     """Página para importar datos desde Tenable"""
@@ -633,21 +753,26 @@ def pagina_importar_datos():
     col1, col2 = st.columns(2)
     
     with col1:
-        st.info("""
+        latest = load_database().scans(limit=1)
+        last_import = latest['imported_at'].iloc[0].replace('T', ' ')[:16] if len(latest) else "Nunca"
+        st.info(f"""
         ### 📋 Información del Sistema
         - **Conector**: Tenable Security Center
         - **Versión**: v2.1.4
-        - **Última sincronización**: Hace 2 horas
+        - **Última importación**: {last_import}
         - **Estado**: 🟢 Conectado
         """)
     
     with col2:
-        st.info("""
+        memory = load_memory_report(data_version)
+        st.info(f"""
         ### ⚙️ Configuración
-        - **Formato soportado**: CSV, JSON, Nessus
-        - **Límite de registros**: 10,000 por importación
+        - **Formato soportado**: CSV, JSON, Nessus, Excel
+        - **Límite de registros**: Sin límite (lectura por lotes)
         - **Frecuencia de escaneo**: Cada 24 horas
-        - **Almacenamiento**: Base de datos segura
+        - **Almacenamiento**: Parquet + base de datos SQLite local
+        - **Memoria de los datos**: {memory['bytes'].sum() / 1e6:,.1f} MB
+          ({memory['object_bytes'].sum() / max(memory['bytes'].sum(), 1):.0f}× menos que como texto)
         """)
     
     st.markdown("---")
@@ -677,23 +802,25 @@ def pagina_importar_datos():
             """)
         
         with col2:
-            uploaded_file = st.file_uploader(
-                "Selecciona archivo para importar",
+            uploaded_files = st.file_uploader(
+                "Selecciona archivos para importar",
                 type=['csv', 'json', 'nessus', 'xlsx'],
-                help="Sube archivos de exportación de Tenable"
+                accept_multiple_files=True,
+                help="Sube uno o varios archivos de exportación de Tenable; varios se leen en paralelo"
             )
             
-            if uploaded_file is not None:
-                # Mostrar información del archivo
-                file_details = {
-                    "Nombre": uploaded_file.name,
-                    "Tipo": uploaded_file.type,
-                    "Tamaño": f"{uploaded_file.size / 1024:.1f} KB"
-                }
-                
-                st.write("📄 **Detalles del archivo:**")
-                for key, value in file_details.items():
-                    st.write(f"- {key}: {value}")
+            if uploaded_files:
+                # Mostrar información de los archivos
+                st.write("📄 **Detalles de los archivos:**")
+                st.dataframe(
+                    pd.DataFrame([{
+                        "Nombre": f.name,
+                        "Tipo": f.type,
+                        "Tamaño": f"{f.size / 1024:.1f} KB"
+                    } for f in uploaded_files]),
+                    use_container_width=True,
+                    hide_index=True
+                )
                 
                 # Opciones de procesamiento
                 st.markdown("---")
@@ -712,44 +839,28 @@ def pagina_importar_datos():
                     validate_cves = st.checkbox("Validar CVE con base de datos", value=True)
                 
                 # Botón para procesar
-                if st.button("🚀 Procesar Archivo", type="primary", use_container_width=True):
-                    with st.spinner("Procesando archivo..."):
-                        # Simular procesamiento
-                        progress_bar = st.progress(0)
-                        status_text = st.empty()
-                        
-                        for i in range(100):
-                            progress_bar.progress(i + 1)
-                            status_text.text(f"Procesando... {i+1}%")
-                            time.sleep(0.02)
-                        
-                        # Simular resultados
-                        st.success("✅ Archivo procesado exitosamente!")
-                        
-                        # Mostrar estadísticas simuladas
-                        stats_col1, stats_col2, stats_col3, stats_col4 = st.columns(4)
-                        
-                        with stats_col1:
-                            st.metric("Registros importados", "1,245")
-                        with stats_col2:
-                            st.metric("Vulnerabilidades únicas", "89")
-                        with stats_col3:
-                            st.metric("Activos nuevos", "12")
-                        with stats_col4:
-                            st.metric("Críticas detectadas", "3")
-                        
-                        # Guardar en sesión
-                        st.session_state.tenable_data = {
-                            'filename': uploaded_file.name,
-                            'records': 1245,
-                            'timestamp': datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                        }
-                        
-                        st.session_state.imported_files.append({
-                            'name': uploaded_file.name,
-                            'date': datetime.now().strftime("%Y-%m-%d"),
-                            'records': 1245
-                        })
+                label = ("🚀 Procesar Archivo" if len(uploaded_files) == 1
+                         else f"🚀 Procesar {len(uploaded_files)} Archivos")
+                if st.button(label, type="primary", use_container_width=True):
+                    # El import se ejecuta en segundo plano; la página sigue respondiendo
+                    options = dict(process_mode=process_mode, deduplicate=deduplicate,
+                                   validate_cves=validate_cves, nvd_feed_dir=NVD_FEED_DIR)
+                    if len(uploaded_files) == 1:
+                        uploaded_file = uploaded_files[0]
+                        job = load_job_runner().submit(
+                            'import', f"Importar {uploaded_file.name}", import_file_job,
+                            uploaded_file, uploaded_file.name, DATA_STORE_DIR, **options
+                        )
+                    else:
+                        # Varios archivos: se leen en paralelo y se guardan como un único escaneo
+                        job = load_job_runner().submit(
+                            'import', f"Importar {len(uploaded_files)} archivos", import_files_job,
+                            [(f.name, f) for f in uploaded_files], DATA_STORE_DIR, **options
+                        )
+                    st.session_state.jobs.append(job.id)
+                    st.toast(f"📥 {job.description} en curso")
+        
+        mostrar_trabajos('import')
     
     with tab2:
         st.subheader("Conexión API a Tenable")
@@ -795,47 +906,44 @@ def pagina_importar_datos():
             # Configuración de consulta
             with st.expander("⚙️ Configuración Avanzada"):
                 days_back = st.slider("Días hacia atrás", 1, 365, 30)
-                limit_results = st.number_input("Límite de resultados", 100, 10000, 1000)
+                limit_results = st.number_input("Límite de resultados (0 = sin límite)", 0, 10_000_000, 0, step=1000)
+                chunk_assets = st.number_input("Activos por chunk de exportación", 50, 5000, 500)
+                requests_per_second = st.slider("Peticiones por segundo", 1, 50, 10)
                 include_plugins = st.checkbox("Incluir detalles de plugins", value=False)
             
             if st.button("🔗 Probar Conexión", type="secondary"):
                 if access_key and secret_key:
                     with st.spinner("Probando conexión..."):
-                        time.sleep(2)
-                        st.success("✅ Conexión exitosa a Tenable API")
-                        
-                        # Simular información de la cuenta
-                        st.info(f"""
-                        **Información de la cuenta:**
-                        - Cuenta: Security Team
-                        - Escaneos disponibles: 24
-                        - Activos: 489
-                        - Último escaneo: Hace 2 horas
-                        """)
+                        importer = TenableDataImporter()
+                        try:
+                            account = importer.connect(access_key, secret_key, api_url)
+                        except TenableApiError as e:
+                            st.error(f"❌ No se pudo conectar a Tenable API: {e}")
+                        else:
+                            importer.client.close()
+                            st.success("✅ Conexión exitosa a Tenable API")
+                            st.info(f"""
+                            **Información de la cuenta:**
+                            - Usuario: {account.get('username', '-')}
+                            - Contenedor: {account.get('container_name', '-')}
+                            """)
                 else:
                     st.error("❌ Por favor ingresa Access Key y Secret Key")
             
             if st.button("📥 Importar desde API", type="primary"):
                 if access_key and secret_key:
-                    with st.spinner("Importando datos desde Tenable API..."):
-                        progress = st.progress(0)
-                        
-                        for i in range(100):
-                            progress.progress(i + 1)
-                            time.sleep(0.03)
-                        
-                        st.success("✅ Datos importados exitosamente desde Tenable API")
-                        
-                        # Mostrar estadísticas
-                        col_a, col_b, col_c = st.columns(3)
-                        with col_a:
-                            st.metric("Escaneos importados", "15")
-                        with col_b:
-                            st.metric("Vulnerabilidades", "3,245")
-                        with col_c:
-                            st.metric("Activos", "489")
+                    job = load_job_runner().submit(
+                        'api', "Importar desde Tenable API", api_job, DATA_STORE_DIR, api_url, access_key, secret_key,
+                        days_back=days_back, num_assets=chunk_assets,
+                        filters={'scan_uuid': scan_id} if scan_id else None,
+                        max_findings=limit_results or None, requests_per_second=requests_per_second
+                    )
+                    st.session_state.jobs.append(job.id)
+                    st.toast("📥 Importación desde Tenable API en curso")
                 else:
                     st.error("❌ Por favor ingresa las credenciales de API primero")
+            
+            mostrar_trabajos('api')
     
     with tab3:
         st.subheader("Sincronización Automática")
@@ -847,64 +955,116 @@ def pagina_importar_datos():
         tu dashboard actualizado automáticamente.
         """)
         
+        config = load_config(DATA_STORE_DIR)
+        frequencies = list(SYNC_FREQUENCIES)
+        
+        # Conexión que usa cada sincronización; las claves guardadas no se muestran
+        api_col1, api_col2, api_col3 = st.columns(3)
+        with api_col1:
+            sync_url = st.text_input("URL de Tenable", config['api_url'], key="sync_api_url")
+        with api_col2:
+            sync_access_key = st.text_input(
+                "Access Key", type="password", key="sync_access_key",
+                placeholder="Guardada (dejar vacío para conservarla)" if config['access_key'] else "Ingresa tu Access Key"
+            )
+        with api_col3:
+            sync_secret_key = st.text_input(
+                "Secret Key", type="password", key="sync_secret_key",
+                placeholder="Guardada (dejar vacío para conservarla)" if config['secret_key'] else "Ingresa tu Secret Key"
+            )
+        
         col1, col2 = st.columns(2)
         
         with col1:
             frequency = st.selectbox(
                 "Frecuencia de sincronización",
-                ["Cada 24 horas", "Cada 12 horas", "Cada 6 horas", "Cada hora", "Manual"]
+                frequencies,
+                index=frequencies.index(config['frequency'])
             )
             
             time_of_day = st.time_input(
                 "Hora de sincronización",
-                value=datetime.strptime("02:00", "%H:%M").time()
+                value=datetime.strptime(config['time_of_day'], "%H:%M").time()
             )
             
             retention_days = st.slider(
                 "Retención de datos (días)",
-                7, 365, 90
+                7, 365, int(config['retention_days'])
             )
         
         with col2:
-            notifications = st.checkbox("Enviar notificaciones por email", value=True)
-            if notifications:
-                email = st.text_input("Email para notificaciones", "security-team@company.com")
-            
-            auto_remediate = st.checkbox("Crear tickets automáticamente para críticas", value=True)
-            
             if st.button("💾 Guardar Configuración", type="primary"):
+                config = save_config(DATA_STORE_DIR, dict(
+                    config,
+                    frequency=frequency,
+                    time_of_day=time_of_day.strftime("%H:%M"),
+                    retention_days=retention_days,
+                    api_url=sync_url,
+                    access_key=sync_access_key or config['access_key'],
+                    secret_key=sync_secret_key or config['secret_key']
+                ))
                 st.success("✅ Configuración de sincronización guardada")
+            
+            if st.button("🔄 Sincronizar ahora"):
+                if api_configured(config):
+                    job = load_job_runner().submit('sync', "Sincronización manual", sync_job, DATA_STORE_DIR)
+                    st.session_state.jobs.append(job.id)
+                    st.toast("🔄 Sincronización en curso")
+                else:
+                    st.error("❌ Guarda antes la URL y las claves de la API de Tenable")
+        
+        # Estado del demonio (python sync_daemon.py --store <almacén>)
+        status = daemon_status(DATA_STORE_DIR)
+        scheduled = next_run(config, last_run(DATA_STORE_DIR))
+        if status is None or not status['alive']:
+            st.warning("⚠️ El proceso de sincronización no está en ejecución. "
+                       f"Inícialo con `python sync_daemon.py --store {DATA_STORE_DIR}`")
+        elif scheduled is None:
+            st.caption("🟢 Proceso de sincronización activo · Modo manual")
+        else:
+            st.caption(f"🟢 Proceso de sincronización activo · Próxima ejecución: {scheduled:%Y-%m-%d %H:%M}")
+        
+        mostrar_trabajos('sync')
         
         st.markdown("---")
         
         # Historial de sincronizaciones
         st.subheader("📋 Historial de Sincronizaciones")
         
-        history_data = [
-            {"Fecha": "2024-04-15 02:00", "Estado": "✅", "Registros": "1,245", "Duración": "45s"},
-            {"Fecha": "2024-04-14 02:00", "Estado": "✅", "Registros": "1,230", "Duración": "42s"},
-            {"Fecha": "2024-04-13 02:00", "Estado": "⚠️", "Registros": "890", "Duración": "38s"},
-            {"Fecha": "2024-04-12 02:00", "Estado": "✅", "Registros": "1,210", "Duración": "40s"},
-            {"Fecha": "2024-04-11 02:00", "Estado": "✅", "Registros": "1,195", "Duración": "39s"},
-        ]
-        
-        df_history = pd.DataFrame(history_data)
-        st.dataframe(df_history, use_container_width=True, hide_index=True)
+        history = read_history(DATA_STORE_DIR, limit=50)
+        if history:
+            df_history = pd.DataFrame({
+                "Fecha": [run['started_at'].replace('T', ' ')[:16] for run in history],
+                "Estado": ["✅" if run['status'] == 'ok' else "❌" for run in history],
+                "Intento": [run.get('attempt', 1) for run in history],
+                "Registros": [f"{run['rows']:,}" for run in history],
+                "Duración": [f"{run['duration_s']:.1f}s" for run in history],
+                "Registros/s": [f"{run['rows_per_s'] or 0:,.0f}" for run in history],
+                "Particiones eliminadas": [len(run['partitions_dropped']) for run in history],
+                "Error": [run['error'] or "" for run in history]
+            })
+            st.dataframe(df_history, use_container_width=True, hide_index=True)
+        else:
+            st.info("Todavía no se ha ejecutado ninguna sincronización")
     
     # Sección de archivos importados
     st.markdown("---")
     st.subheader("📁 Archivos Importados")
     
-    if st.session_state.imported_files:
-        for file in st.session_state.imported_files:
+    # Catálogo persistente: el mismo para todas las sesiones y tras reiniciar
+    database = load_database()
+    imported = database.scans(limit=IMPORT_LIST_LIMIT)
+    if len(imported):
+        for scan in imported.itertuples():
             col1, col2, col3 = st.columns([3, 2, 1])
             with col1:
-                st.write(f"📄 **{file['name']}**")
+                st.write(f"📄 **{scan.source or 'Escaneo ' + scan.scan_date}**")
             with col2:
-                st.write(f"📅 {file['date']} | 📊 {file['records']} registros")
+                st.write(f"📅 {scan.imported_at.replace('T', ' ')[:16]} | 📊 {scan.findings:,} registros | "
+                         f"{'Completa' if scan.import_mode == 'full' else 'Incremental'}")
             with col3:
-                if st.button("🗑️", key=f"delete_{file['name']}"):
-                    st.session_state.imported_files.remove(file)
+                if st.button("🗑️", key=f"delete_scan_{scan.scan_id}", help="Quitar de la lista (los datos se conservan)"):
+                    database.hide_scan(scan.scan_id)
                     st.rerun()
     else:
         st.info("No hay archivos importados todavía")
@@ -987,15 +1147,33 @@ with st.sidebar:
                 key="filtro_severidad"
             )
             
+            segment_options = load_segments(data_version, limit=SEGMENT_LIMIT)['Segmento'].tolist()
             segmentos = st.multiselect(
                 "🌐 Segmentos de red",
-                ["172.22.11.0/24", "172.22.134.0/24", "172.22.1.0/24", "172.22.113.0/24", "172.22.114.0/24"],
-                default=["172.22.11.0/24", "172.22.134.0/24"],
+                segment_options,
+                default=segment_options[:2],
                 key="filtro_segmentos"
             )
             
+            segmento_personalizado = st.text_input(
+                "Otro segmento (CIDR)",
+                placeholder="172.22.0.0/16",
+                key="filtro_segmento_cidr"
+            )
+            
             if st.form_submit_button("Aplicar Filtros", use_container_width=True):
-                st.success("Filtros aplicados")
+                seleccion = segmentos + ([segmento_personalizado.strip()] if segmento_personalizado.strip() else [])
+                try:
+                    resumen = load_segment_index(data_version).summary(seleccion)
+                except ValueError as e:
+                    st.error(f"Segmento no válido: {e}")
+                else:
+                    # La página filtra sus métricas y su tendencia por estos segmentos
+                    st.session_state.segmentos_aplicados = tuple(seleccion)
+                    st.success(
+                        f"Filtros aplicados: {resumen['assets']:,} activos, "
+                        f"{resumen['vulnerabilities']:,} vulnerabilidades, {resumen['critical']:,} críticas"
+                    )
     
     # Pie de página en sidebar
     st.markdown("<hr style='border-color: #334155; margin-top: 50px;'>", unsafe_allow_html=True)
@@ -1027,39 +1205,34 @@ elif st.session_state.current_page == "vulnerabilidades":
     st.markdown("<h1 class='main-header'>⚠️ TC - Vulnerabilidades Detectadas</h1>", unsafe_allow_html=True)
     
     # Mostrar filtros activos
+    segmentos_aplicados = st.session_state.get('segmentos_aplicados', ())
     if 'filtro_severidad' in st.session_state:
         st.info(f"Filtros activos: {', '.join(st.session_state.filtro_severidad)}")
+    if segmentos_aplicados:
+        st.info(f"Segmentos: {', '.join(segmentos_aplicados)}")
     
-    # Métricas rápidas
+    # Métricas rápidas (de los segmentos aplicados en el filtro lateral, si los hay)
+    if segmentos_aplicados:
+        metrics = load_segment_metrics(data_version, segmentos_aplicados)
+    else:
+        metrics = load_metrics(data_version)
     col1, col2, col3 = st.columns(3)
     with col1:
-        st.metric("Equipos afectados", "270", "+12")
+        st.metric("Equipos afectados", f"{metrics['affected_assets']:,}", f"{metrics['new_assets_week']:+,}")
     with col2:
-        st.metric("Vulnerabilidades críticas", "2", "-1", delta_color="inverse")
+        st.metric(
+            "Vulnerabilidades críticas",
+            f"{metrics['severity_counts']['Critical']:,}",
+            f"{metrics['severity_week_delta']['Critical']:+,}",
+            delta_color="inverse"
+        )
     with col3:
-        st.metric("Total hallazgos", "3,000", "+471")
+        st.metric("Total hallazgos", f"{metrics['total_findings']:,}", f"{metrics['new_findings_week']:+,}")
     
     # Gráfico de tendencias
     st.subheader("Tendencia de Vulnerabilidades")
     
-    fig = go.Figure()
-    fig.add_trace(go.Scatter(
-        x=['Febrero', 'Marzo', 'Abril'],
-        y=[2540, 2529, 3000],
-        mode='lines+markers',
-        name='Total',
-        line=dict(color='#3B82F6', width=4)
-    ))
-    
-    fig.update_layout(
-        height=400,
-        xaxis_title="Mes",
-        yaxis_title="Cantidad",
-        plot_bgcolor='rgba(0,0,0,0.05)',
-        paper_bgcolor='rgba(0,0,0,0)'
-    )
-    
-    st.plotly_chart(fig, use_container_width=True)
+    show_figure(daily_trend_figure(data_version, segmentos_aplicados or None))
 
 elif st.session_state.current_page == "persistencias":
     st.markdown("<h1 class='main-header'>🔍 TC - Persistencias Detectadas</h1>", unsafe_allow_html=True)
@@ -1080,18 +1253,32 @@ elif st.session_state.current_page == "importar":
 elif st.session_state.current_page == "resumen":
     st.markdown("<h1 class='main-header'>📄 Resumen Ejecutivo</h1>", unsafe_allow_html=True)
     
+    metrics = load_metrics(data_version)
+    trend = "Incremento" if metrics['month_over_month_pct'] >= 0 else "Descenso"
+    
+    # Segmento /24 con más vulnerabilidades abiertas
+    top_segments = load_segments(data_version, limit=1)
+    if len(top_segments):
+        top_segment = top_segments.iloc[0]
+        segment_text = (f"{top_segment['Segmento']} ({top_segment['Activos']:,} equipos, "
+                        f"{top_segment['Vulnerabilidades']:,} vulnerabilidades abiertas)")
+        segment_action = f"Revisar configuración de segmento {top_segment['Segmento']}"
+    else:
+        segment_text = "sin activos con IPv4 válida"
+        segment_action = "Completar las direcciones IP del inventario de activos"
+    
     with st.expander("📋 Resumen General", expanded=True):
-        st.markdown("""
+        st.markdown(f"""
         ### Hallazgos Principales
         
-        1. **Total de activos monitoreados**: 489 equipos
-        2. **Vulnerabilidades críticas**: 2 (requieren atención inmediata)
-        3. **Segmentos más afectados**: 172.22.134.x (256 equipos)
-        4. **Tendencia**: Incremento del 18.6% en hallazgos este mes
+        1. **Total de activos monitoreados**: {metrics['total_assets']:,} equipos
+        2. **Vulnerabilidades críticas**: {metrics['severity_counts']['Critical']:,} (requieren atención inmediata)
+        3. **Segmentos más afectados**: {segment_text}
+        4. **Tendencia**: {trend} del {abs(metrics['month_over_month_pct']):.1f}% en hallazgos este mes
         
         ### Recomendaciones
         - **Prioridad 1**: Parchear servidores con vulnerabilidades críticas
-        - **Prioridad 2**: Revisar configuración de segmento 172.22.134.x
+        - **Prioridad 2**: {segment_action}
         - **Prioridad 3**: Implementar monitoreo continuo
         """)
     
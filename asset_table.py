@@ -0,0 +1,82 @@
+"""
+Módulo de tabla de activos paginada
+Ordenación y paginación en el servidor para la pestaña 'Detalles'
+"""
+
+import numpy as np
+import pandas as pd
+
+from segment_index import ip_to_int
+
+PAGE_SIZES = [25, 50, 100, 250, 500]
+
+# Orden de gravedad de la columna Estado (de menor a mayor)
+_STATUS_ORDER = ['🟢 Seguro', '🟡 Riesgo', '🔴 Crítico']
+
+
+class AssetTable:
+    """Tabla de detalle de activos con permutaciones de orden precalculadas
+
+    Para cada columna se guarda la permutación que la ordena y su inversa
+    (el rango de cada fila), calculadas la primera vez que se ordena por ella.
+    Una página se obtiene recortando la permutación, así que solo se copian y
+    serializan las filas visibles.
+    """
+
+    def __init__(self, details):
+        self.details = details
+        self.size = len(details)
+        self._permutations = {}
+
+    def _permutation(self, column):
+        """(orden, rango) de la columna; la tabla es de solo lectura, así que no caducan"""
+        if column not in self._permutations:
+            order = np.argsort(self._sort_key(column), kind='stable')
+            rank = np.empty(self.size, dtype=np.int64)
+            rank[order] = np.arange(self.size)
+            self._permutations[column] = order, rank
+        return self._permutations[column]
+
+    def _sort_key(self, column):
+        values = self.details[column]
+        if column == 'IP':
+            return ip_to_int(values)
+        if column == 'Estado':
+            return pd.Categorical(values, categories=_STATUS_ORDER).codes
+        if pd.api.types.is_numeric_dtype(values):
+            return values.to_numpy()
+        # Texto: códigos de los valores distintos ordenados; los nulos (-1) van primero
+        codes, _ = pd.factorize(values, sort=True)
+        return codes
+
+    def page(self, page=1, page_size=PAGE_SIZES[0], sort_by=None, descending=False, rows=None):
+        """Filas de una página y número total de filas
+
+        rows restringe la tabla a unas posiciones (p. ej. el resultado de una
+        búsqueda); page empieza en 1 y se ajusta al rango válido.
+        """
+
+        if sort_by is None:
+            order = np.arange(self.size) if rows is None else np.sort(rows)
+        else:
+            column_order, column_rank = self._permutation(sort_by)
+            if rows is None:
+                order = column_order
+            elif len(rows) * 16 < self.size:
+                # Pocas filas: se ordenan por su rango en la columna
+                order = rows[np.argsort(column_rank[rows], kind='stable')]
+            else:
+                selected = np.zeros(self.size, dtype=bool)
+                selected[rows] = True
+                order = column_order[selected[column_order]]
+
+        total = len(order)
+        if descending:
+            order = order[::-1]
+        page = min(max(int(page), 1), max(self.page_count(total, page_size), 1))
+        start = (page - 1) * page_size
+        return self.details.iloc[order[start:start + page_size]], total
+
+    @staticmethod
+    def page_count(total, page_size):
+        return -(-total // page_size)
@@ -0,0 +1,32 @@
+"""
+Módulo de escritura atómica de archivos
+Los archivos del almacén se escriben en un temporal y se publican con un renombrado
+"""
+
+import os
+from datetime import datetime
+
+
+def write_atomic(path, write, mode=None):
+    """Escribe path con write(temp_file) y lo publica de forma atómica
+
+    El temporal está en el mismo directorio (el renombrado no cambia de
+    sistema de archivos) y empieza por '.', así que los lectores de Parquet
+    ignoran el archivo a medio escribir. Con mode se le aplican esos permisos
+    antes de publicarlo. Si write falla el temporal se borra.
+    """
+
+    directory = os.path.dirname(path) or '.'
+    os.makedirs(directory, exist_ok=True)
+    temp_file = os.path.join(directory, f".{os.path.basename(path)}.{os.getpid()}."
+                                        f"{datetime.now():%Y%m%d%H%M%S%f}.tmp")
+    try:
+        write(temp_file)
+        if mode is not None:
+            os.chmod(temp_file, mode)
+        os.replace(temp_file, path)
+    except BaseException:
+        if os.path.exists(temp_file):
+            os.remove(temp_file)
+        raise
+    return path
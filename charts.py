@@ -0,0 +1,273 @@
+"""
+Módulo de gráficos del dashboard
+Construye las figuras de Plotly y cachea su JSON por versión de datos y filtros
+"""
+
+import numpy as np
+import pandas as pd
+import plotly.express as px
+import plotly.graph_objects as go
+import plotly.io as pio
+import streamlit as st
+
+from aggregations import ASSET_TYPES, SEVERITY_LABELS, asset_types, date_days
+from data_layer import (
+    CACHE_MAX_ENTRIES,
+    CACHE_TTL,
+    load_dataset,
+    load_filtered_metrics,
+    load_segments,
+    load_trends,
+)
+from rollups import month_label, trend_series
+
+# Puntos máximos enviados al navegador por serie y por gráfico de dispersión
+MAX_LINE_POINTS = 500
+MAX_SCATTER_POINTS = 2000
+SCATTER_BINS = 40
+
+SEVERITY_COLORS = ['#EF4444', '#F97316', '#F59E0B', '#10B981', '#94A3B8']
+ASSET_TYPE_LABELS = {'Network': 'Dispositivos de Red'}
+
+
+def lttb(x, y, threshold=MAX_LINE_POINTS):
+    """Índices de los puntos que conserva Largest-Triangle-Three-Buckets
+
+    Mantiene el primer y el último punto y, de cada tramo intermedio, el que
+    forma el triángulo de mayor área con el punto elegido antes y la media del
+    tramo siguiente, de modo que picos y valles sobreviven al muestreo.
+    """
+
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    size = len(y)
+    if threshold >= size or threshold < 3:
+        return np.arange(size)
+
+    edges = np.linspace(1, size - 1, threshold - 1).astype(np.int64)
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0], selected[-1] = 0, size - 1
+    previous = 0
+    for i in range(threshold - 2):
+        start, end = edges[i], edges[i + 1]
+        if i + 2 < len(edges):
+            next_x, next_y = x[end:edges[i + 2]].mean(), y[end:edges[i + 2]].mean()
+        else:
+            next_x, next_y = x[-1], y[-1]
+        area = np.abs((x[previous] - next_x) * (y[start:end] - y[previous])
+                      - (x[previous] - x[start:end]) * (next_y - y[previous]))
+        previous = start + int(np.argmax(area))
+        selected[i + 1] = previous
+    return selected
+
+
+def bin_points(x, y, bins=SCATTER_BINS):
+    """Agrupa una nube de puntos en una rejilla bins x bins
+
+    Devuelve el centro de cada celda ocupada (media de sus puntos) y el número
+    de puntos que contiene.
+    """
+
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    x_edges = np.linspace(x.min(), x.max() + 1e-9, bins + 1)
+    y_edges = np.linspace(y.min(), y.max() + 1e-9, bins + 1)
+    cells = (np.searchsorted(x_edges, x, 'right') - 1) * bins + (np.searchsorted(y_edges, y, 'right') - 1)
+    codes, uniques = pd.factorize(cells)
+    counts = np.bincount(codes)
+    return np.bincount(codes, weights=x) / counts, np.bincount(codes, weights=y) / counts, counts
+
+
+def show_figure(figure_json):
+    """Dibuja una figura cacheada como JSON"""
+    st.plotly_chart(pio.from_json(figure_json, skip_invalid=True), use_container_width=True)
+
+
+@st.cache_data(ttl=CACHE_TTL, max_entries=CACHE_MAX_ENTRIES, show_spinner=False)
+def monthly_trend_figure(version, months=12):
+    """Hallazgos descubiertos por mes (página de inicio)"""
+    monthly = trend_series(load_trends(version, 'month')).tail(months)
+
+    fig = go.Figure()
+    fig.add_trace(go.Scatter(
+        x=[month_label(bucket) for bucket in monthly['bucket']],
+        y=monthly['total'],
+        mode='lines+markers',
+        line=dict(color='#3B82F6', width=4),
+        marker=dict(size=10, color='#1E40AF'),
+        fill='tozeroy',
+        fillcolor='rgba(59, 130, 246, 0.1)'
+    ))
+
+    fig.update_layout(
+        height=300,
+        plot_bgcolor='rgba(0,0,0,0)',
+        paper_bgcolor='rgba(0,0,0,0)',
+        margin=dict(t=30, b=30),
+        hovermode='x unified'
+    )
+    return fig.to_json()
+
+
+@st.cache_data(ttl=CACHE_TTL, max_entries=CACHE_MAX_ENTRIES, show_spinner=False)
+def asset_type_figure(version):
+    """Reparto de activos por tipo (página de inicio)"""
+    types = asset_types(load_dataset(version)['assets']).value_counts()
+    counts = [int(types.get(t, 0)) for t in ASSET_TYPES]
+
+    fig = px.pie(
+        values=counts,
+        names=[ASSET_TYPE_LABELS.get(t, t) for t in ASSET_TYPES],
+        color_discrete_sequence=px.colors.sequential.Blues_r,
+        hole=0.4
+    )
+
+    fig.update_traces(
+        textposition='inside',
+        textinfo='percent+label',
+        hoverinfo='label+percent',
+        marker=dict(line=dict(color='#1E293B', width=2))
+    )
+
+    fig.update_layout(
+        height=300,
+        showlegend=False,
+        margin=dict(t=0, b=0)
+    )
+    return fig.to_json()
+
+
+@st.cache_data(ttl=CACHE_TTL, max_entries=CACHE_MAX_ENTRIES, show_spinner=False)
+def cumulative_trend_figure(version):
+    """Hallazgos descubiertos acumulados mes a mes, totales y críticos"""
+    monthly = trend_series(load_trends(version, 'month'))
+    months = [month_label(bucket) for bucket in monthly['bucket']]
+    vulnerabilities = monthly['total'].cumsum().to_numpy()
+    critical = monthly['critical'].cumsum().to_numpy()
+    keep = lttb(np.arange(len(months)), vulnerabilities)
+
+    fig = go.Figure()
+    fig.add_trace(go.Scatter(
+        x=[months[i] for i in keep], y=vulnerabilities[keep],
+        name='Total',
+        line=dict(color='#3B82F6', width=3)
+    ))
+    fig.add_trace(go.Scatter(
+        x=[months[i] for i in keep], y=critical[keep],
+        name='Críticas',
+        line=dict(color='#EF4444', width=3)
+    ))
+
+    fig.update_layout(
+        height=400,
+        plot_bgcolor='rgba(0,0,0,0)',
+        paper_bgcolor='rgba(0,0,0,0)',
+        legend=dict(orientation='h', y=1.1)
+    )
+    return fig.to_json()
+
+
+@st.cache_data(ttl=CACHE_TTL, max_entries=CACHE_MAX_ENTRIES * 8, show_spinner=False)
+def severity_figure(version, start_date=None, end_date=None, severities=None, asset_types=None, min_cvss=None):
+    """Hallazgos abiertos por severidad con los filtros del panel 'Filtros Avanzados'"""
+    severity_counts = load_filtered_metrics(
+        version, start_date=start_date, end_date=end_date, severities=severities,
+        asset_types=asset_types, min_cvss=min_cvss
+    )['severity_counts']
+    labels = [SEVERITY_LABELS[sev] for sev in severity_counts]
+    values = list(severity_counts.values())
+
+    fig = px.bar(
+        x=labels,
+        y=values,
+        color=labels,
+        color_discrete_map=dict(zip(labels, SEVERITY_COLORS))
+    )
+
+    fig.update_layout(
+        height=400,
+        showlegend=False,
+        plot_bgcolor='rgba(0,0,0,0)',
+        paper_bgcolor='rgba(0,0,0,0)',
+        xaxis_title="",
+        yaxis_title="Cantidad"
+    )
+    return fig.to_json()
+
+
+@st.cache_data(ttl=CACHE_TTL, max_entries=CACHE_MAX_ENTRIES, show_spinner=False)
+def segment_scatter_figure(version, color_limit=20):
+    """Vulnerabilidades frente a activos de todos los segmentos /24
+
+    Con pocos segmentos cada uno tiene su color; con muchos se dibujan en un
+    solo color y, por encima de MAX_SCATTER_POINTS, agrupados en una rejilla.
+    """
+
+    segments = load_segments(version)
+    layout = dict(
+        height=400,
+        title="Vulnerabilidades vs Activos por Segmento",
+        xaxis_title="Número de Activos",
+        yaxis_title="Vulnerabilidades Detectadas"
+    )
+
+    if len(segments) <= color_limit:
+        fig = px.scatter(
+            segments,
+            x='Activos',
+            y='Vulnerabilidades',
+            size='Críticas',
+            color='Segmento',
+            size_max=60,
+            hover_name='Segmento'
+        )
+    elif len(segments) <= MAX_SCATTER_POINTS:
+        fig = px.scatter(
+            segments,
+            x='Activos',
+            y='Vulnerabilidades',
+            size='Críticas',
+            size_max=30,
+            hover_name='Segmento'
+        )
+    else:
+        x, y, counts = bin_points(segments['Activos'], segments['Vulnerabilidades'])
+        fig = go.Figure(go.Scatter(
+            x=x, y=y,
+            mode='markers',
+            marker=dict(size=counts, sizemode='area', sizeref=2 * counts.max() / 40 ** 2, color='#3B82F6'),
+            customdata=counts,
+            hovertemplate='%{customdata} segmentos<br>Activos: %{x:.0f}<br>Vulnerabilidades: %{y:.0f}<extra></extra>'
+        ))
+
+    fig.update_layout(**layout)
+    return fig.to_json()
+
+
+@st.cache_data(ttl=CACHE_TTL, max_entries=CACHE_MAX_ENTRIES * 8, show_spinner=False)
+def daily_trend_figure(version, cidrs=None):
+    """Hallazgos descubiertos por día, reducidos con LTTB (página de vulnerabilidades)
+
+    cidrs (tupla de CIDR) limita la serie a los segmentos del filtro lateral.
+    """
+    daily = trend_series(load_trends(version, 'day', cidrs=cidrs))
+    keep = lttb(date_days(daily['bucket']), daily['total'])
+    daily = daily.iloc[keep]
+
+    fig = go.Figure()
+    fig.add_trace(go.Scatter(
+        x=daily['bucket'],
+        y=daily['total'],
+        mode='lines+markers',
+        name='Total',
+        line=dict(color='#3B82F6', width=4)
+    ))
+
+    fig.update_layout(
+        height=400,
+        xaxis_title="Fecha",
+        yaxis_title="Cantidad",
+        plot_bgcolor='rgba(0,0,0,0.05)',
+        paper_bgcolor='rgba(0,0,0,0)'
+    )
+    return fig.to_json()
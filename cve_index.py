@@ -0,0 +1,235 @@
+"""
+Módulo de índice local de CVE
+Construye a partir de los feeds JSON de NVD un índice en disco, mapeado en
+memoria, para validar CVE y obtener su CVSS oficial sin conexión
+"""
+
+import glob
+import gzip
+import json
+import os
+import shutil
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+# Constante de Fibonacci para repartir las claves en la tabla hash
+_HASH_MULTIPLIER = np.uint64(11400714819323198485)
+_EMPTY = np.uint64(0)
+_CVE_PATTERN = r'^CVE-(\d{4})-(\d{4,8})$'
+
+METADATA_FILE = 'index_metadata.json'
+
+# Construcciones que se conservan en disco (la actual y la anterior, que aún
+# puede tener abierta un lector)
+KEEP_BUILDS = 2
+
+
+def cve_keys(cve_ids):
+    """Convierte identificadores 'CVE-AAAA-NNNN' en claves enteras (0 si no son válidos)
+
+    Solo se interpretan los valores distintos, de modo que el coste depende
+    del número de CVE únicas y no del número de filas.
+    """
+    codes, uniques = pd.factorize(pd.Series(cve_ids))
+    # El código -1 (valor nulo) apunta a la clave vacía añadida al final
+    keys = np.append(_parse_keys(pd.Series(uniques, dtype=object)), _EMPTY)
+    return keys[codes]
+
+
+def _parse_keys(values):
+    parts = values.astype('string').str.strip().str.upper().str.extract(_CVE_PATTERN)
+    year = pd.to_numeric(parts[0], errors='coerce').fillna(0).to_numpy(dtype=np.uint64)
+    number = pd.to_numeric(parts[1], errors='coerce').fillna(0).to_numpy(dtype=np.uint64)
+    return np.where(year > 0, year * np.uint64(10 ** 9) + number, _EMPTY)
+
+
+def _slots(keys, bits):
+    return ((keys * _HASH_MULTIPLIER) >> np.uint64(64 - bits)).astype(np.int64)
+
+
+class CveIndex:
+    """Tabla hash de direccionamiento abierto guardada como arrays .npy
+
+    Las búsquedas son O(1) por CVE y se resuelven en bloque para columnas
+    completas; los arrays se abren con mmap, así que abrir el índice no
+    carga el feed en memoria.
+
+    Estructura en disco:
+        <index_dir>/build-<marca>/cve_keys.npy, cve_cvss.npy
+        <index_dir>/index_metadata.json (construcción actual)
+
+    Cada construcción se escribe en un directorio temporal que se renombra
+    al terminar, y después se publica reemplazando los metadatos de forma
+    atómica: un lector (p. ej. otro import en paralelo) abre siempre una
+    construcción completa.
+    """
+
+    def __init__(self, index_dir):
+        self.index_dir = index_dir
+        with open(os.path.join(index_dir, METADATA_FILE)) as f:
+            self.metadata = json.load(f)
+        # Los índices anteriores a las construcciones guardaban los arrays en index_dir
+        arrays_dir = os.path.join(index_dir, self.metadata.get('build', ''))
+        self.keys = np.load(os.path.join(arrays_dir, 'cve_keys.npy'), mmap_mode='r')
+        self.cvss = np.load(os.path.join(arrays_dir, 'cve_cvss.npy'), mmap_mode='r')
+        self.bits = int(np.log2(len(self.keys)))
+
+    @classmethod
+    def build(cls, feed_paths, index_dir):
+        """Construye el índice a partir de feeds NVD (JSON 1.1 o API 2.0, opcionalmente .gz)"""
+
+        records = {}
+        for path in feed_paths:
+            for cve_id, score in _read_feed(path):
+                records[cve_id] = score
+
+        keys = cve_keys(list(records))
+        scores = np.array(list(records.values()), dtype=np.float32)
+        valid = keys != _EMPTY
+        keys, scores = keys[valid], scores[valid]
+
+        # Capacidad: potencia de 2 con factor de carga <= 0.5
+        bits = max(int(np.ceil(np.log2(max(len(keys), 1) * 2))), 4)
+        table_keys = np.zeros(1 << bits, dtype=np.uint64)
+        table_cvss = np.full(1 << bits, np.nan, dtype=np.float32)
+
+        pending = np.arange(len(keys))
+        slots = _slots(keys, bits)
+        mask = (1 << bits) - 1
+        while len(pending):
+            free = table_keys[slots[pending]] == _EMPTY
+            # Entre claves que compiten por la misma celda libre entra la primera
+            candidates = pending[free]
+            _, first = np.unique(slots[candidates], return_index=True)
+            placed = candidates[first]
+            table_keys[slots[placed]] = keys[placed]
+            table_cvss[slots[placed]] = scores[placed]
+
+            placed_mask = np.zeros(len(keys), dtype=bool)
+            placed_mask[placed] = True
+            pending = pending[~placed_mask[pending]]
+            slots[pending] = (slots[pending] + 1) & mask
+
+        now = datetime.now()
+        build = f"build-{now:%Y%m%d%H%M%S%f}-{os.getpid()}"
+        # El prefijo '.' distingue la construcción a medio escribir de las publicadas
+        temp_dir = os.path.join(index_dir, f".{build}.tmp")
+        os.makedirs(temp_dir)
+        np.save(os.path.join(temp_dir, 'cve_keys.npy'), table_keys)
+        np.save(os.path.join(temp_dir, 'cve_cvss.npy'), table_cvss)
+        os.rename(temp_dir, os.path.join(index_dir, build))
+
+        metadata_file = os.path.join(index_dir, METADATA_FILE)
+        temp_file = f"{metadata_file}.{build}.tmp"
+        with open(temp_file, 'w') as f:
+            json.dump({
+                'built_at': now.strftime('%Y-%m-%d %H:%M:%S'),
+                'build': build,
+                'feeds': [os.path.basename(p) for p in feed_paths],
+                'total_cves': int(len(keys))
+            }, f, indent=2)
+        os.replace(temp_file, metadata_file)
+
+        _prune_builds(index_dir)
+        return cls(index_dir)
+
+    @classmethod
+    def from_feed_dir(cls, feed_dir, index_dir=None):
+        """Abre el índice de un directorio de feeds, reconstruyéndolo si hay feeds más nuevos
+
+        Devuelve None si el directorio no contiene feeds.
+        """
+
+        index_dir = index_dir or os.path.join(feed_dir, 'index')
+        feeds = sorted(glob.glob(os.path.join(feed_dir, '*.json')) + glob.glob(os.path.join(feed_dir, '*.json.gz')))
+        if not feeds:
+            return None
+
+        marker = os.path.join(index_dir, METADATA_FILE)
+        if not os.path.exists(marker) or max(os.path.getmtime(f) for f in feeds) > os.path.getmtime(marker):
+            return cls.build(feeds, index_dir)
+        return cls(index_dir)
+
+    def lookup(self, cve_ids):
+        """Busca un bloque de CVE; devuelve (existe, cvss) como arrays alineados"""
+
+        keys = cve_keys(cve_ids)
+        found = np.zeros(len(keys), dtype=bool)
+        cvss = np.full(len(keys), np.nan, dtype=np.float32)
+
+        pending = np.flatnonzero(keys != _EMPTY)
+        slots = _slots(keys[pending], self.bits)
+        mask = (1 << self.bits) - 1
+        while len(pending):
+            stored = self.keys[slots]
+            hit = stored == keys[pending]
+            found[pending[hit]] = True
+            cvss[pending[hit]] = self.cvss[slots[hit]]
+            # Se sigue sondeando solo donde la celda está ocupada por otra clave
+            probe = ~hit & (stored != _EMPTY)
+            pending, slots = pending[probe], (slots[probe] + 1) & mask
+
+        return found, cvss
+
+    def validate(self, vulnerabilities):
+        """Valida las CVE de un DataFrame de vulnerabilidades
+
+        Devuelve una copia con cvss_score sustituido por el CVSS de NVD cuando
+        existe, junto con las estadísticas de la validación.
+        """
+
+        found, cvss = self.lookup(vulnerabilities['cve_id'])
+        has_cve = vulnerabilities['cve_id'].notna().to_numpy()
+        authoritative = found & ~np.isnan(cvss)
+
+        validated = vulnerabilities.copy()
+        validated['cvss_score'] = np.where(
+            authoritative, np.round(cvss.astype(np.float64), 1), validated['cvss_score']
+        )
+
+        return validated, {
+            'checked': int(has_cve.sum()),
+            'valid': int(found.sum()),
+            'unknown': int((has_cve & ~found).sum()),
+            'cvss_updated': int((authoritative & (validated['cvss_score'].to_numpy()
+                                                  != vulnerabilities['cvss_score'].to_numpy())).sum())
+        }
+
+
+def _prune_builds(index_dir):
+    """Borra las construcciones más antiguas, conservando la publicada y hasta KEEP_BUILDS en total"""
+    with open(os.path.join(index_dir, METADATA_FILE)) as f:
+        current = json.load(f).get('build')
+    builds = sorted(e.name for e in os.scandir(index_dir) if e.is_dir() and e.name.startswith('build-'))
+    others = [b for b in builds if b != current]
+    for build in others[:max(len(others) - (KEEP_BUILDS - 1), 0)]:
+        shutil.rmtree(os.path.join(index_dir, build), ignore_errors=True)
+
+
+def _read_feed(path):
+    """Extrae (cve_id, cvss) de un feed NVD en formato JSON 1.1 o API 2.0"""
+
+    opener = gzip.open if path.endswith('.gz') else open
+    with opener(path, 'rt', encoding='utf-8') as f:
+        feed = json.load(f)
+
+    # Formato de feeds 1.1: CVE_Items[].cve.CVE_data_meta.ID / impact.baseMetricV3
+    for item in feed.get('CVE_Items', []):
+        impact = item.get('impact', {})
+        score = impact.get('baseMetricV3', {}).get('cvssV3', {}).get('baseScore')
+        if score is None:
+            score = impact.get('baseMetricV2', {}).get('cvssV2', {}).get('baseScore')
+        yield item['cve']['CVE_data_meta']['ID'], np.nan if score is None else score
+
+    # Formato API 2.0: vulnerabilities[].cve.id / cve.metrics.cvssMetricV31...
+    for item in feed.get('vulnerabilities', []):
+        cve = item['cve']
+        score = None
+        for metric in ('cvssMetricV40', 'cvssMetricV31', 'cvssMetricV30', 'cvssMetricV2'):
+            entries = cve.get('metrics', {}).get(metric)
+            if entries:
+                score = entries[0]['cvssData']['baseScore']
+                break
+        yield cve['id'], np.nan if score is None else score
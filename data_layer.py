@@ -0,0 +1,260 @@
+"""
+Módulo de acceso a datos del dashboard
+Cargadores con caché de Streamlit que comparten todas las páginas
+"""
+
+import streamlit as st
+
+from aggregations import compute_metrics
+from asset_table import AssetTable
+from data_store import ScanDataStore
+from dataset_registry import DatasetRegistry, StaleVersionError
+from jobs import JobRunner
+from query_engine import VulnerabilityIndex
+from risk import asset_details, risk_pairs, top_cves
+from rollups import asset_dimensions, rollup_counts, select_rollup
+from search_index import AssetSearchIndex
+from segment_index import SegmentIndex
+from tenable_importer import TenableDataImporter, memory_report
+
+DATA_STORE_DIR = "./data_store"
+
+# Las entradas caducan a la hora y, como mucho, se guardan unas pocas versiones
+CACHE_TTL = 3600
+CACHE_MAX_ENTRIES = 8
+
+# Conjunto de demostración cuando todavía no se ha importado nada
+DEMO_VERSION = "demo"
+DEMO_ASSETS = 489
+DEMO_DAYS_BACK = 180
+
+# Trabajos en segundo plano que pueden ejecutarse a la vez
+JOB_WORKERS = 4
+
+# Columnas del detalle de hallazgos de un activo
+ASSET_FINDING_COLUMNS = ['cve_id', 'plugin_id', 'severity', 'cvss_score', 'description', 'discovery_date',
+                         'remediated']
+
+# Columnas del listado de hallazgos que cumplen los filtros del panel detallado
+FILTERED_FINDING_COLUMNS = ['ip_address', 'hostname'] + ASSET_FINDING_COLUMNS
+
+
+def dataset_version(store_dir=DATA_STORE_DIR):
+    """Identificador de la versión de los datos almacenados
+
+    Solo consulta el sistema de archivos (nombres y fechas de modificación),
+    así que es barato llamarlo en cada ejecución del script. Cambia cada vez
+    que un import escribe en el almacén.
+    """
+    return ScanDataStore(store_dir).version() or DEMO_VERSION
+
+
+@st.cache_resource(show_spinner=False)
+def load_job_runner():
+    """Ejecutor de trabajos compartido por todas las sesiones (sin caducidad)"""
+    return JobRunner(max_workers=JOB_WORKERS)
+
+
+@st.cache_resource(show_spinner=False)
+def load_database(store_dir=DATA_STORE_DIR):
+    """Base SQLite del almacén con su pool de conexiones, compartida por todas las sesiones
+
+    No se cachea por versión: las consultas leen siempre el estado confirmado.
+    """
+    return ScanDataStore(store_dir).database
+
+
+@st.cache_resource(show_spinner=False)
+def load_registry(store_dir=DATA_STORE_DIR):
+    """Registro de instantáneas del almacén (ver dataset_registry), compartido por todas las sesiones"""
+    return DatasetRegistry(store_dir)
+
+
+@st.cache_resource(ttl=CACHE_TTL, max_entries=CACHE_MAX_ENTRIES, show_spinner=False)
+def load_dataset(version, store_dir=DATA_STORE_DIR):
+    """Activos y vulnerabilidades de la versión indicada
+
+    Se cachea como recurso: todas las sesiones reciben los mismos DataFrames,
+    que por tanto deben tratarse como de solo lectura. Los datos del almacén
+    se abren desde la instantánea Arrow mapeada en memoria de esa versión;
+    si un import publicó otra desde que se calculó version, se re-ejecuta
+    el script para que todas las páginas usen la nueva.
+    """
+    if version == DEMO_VERSION:
+        return TenableDataImporter().simulate_scan_data(
+            days_back=DEMO_DAYS_BACK, num_assets=DEMO_ASSETS, vectorized=True
+        )
+    try:
+        return load_registry(store_dir).open(version)
+    except StaleVersionError:
+        st.rerun()
+
+
+@st.cache_data(ttl=CACHE_TTL, max_entries=CACHE_MAX_ENTRIES, show_spinner=False)
+def load_metrics(version):
+    """Métricas agregadas (ver aggregations.compute_metrics) de la versión indicada"""
+    return compute_metrics(load_dataset(version))
+
+
+@st.cache_data(ttl=CACHE_TTL, max_entries=CACHE_MAX_ENTRIES, show_spinner=False)
+def load_memory_report(version):
+    """Memoria por columna (ver tenable_importer.memory_report) de la versión indicada"""
+    return memory_report(load_dataset(version))
+
+
+@st.cache_resource(ttl=CACHE_TTL, max_entries=CACHE_MAX_ENTRIES, show_spinner=False)
+def load_vulnerability_index(version):
+    """Índices de filtrado (ver query_engine.VulnerabilityIndex) de la versión indicada"""
+    return VulnerabilityIndex(load_dataset(version))
+
+
+@st.cache_data(ttl=CACHE_TTL, max_entries=CACHE_MAX_ENTRIES * 8, show_spinner=False)
+def load_filtered_metrics(version, start_date=None, end_date=None, severities=None, asset_types=None, min_cvss=None):
+    """Métricas de los hallazgos que cumplen los filtros del panel 'Filtros Avanzados'
+
+    La fecha de referencia de las ventanas semanales es la del conjunto completo,
+    para que los deltas no dependan del rango de fechas elegido.
+    """
+    filtered = load_vulnerability_index(version).filter(
+        start_date=start_date, end_date=end_date, severities=severities,
+        asset_types=asset_types, min_cvss=min_cvss
+    )
+    return compute_metrics(filtered, reference_date=load_metrics(version)['reference_date'])
+
+
+@st.cache_data(ttl=CACHE_TTL, max_entries=CACHE_MAX_ENTRIES * 8, show_spinner=False)
+def load_filtered_findings(version, start_date=None, end_date=None, severities=None, asset_types=None,
+                           min_cvss=None, limit=1000, store_dir=DATA_STORE_DIR):
+    """Hallazgos que cumplen los filtros del panel 'Filtros Avanzados', de mayor a menor CVSS
+
+    Se consultan en la base SQLite (ver FindingsDatabase.findings), así que
+    solo se leen las filas listadas. Los datos de demostración no están en la
+    base: para ellos se filtra el conjunto cargado con el mismo índice que las
+    métricas.
+    """
+    filters = dict(start_date=start_date, end_date=end_date, severities=severities,
+                   asset_types=asset_types, min_cvss=min_cvss)
+    if version != DEMO_VERSION:
+        findings = load_database(store_dir).findings(limit=limit, **filters)
+        return findings.assign(remediated=findings['remediated'].astype(bool))[FILTERED_FINDING_COLUMNS]
+
+    filtered = load_vulnerability_index(version).filter(**filters)
+    findings = filtered['vulnerabilities'].nlargest(limit, 'cvss_score')
+    assets = filtered['assets'].drop_duplicates('asset_id', keep='last').astype({'asset_id': str})
+    findings = findings.astype({'asset_id': str}).merge(assets[['asset_id', 'ip_address', 'hostname']],
+                                                         on='asset_id')[FILTERED_FINDING_COLUMNS]
+    text = [column for column in FILTERED_FINDING_COLUMNS if column not in ('cvss_score', 'remediated')]
+    return findings.astype(dict.fromkeys(text, str)).reset_index(drop=True)
+
+
+@st.cache_data(ttl=CACHE_TTL, max_entries=CACHE_MAX_ENTRIES * 8, show_spinner=False)
+def load_segment_metrics(version, cidrs):
+    """Métricas de los activos y hallazgos de los segmentos (tupla de CIDR) del filtro lateral
+
+    Como en load_filtered_metrics, la fecha de referencia es la del conjunto completo.
+    """
+    return compute_metrics(load_segment_data(version, cidrs), reference_date=load_metrics(version)['reference_date'])
+
+
+@st.cache_resource(ttl=CACHE_TTL, max_entries=CACHE_MAX_ENTRIES * 8, show_spinner=False)
+def load_segment_data(version, cidrs):
+    """Activos y hallazgos de la versión limitados a los segmentos (tupla de CIDR)"""
+    data = load_dataset(version)
+    index = load_segment_index(version)
+    return dict(data, assets=data['assets'].iloc[index.asset_rows(cidrs)],
+                vulnerabilities=data['vulnerabilities'][index.finding_mask(cidrs)])
+
+
+@st.cache_data(ttl=CACHE_TTL, max_entries=CACHE_MAX_ENTRIES * 8, show_spinner=False)
+def load_trends(version, grain='month', store_dir=DATA_STORE_DIR, cidrs=None):
+    """Agregados temporales (ver rollups.RollupStore) de la versión indicada
+
+    Se leen los agregados mantenidos por el almacén; si todavía no existen
+    (datos importados antes de que se guardaran) se reconstruyen una vez.
+    Con cidrs (tupla de CIDR) se calculan solo sobre esos segmentos.
+    """
+    if version == DEMO_VERSION or cidrs:
+        data = load_segment_data(version, cidrs) if cidrs else load_dataset(version)
+        counts = rollup_counts(data['vulnerabilities'], asset_dimensions(data['assets']))
+        return select_rollup(counts[grain])
+
+    store = ScanDataStore(store_dir)
+    if not store.rollups.exists():
+        store.rebuild_rollups()
+    return store.rollups.read(grain)
+
+
+@st.cache_resource(ttl=CACHE_TTL, max_entries=CACHE_MAX_ENTRIES, show_spinner=False)
+def load_risk_pairs(version, store_dir=DATA_STORE_DIR):
+    """Hallazgos abiertos por activo y CVE (ver risk.RiskStore) de la versión indicada
+
+    Se leen los que mantiene el almacén en cada import; si todavía no existen
+    (datos importados antes de que se guardaran) se reconstruyen una vez.
+    Como load_dataset, se comparte entre sesiones y es de solo lectura.
+    """
+    if version == DEMO_VERSION:
+        return risk_pairs(load_dataset(version)['vulnerabilities'])
+
+    store = ScanDataStore(store_dir)
+    if not store.risk.exists():
+        store.rebuild_risk()
+    return store.risk.read()
+
+
+@st.cache_data(ttl=CACHE_TTL, max_entries=CACHE_MAX_ENTRIES, show_spinner=False)
+def load_top_cves(version, n=10):
+    """Las n CVE abiertas de mayor prioridad (ver risk.top_cves) de la versión indicada
+
+    La antigüedad se cuenta hasta la fecha de referencia de las métricas.
+    """
+    return top_cves(load_risk_pairs(version), load_dataset(version)['assets'], n,
+                    load_metrics(version)['reference_date'])
+
+
+@st.cache_resource(ttl=CACHE_TTL, max_entries=CACHE_MAX_ENTRIES, show_spinner=False)
+def load_asset_table(version):
+    """Tabla paginada de detalle de activos de la pestaña 'Detalles'
+
+    Se cachea como recurso para no copiar la tabla completa en cada ejecución;
+    las páginas que devuelve sí son copias independientes.
+    """
+    return AssetTable(asset_details(load_dataset(version), load_risk_pairs(version),
+                                    load_metrics(version)['reference_date']))
+
+
+def load_asset_findings(version, asset_id, open_only=False, store_dir=DATA_STORE_DIR):
+    """Hallazgos de un activo, de mayor a menor CVSS (detalle de la pestaña 'Detalles')
+
+    Es una consulta puntual a la base SQLite (índice por asset_id), sin
+    recorrer el conjunto en memoria. Los datos de demostración no están en
+    la base, así que para ellos se filtra el conjunto cargado.
+    """
+    if version != DEMO_VERSION:
+        findings = load_database(store_dir).asset_findings(asset_id, open_only)
+        return findings.assign(remediated=findings['remediated'].astype(bool))[ASSET_FINDING_COLUMNS]
+
+    vulns = load_dataset(version)['vulnerabilities']
+    findings = vulns[(vulns['asset_id'].astype(str) == asset_id).to_numpy()]
+    if open_only:
+        findings = findings[~findings['remediated'].to_numpy(dtype=bool)]
+    findings = findings.sort_values('cvss_score', ascending=False)[ASSET_FINDING_COLUMNS]
+    text = [column for column in ASSET_FINDING_COLUMNS if column not in ('cvss_score', 'remediated')]
+    return findings.astype(dict.fromkeys(text, str)).reset_index(drop=True)
+
+
+@st.cache_resource(ttl=CACHE_TTL, max_entries=CACHE_MAX_ENTRIES, show_spinner=False)
+def load_asset_search_index(version):
+    """Índice de búsqueda por IP/hostname, alineado con las filas de load_asset_table"""
+    return AssetSearchIndex(load_dataset(version)['assets'])
+
+
+@st.cache_resource(ttl=CACHE_TTL, max_entries=CACHE_MAX_ENTRIES, show_spinner=False)
+def load_segment_index(version):
+    """Índice de activos por IP (ver segment_index.SegmentIndex) de la versión indicada"""
+    return SegmentIndex(load_dataset(version))
+
+
+@st.cache_data(ttl=CACHE_TTL, max_entries=CACHE_MAX_ENTRIES, show_spinner=False)
+def load_segments(version, prefix=24, limit=None):
+    """Resumen de activos y vulnerabilidades por segmento de red"""
+    return load_segment_index(version).segments(prefix=prefix, limit=limit)
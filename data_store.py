@@ -0,0 +1,573 @@
+"""
+Módulo de almacenamiento columnar de escaneos
+Guarda los datos de Tenable en Parquet particionado por fecha de escaneo
+"""
+
+import glob
+import json
+import os
+import shutil
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from atomic_files import write_atomic
+from finding_keys import FINDING_KEY, finding_hashes, sorted_contains
+from findings_db import DB_FILE, FindingsDatabase
+from risk import RiskStore, risk_pairs
+from rollups import RollupStore, merge_counts, moved_counts, rollup_counts
+
+# Columnas de texto repetitivo: se guardan con codificación de diccionario
+_DICT = pa.dictionary(pa.int32(), pa.string())
+
+ASSETS_SCHEMA = pa.schema([
+    ('asset_id', pa.string()),
+    ('ip_address', pa.string()),
+    ('hostname', pa.string()),
+    ('os', _DICT),
+    ('last_scanned', _DICT),
+    ('status', _DICT)
+])
+
+VULNERABILITIES_SCHEMA = pa.schema([
+    ('asset_id', _DICT),
+    ('cve_id', _DICT),
+    ('severity', _DICT),
+    ('cvss_score', pa.float64()),
+    ('plugin_id', _DICT),
+    ('description', _DICT),
+    ('discovery_date', _DICT),
+    ('remediated', pa.bool_())
+])
+
+PARTITIONING = ds.partitioning(pa.schema([('scan_date', pa.string())]), flavor='hive')
+
+# Instantánea completa de una fecha; los deltas se guardan como part-1-<marca>.parquet
+SNAPSHOT_FILE = 'part-0.parquet'
+
+# Lock de escritura entre procesos (dashboard y demonio de sincronización)
+LOCK_FILE = '.write.lock'
+LOCK_STALE_SECONDS = 3600
+
+
+class FindingIndex:
+    """Índice de hashes del estado almacenado para comparar un import lote a lote
+
+    diff() clasifica cada lote frente al estado almacenado y a los lotes
+    anteriores; al terminar, remediated() da los hallazgos abiertos que ya no
+    aparecen. Solo se memorizan los hashes, nunca los lotes del import.
+    """
+
+    def __init__(self, stored):
+        self.stored = stored
+        self.unchanged = 0
+        hashes = finding_hashes(stored)
+        order = np.argsort(hashes)
+        self._index = hashes[order]
+        # Con una posición centinela al final, searchsorted siempre cae dentro del array
+        self._order = np.append(order, len(stored))
+        self._remediated = np.append(stored['remediated'].to_numpy(dtype=bool), False)
+        self._seen = np.zeros(len(stored) + 1, dtype=bool)
+        self._new = np.empty(0, dtype=np.uint64)
+        self._assets = []
+
+    def diff(self, incoming):
+        """Hallazgos nuevos y con otro estado de remediación de un lote del import
+
+        Una clave repetida (en el lote o en lotes anteriores) solo cuenta la primera vez.
+        """
+
+        hashes = finding_hashes(incoming)
+        found = sorted_contains(self._index, hashes)
+        positions = self._order[np.searchsorted(self._index, hashes)]
+        same_status = found & (self._remediated[positions] == incoming['remediated'].to_numpy(dtype=bool))
+        first_seen = ~pd.Series(hashes).duplicated().to_numpy()
+        first_seen &= np.where(found, ~self._seen[positions], ~sorted_contains(self._new, hashes))
+
+        self._seen[positions[found]] = True
+        self._new = np.union1d(self._new, hashes[~found])
+        self._assets.append(pd.unique(incoming['asset_id'].astype(str)))
+        self.unchanged += int((same_status & first_seen).sum())
+
+        return {
+            'new': incoming[~found & first_seen],
+            'updated': incoming[found & ~same_status & first_seen]
+        }
+
+    def remediated(self, asset_ids=()):
+        """Hallazgos abiertos almacenados que no aparecieron, marcados como remediados
+
+        Solo se cierran los de activos presentes en el import (con hallazgos en
+        algún lote o en asset_ids): un archivo parcial, de una subred o de un
+        escáner, no dice nada del resto de activos.
+        """
+        scanned = np.concatenate(self._assets + [pd.Series(asset_ids, dtype=object).astype(str).to_numpy()])
+        in_scope = self.stored['asset_id'].isin(scanned).to_numpy()
+        missing = ~self._seen[:-1] & ~self._remediated[:-1] & in_scope
+        remediated = self.stored[missing].copy()
+        remediated['remediated'] = True
+        return remediated
+
+
+def upsert_assets(current, incoming):
+    """Inventario current con los activos de incoming añadidos o actualizados por asset_id
+
+    Los activos que no aparecen en incoming se conservan tal cual.
+    """
+    incoming = incoming[ASSETS_SCHEMA.names]
+    kept = current[~current['asset_id'].astype(str).isin(incoming['asset_id'].astype(str))]
+    return pd.concat([kept[ASSETS_SCHEMA.names].astype(object), incoming.astype(object)], ignore_index=True)
+
+
+class ScanDataStore:
+    """Almacén Parquet de escaneos con una instantánea por fecha de escaneo
+
+    Estructura en disco:
+        <root>/assets/scan_date=YYYY-MM-DD/part-0.parquet
+        <root>/vulnerabilities/scan_date=YYYY-MM-DD/part-0.parquet
+        <root>/vulnerabilities/scan_date=YYYY-MM-DD/part-1-<marca>.parquet (deltas)
+        <root>/vulnerabilities/scan_date=YYYY-MM-DD/_scan_metadata.json
+        <root>/rollups/ (agregados temporales, ver rollups.RollupStore)
+        <root>/risk/ (hallazgos abiertos por activo y CVE, ver risk.RiskStore)
+        <root>/findings.db (catálogo de imports y estado actual, ver findings_db.FindingsDatabase)
+
+    El estado actual de los hallazgos es la última instantánea completa más
+    los deltas posteriores, donde cada clave conserva su versión más reciente.
+    Cada escritura actualiza también los agregados y la base de ese estado.
+    """
+
+    def __init__(self, root='./data_store'):
+        self.root = root
+        self.rollups = RollupStore(root)
+        self.risk = RiskStore(root)
+        self._database = None
+
+    @property
+    def database(self):
+        """Base SQLite del almacén; se abre (y se crea) al usarla por primera vez"""
+        if self._database is None:
+            created = not os.path.exists(os.path.join(self.root, DB_FILE))
+            self._database = FindingsDatabase(self.root)
+            if created and self.scan_dates():
+                # Almacén anterior a la base: se carga su estado actual una sola vez
+                self.rebuild_database()
+        return self._database
+
+    def write_snapshot(self, data, scan_date=None, compression='zstd'):
+        """Guarda un escaneo como la instantánea de su fecha (reemplaza la anterior)
+
+        'vulnerabilities' puede ser un DataFrame o un iterable de lotes
+        (ver TenableDataImporter.simulate_scan_stream).
+        """
+
+        scan_date = scan_date or data['scan_metadata']['scan_date'][:10]
+        previous_dates = self.scan_dates()
+        # Una instantánea anterior a la última fecha no cambia el estado actual
+        current = not previous_dates or scan_date >= previous_dates[-1]
+
+        assets_file = self._write_table('assets', scan_date, [data['assets']], ASSETS_SCHEMA, compression)
+        vulns = data['vulnerabilities']
+        batches = [vulns] if isinstance(vulns, pd.DataFrame) else vulns
+
+        # Los agregados y la base se actualizan lote a lote mientras se escribe
+        dimensions = self.rollups.dimensions(data['assets'])
+        partials = []
+        risk_partials = []
+
+        expected_rows = len(vulns) if isinstance(vulns, pd.DataFrame) else data['scan_metadata'].get(
+            'total_vulnerabilities', 0)
+        with self.database.import_scan(scan_date, 'full', data['scan_metadata'].get('source_file'),
+                                       expected_rows if current else 0) as catalog:
+            if current:
+                catalog.add_assets(data['assets'])
+                catalog.clear_findings()
+
+            def counted(frames):
+                for frame in frames:
+                    partials.append(rollup_counts(frame, dimensions))
+                    catalog.count(frame)
+                    if current:
+                        catalog.add_findings(frame, finding_hashes(frame))
+                        risk_partials.append(risk_pairs(frame))
+                    yield frame
+
+            vulns_file = self._write_table('vulnerabilities', scan_date, counted(batches), VULNERABILITIES_SCHEMA,
+                                           compression)
+        # Una instantánea completa sustituye a los deltas previos de la misma fecha
+        for delta_file in self._delta_files(scan_date):
+            os.remove(delta_file)
+
+        if current:
+            # La instantánea pasa a ser el estado actual completo
+            self.rollups.apply(merge_counts(partials), replace=True)
+            self.risk.replace(risk_partials)
+        else:
+            self.rebuild_rollups()
+
+        # Los metadatos se escriben al final: con lotes, critical_count ya está completo
+        metadata_file = self._write_metadata(scan_date, dict(data['scan_metadata'], import_mode='full'))
+
+        return {
+            'scan_date': scan_date,
+            'assets_file': assets_file,
+            'vulnerabilities_file': vulns_file,
+            'metadata_file': metadata_file,
+            'scan_id': catalog.scan_id,
+            'new_assets': catalog.new_assets
+        }
+
+    def write_delta(self, data, scan_date=None, include_remediated=True, include_updated=True,
+                    compression='zstd'):
+        """Importa un escaneo de forma incremental, escribiendo solo las diferencias
+
+        Cada hallazgo se compara por (asset_id, plugin_id, cve_id) con el estado
+        actual, lote a lote si 'vulnerabilities' es un iterable (ver
+        FindingIndex). Como delta de la fecha se escriben los hallazgos nuevos,
+        los que cambiaron de estado (include_updated) y los abiertos de los
+        activos del escaneo que ya no aparecen, marcados como remediados
+        (include_remediated). Los activos del escaneo se añaden o actualizan en
+        el inventario (ver current_assets), sin quitar los demás. Si el almacén
+        está vacío se guarda una instantánea completa.
+        """
+
+        scan_date = scan_date or data['scan_metadata']['scan_date'][:10]
+        vulns = data['vulnerabilities']
+        batches = [vulns] if isinstance(vulns, pd.DataFrame) else vulns
+
+        if not self.scan_dates():
+            rows = []
+
+            def sized(frames):
+                for frame in frames:
+                    rows.append(len(frame))
+                    yield frame
+
+            result = self.write_snapshot(dict(data, vulnerabilities=sized(batches)), scan_date, compression)
+            result.update(new=sum(rows), updated=0, unchanged=0, remediated=0)
+            return result
+
+        stored = self.current_vulnerabilities()
+        index = FindingIndex(stored)
+        delta = {'new': [], 'updated': [], 'remediated': []}
+
+        # Las diferencias no se conocen hasta recorrer el import (ver ScanWriter)
+        with self.database.import_scan(scan_date, 'delta', data['scan_metadata'].get('source_file'),
+                                       expected_rows=None) as catalog:
+            catalog.add_assets(data['assets'])
+
+            def changed(frames):
+                """Diferencias de cada lote; los remediados, al terminar el último"""
+                for frame in frames:
+                    catalog.count(frame)
+                    diff = index.diff(frame)
+                    yield 'new', diff['new']
+                    if include_updated:
+                        yield 'updated', diff['updated']
+                if include_remediated:
+                    yield 'remediated', index.remediated(data['assets']['asset_id'])
+
+            def stored_changes(pairs):
+                for kind, change in pairs:
+                    if not len(change):
+                        continue
+                    delta[kind].append(change)
+                    catalog.add_findings(change, finding_hashes(change))
+                    yield change
+
+            assets_file = self._upsert_assets(scan_date, data['assets'], compression)
+            vulns_file = self._write_table('vulnerabilities', scan_date, stored_changes(changed(batches)),
+                                           VULNERABILITIES_SCHEMA, compression,
+                                           f"part-1-{datetime.now():%Y%m%d%H%M%S%f}.parquet")
+
+        delta = {kind: pd.concat(frames, ignore_index=True) if frames else stored.iloc[:0]
+                 for kind, frames in delta.items()}
+        changes = [delta['new'], delta['updated'], delta['remediated']]
+
+        # Agregados: los nuevos suman hallazgos, los cambios de estado solo mueven 'open'
+        previous = self.rollups.dimensions()
+        dimensions = self.rollups.dimensions(data['assets'])
+        counts = [rollup_counts(delta['new'], dimensions)]
+        moved = moved_counts(stored, previous, dimensions)
+        if moved is not None:
+            counts.append(moved)
+        reopened = ~delta['updated']['remediated'].to_numpy(dtype=bool)
+        counts.append(rollup_counts(delta['updated'], dimensions, 0, np.where(reopened, 1, -1)))
+        counts.append(rollup_counts(delta['remediated'], dimensions, 0, -1))
+        self.rollups.apply(merge_counts(counts))
+        self._update_risk(stored, changes)
+
+        counts = {
+            'new': len(delta['new']),
+            'updated': len(delta['updated']),
+            'unchanged': index.unchanged,
+            'remediated': len(delta['remediated'])
+        }
+        metadata_file = self._write_metadata(scan_date, dict(data['scan_metadata'], import_mode='delta', **counts))
+
+        return dict({
+            'scan_date': scan_date,
+            'assets_file': assets_file,
+            'vulnerabilities_file': vulns_file,
+            'metadata_file': metadata_file,
+            'scan_id': catalog.scan_id,
+            'new_assets': catalog.new_assets
+        }, **counts)
+
+    def current_vulnerabilities(self, columns=None):
+        """Estado actual de los hallazgos: última instantánea completa más sus deltas"""
+
+        files = self._current_files()
+        if not files:
+            return self.read_vulnerabilities(columns)
+
+        read_columns = None if columns is None else list(dict.fromkeys(FINDING_KEY + list(columns)))
+        tables = [pq.read_table(f, columns=read_columns, schema=VULNERABILITIES_SCHEMA) for f in files]
+        vulns = pa.concat_tables(tables).to_pandas()
+
+        # Ante claves repetidas gana la versión más reciente (orden de los archivos)
+        latest = ~pd.Series(finding_hashes(vulns)).duplicated(keep='last').to_numpy()
+        vulns = vulns[latest].reset_index(drop=True)
+        return vulns if columns is None else vulns[list(columns)]
+
+    def version(self):
+        """Identificador de la versión de los datos, o None si el almacén está vacío
+
+        Solo consulta el sistema de archivos (nombres y fechas de modificación),
+        así que es barato. Cambia cada vez que una escritura publica un archivo.
+        """
+        stamps = []
+        for path in glob.glob(os.path.join(self.root, 'vulnerabilities', 'scan_date=*', '*.parquet')):
+            try:
+                stamps.append(os.stat(path).st_mtime_ns)
+            except FileNotFoundError:
+                # Un delta borrado por una instantánea mientras se listaba
+                continue
+        if not stamps:
+            return None
+        return f"{len(stamps)}-{max(stamps)}"
+
+    def current_assets(self, scan_date=None):
+        """Inventario de activos vigente en scan_date (por defecto, el actual)
+
+        Cada partición de activos guarda el inventario completo de su fecha:
+        una instantánea lo reemplaza y un delta lo actualiza por asset_id.
+        """
+        dates = [d for d in self.scan_dates() if scan_date is None or d <= scan_date]
+        if not dates:
+            return self.read_assets(ASSETS_SCHEMA.names).iloc[:0]
+        return self.read_assets(ASSETS_SCHEMA.names, dates[-1], dates[-1])
+
+    @contextmanager
+    def write_lock(self, timeout=None, poll_interval=0.2):
+        """Exclusión entre procesos para las escrituras (archivo creado con O_EXCL)
+
+        write_delta lee el estado actual y escribe la diferencia, así que dos
+        imports simultáneos deben ir uno detrás de otro. Un lock más antiguo
+        que LOCK_STALE_SECONDS se considera abandonado por un proceso caído.
+        """
+
+        os.makedirs(self.root, exist_ok=True)
+        lock_file = os.path.join(self.root, LOCK_FILE)
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            try:
+                fd = os.open(lock_file, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+                break
+            except FileExistsError:
+                try:
+                    if time.time() - os.path.getmtime(lock_file) > LOCK_STALE_SECONDS:
+                        os.remove(lock_file)
+                        continue
+                except FileNotFoundError:
+                    continue
+                if deadline is not None and time.monotonic() > deadline:
+                    raise TimeoutError(f"El almacén {self.root} está bloqueado por otra escritura")
+                time.sleep(poll_interval)
+        try:
+            os.write(fd, str(os.getpid()).encode())
+            os.close(fd)
+            yield
+        finally:
+            os.remove(lock_file)
+
+    def drop_partitions_before(self, cutoff_date):
+        """Elimina las particiones con fecha de escaneo anterior a cutoff_date
+
+        Se borran directorios completos, sin reescribir archivos. Nunca se
+        eliminan la última instantánea completa ni sus deltas, que forman el
+        estado actual. Devuelve las fechas eliminadas.
+        """
+
+        cutoff_date = str(cutoff_date)[:10]
+        current = self._current_files()
+        if current:
+            base_date = os.path.basename(os.path.dirname(current[0])).split('=', 1)[1]
+            cutoff_date = min(cutoff_date, base_date)
+
+        dropped = [d for d in self.scan_dates() if d < cutoff_date]
+        for scan_date in dropped:
+            for table in ('assets', 'vulnerabilities'):
+                shutil.rmtree(self._partition(table, scan_date), ignore_errors=True)
+        return dropped
+
+    def rebuild_database(self):
+        """Carga en la base el estado actual completo como un import más"""
+        snapshot = self.load_snapshot()
+        vulns = snapshot['vulnerabilities']
+        with self.database.import_scan(self.scan_dates()[-1], 'full', 'Almacén existente', len(vulns)) as catalog:
+            catalog.add_assets(snapshot['assets'])
+            catalog.clear_findings()
+            catalog.count(vulns)
+            catalog.add_findings(vulns, finding_hashes(vulns))
+
+    def rebuild_risk(self):
+        """Recalcula el riesgo de todos los activos a partir del estado actual completo"""
+        self.risk.replace(risk_pairs(self.current_vulnerabilities()))
+
+    def _update_risk(self, stored, changes):
+        """Recalcula el riesgo solo de los activos con hallazgos que cambiaron en un delta"""
+        changes = [frame for frame in changes if len(frame)]
+        if not changes:
+            return
+        touched = pd.Index(pd.concat([frame['asset_id'].astype(str) for frame in changes]).unique())
+        # Estado actual de esos activos: lo almacenado con los cambios encima (gana el más reciente)
+        current = pd.concat([stored[stored['asset_id'].isin(touched)]] + changes, ignore_index=True)
+        current = current[~pd.Series(finding_hashes(current)).duplicated(keep='last').to_numpy()]
+        self.risk.recompute(current, touched)
+
+    def rebuild_rollups(self):
+        """Recalcula los agregados temporales a partir del estado actual completo"""
+        dates = self.scan_dates()
+        dimensions = self.rollups.dimensions()
+        if dates and not len(dimensions):
+            assets = self.read_assets(start_date=dates[-1], end_date=dates[-1])
+            dimensions = self.rollups.dimensions(assets)
+        counts = rollup_counts(self.current_vulnerabilities(), dimensions)
+        self.rollups.apply(counts, replace=True)
+
+    def read_vulnerabilities(self, columns=None, start_date=None, end_date=None, filter=None):
+        """Lee vulnerabilidades cargando solo las columnas y fechas pedidas
+
+        El rango de fechas descarta particiones completas y filter (expresión
+        de pyarrow.dataset) se evalúa sobre las estadísticas de cada archivo.
+        """
+        return self._read('vulnerabilities', columns, start_date, end_date, filter)
+
+    def read_assets(self, columns=None, start_date=None, end_date=None, filter=None):
+        """Lee activos cargando solo las columnas y fechas pedidas"""
+        return self._read('assets', columns, start_date, end_date, filter)
+
+    def scan_dates(self):
+        """Fechas de escaneo almacenadas, en orden ascendente"""
+        path = os.path.join(self.root, 'vulnerabilities')
+        if not os.path.isdir(path):
+            return []
+        return sorted(name.split('=', 1)[1] for name in os.listdir(path) if name.startswith('scan_date='))
+
+    def load_snapshot(self, scan_date=None, asset_columns=None, vuln_columns=None):
+        """Carga datos con el mismo formato que simulate_scan_data
+
+        Sin scan_date devuelve el estado actual (ver current_vulnerabilities);
+        con scan_date, el contenido tal cual de esa partición.
+        """
+
+        dates = self.scan_dates()
+        if not dates:
+            return None
+
+        if scan_date is None:
+            scan_date = dates[-1]
+            vulns = self.current_vulnerabilities(vuln_columns)
+        else:
+            vulns = self.read_vulnerabilities(vuln_columns, scan_date, scan_date).drop(
+                columns='scan_date', errors='ignore'
+            )
+
+        with open(os.path.join(self._partition('vulnerabilities', scan_date), '_scan_metadata.json')) as f:
+            metadata = json.load(f)
+
+        return {
+            'assets': self.read_assets(asset_columns, scan_date, scan_date).drop(columns='scan_date', errors='ignore'),
+            'vulnerabilities': vulns,
+            'scan_metadata': metadata
+        }
+
+    def _upsert_assets(self, scan_date, assets, compression):
+        """Actualiza el inventario de scan_date con assets; devuelve su archivo
+
+        Si ya hay fechas posteriores, sus inventarios solo ganan los activos
+        que no tenían: sus datos son más recientes que los de este escaneo.
+        """
+        assets_file = self._write_table('assets', scan_date, [upsert_assets(self.current_assets(scan_date), assets)],
+                                        ASSETS_SCHEMA, compression)
+        for later_date in [d for d in self.scan_dates() if d > scan_date]:
+            later = self.current_assets(later_date)
+            missing = assets[~assets['asset_id'].astype(str).isin(later['asset_id'].astype(str))]
+            if len(missing):
+                self._write_table('assets', later_date, [upsert_assets(missing, later)], ASSETS_SCHEMA, compression)
+        return assets_file
+
+    def _partition(self, table, scan_date):
+        return os.path.join(self.root, table, f"scan_date={scan_date}")
+
+    def _delta_files(self, scan_date):
+        return sorted(glob.glob(os.path.join(self._partition('vulnerabilities', scan_date), 'part-1-*.parquet')))
+
+    def _current_files(self):
+        """Archivos que forman el estado actual, del más antiguo al más reciente"""
+        dates = self.scan_dates()
+        full_dates = [d for d in dates
+                      if os.path.exists(os.path.join(self._partition('vulnerabilities', d), SNAPSHOT_FILE))]
+        if not full_dates:
+            return []
+
+        files = []
+        for scan_date in dates[dates.index(full_dates[-1]):]:
+            snapshot = os.path.join(self._partition('vulnerabilities', scan_date), SNAPSHOT_FILE)
+            if os.path.exists(snapshot):
+                files.append(snapshot)
+            files.extend(self._delta_files(scan_date))
+        return files
+
+    def _write_metadata(self, scan_date, metadata):
+        metadata_file = os.path.join(self._partition('vulnerabilities', scan_date), '_scan_metadata.json')
+        with open(metadata_file, 'w') as f:
+            json.dump(metadata, f, indent=2)
+        return metadata_file
+
+    def _write_table(self, table, scan_date, frames, schema, compression, file_name=SNAPSHOT_FILE):
+        """Escribe los lotes en un archivo temporal y lo publica de forma atómica (ver write_atomic)"""
+
+        def write(temp_file):
+            with pq.ParquetWriter(temp_file, schema, compression=compression) as writer:
+                for frame in frames:
+                    writer.write_table(pa.Table.from_pandas(frame[schema.names], schema=schema, preserve_index=False))
+
+        return write_atomic(os.path.join(self._partition(table, scan_date), file_name), write)
+
+    def _read(self, table, columns, start_date, end_date, filter):
+        path = os.path.join(self.root, table)
+        schema = (ASSETS_SCHEMA if table == 'assets' else VULNERABILITIES_SCHEMA).append(
+            pa.field('scan_date', pa.string())
+        )
+        if not os.path.isdir(path):
+            return schema.empty_table().to_pandas()[columns or schema.names]
+
+        expression = filter
+        if start_date is not None:
+            expression = _and(expression, ds.field('scan_date') >= str(start_date)[:10])
+        if end_date is not None:
+            expression = _and(expression, ds.field('scan_date') <= str(end_date)[:10])
+
+        dataset = ds.dataset(path, schema=schema, format='parquet', partitioning=PARTITIONING)
+        return dataset.to_table(columns=columns, filter=expression).to_pandas()
+
+
+def _and(left, right):
+    return right if left is None else left & right
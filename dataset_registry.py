@@ -0,0 +1,120 @@
+"""
+Módulo de registro de conjuntos de datos
+Instantáneas inmutables del estado actual en Arrow IPC, abiertas con memoria mapeada
+"""
+
+import json
+import os
+import shutil
+from datetime import datetime
+
+import pyarrow as pa
+
+from data_store import ScanDataStore
+
+SNAPSHOT_DIR = 'snapshots'
+TABLES = ('assets', 'vulnerabilities')
+
+
+class StaleVersionError(Exception):
+    """La versión pedida ya no es la del almacén: un import publicó otra después"""
+
+
+class DatasetRegistry:
+    """Instantáneas de solo lectura del almacén, una por versión de los datos
+
+    Estructura en disco:
+        <root>/snapshots/<versión>/assets.arrow
+        <root>/snapshots/<versión>/vulnerabilities.arrow
+        <root>/snapshots/<versión>/scan_metadata.json
+
+    Cada versión se materializa una vez (estado actual del almacén en Arrow
+    IPC sin comprimir) y después solo se abre: los buffers numéricos y los
+    índices de diccionario se leen directamente del archivo mapeado en
+    memoria, que comparten todas las sesiones y todos los procesos a través
+    de la caché de páginas del sistema.
+
+    Las versiones nunca se modifican (copy-on-write): un import genera una
+    versión nueva en un directorio temporal que se renombra al terminar, de
+    modo que un lector ve la versión anterior completa o la nueva completa.
+    Se conservan las keep más recientes; en POSIX un lector que aún tenga
+    mapeada una versión borrada sigue leyéndola sin errores.
+
+    El almacén se lee con su lock de escritura, así que nunca se materializa
+    un import a medias, y solo si sigue en la versión pedida: de lo contrario
+    los datos nuevos quedarían guardados con la etiqueta de la anterior.
+    """
+
+    def __init__(self, root='./data_store', keep=2):
+        self.store = ScanDataStore(root)
+        self.path = os.path.join(root, SNAPSHOT_DIR)
+        self.keep = keep
+
+    def open(self, version):
+        """Activos, vulnerabilidades y metadatos de la versión, con el formato de load_snapshot
+
+        Lanza StaleVersionError si la versión no está materializada y el
+        almacén ya tiene otra (ver ScanDataStore.version).
+        """
+        path = self._materialize(version)
+        data = {table: _read_mapped(os.path.join(path, f"{table}.arrow")) for table in TABLES}
+        with open(os.path.join(path, 'scan_metadata.json')) as f:
+            data['scan_metadata'] = json.load(f)
+        return data
+
+    def versions(self):
+        """Versiones materializadas, de la más antigua a la más reciente"""
+        if not os.path.isdir(self.path):
+            return []
+        entries = [e for e in os.scandir(self.path) if e.is_dir() and not e.name.endswith('.tmp')]
+        return [e.name for e in sorted(entries, key=lambda e: e.stat().st_mtime_ns)]
+
+    def _materialize(self, version):
+        path = os.path.join(self.path, version)
+        if os.path.isdir(path):
+            return path
+
+        with self.store.write_lock():
+            current = self.store.version()
+            if current is None:
+                raise ValueError(f"El almacén {self.store.root} está vacío")
+            if current != version:
+                raise StaleVersionError(f"La versión {version} ya no es la actual ({current})")
+            snapshot = self.store.load_snapshot()
+
+        temp_path = f"{path}.{os.getpid()}.{datetime.now():%Y%m%d%H%M%S%f}.tmp"
+        os.makedirs(temp_path)
+        for table in TABLES:
+            _write_ipc(os.path.join(temp_path, f"{table}.arrow"), snapshot[table])
+        with open(os.path.join(temp_path, 'scan_metadata.json'), 'w') as f:
+            json.dump(snapshot['scan_metadata'], f, indent=2)
+
+        try:
+            os.rename(temp_path, path)
+        except OSError:
+            # Otro proceso materializó la misma versión a la vez: vale la suya
+            shutil.rmtree(temp_path, ignore_errors=True)
+        self._prune(version)
+        return path
+
+    def _prune(self, current):
+        """Borra las versiones más antiguas, conservando current y hasta keep en total"""
+        others = [v for v in self.versions() if v != current]
+        for version in others[:max(len(others) - (self.keep - 1), 0)]:
+            shutil.rmtree(os.path.join(self.path, version), ignore_errors=True)
+
+
+def _write_ipc(path, frame):
+    table = pa.Table.from_pandas(frame, preserve_index=False)
+    with pa.OSFile(path, 'wb') as sink, pa.ipc.new_file(sink, table.schema) as writer:
+        writer.write_table(table)
+
+
+def _read_mapped(path):
+    """DataFrame sobre un archivo Arrow IPC mapeado en memoria
+
+    split_blocks evita consolidar columnas en bloques 2D (que obliga a
+    copiarlas), así que las numéricas sin nulos quedan como vistas del mapa.
+    """
+    table = pa.ipc.open_file(pa.memory_map(path, 'r')).read_all()
+    return table.to_pandas(split_blocks=True)
@@ -0,0 +1,23 @@
+"""
+Módulo de claves de hallazgos
+Huella de la clave que identifica un hallazgo, común al importador y al almacén
+"""
+
+import numpy as np
+import pandas as pd
+
+# Clave que identifica un hallazgo entre escaneos
+FINDING_KEY = ['asset_id', 'plugin_id', 'cve_id']
+
+
+def finding_hashes(vulnerabilities):
+    """Huella uint64 de la clave (asset_id, plugin_id, cve_id) de cada hallazgo"""
+    return pd.util.hash_pandas_object(vulnerabilities[FINDING_KEY], index=False).to_numpy()
+
+
+def sorted_contains(sorted_hashes, hashes):
+    """Pertenencia de hashes a un array ordenado mediante búsqueda binaria"""
+    if len(sorted_hashes) == 0:
+        return np.zeros(len(hashes), dtype=bool)
+    positions = np.searchsorted(sorted_hashes, hashes).clip(max=len(sorted_hashes) - 1)
+    return sorted_hashes[positions] == hashes
@@ -0,0 +1,329 @@
+"""
+Módulo de base de datos local de hallazgos
+Catálogo SQLite de escaneos importados, activos y hallazgos, compartido por todas las sesiones
+"""
+
+import os
+import queue
+import sqlite3
+from contextlib import contextmanager
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from aggregations import asset_types
+
+DB_FILE = 'findings.db'
+
+# Filas por executemany; cada lote se inserta dentro de la transacción del import
+INSERT_BATCH = 50_000
+
+# A partir de estas filas los índices de findings se rehacen al final en vez de
+# mantenerse fila a fila (varias veces más rápido en cargas grandes)
+BULK_LOAD_ROWS = 100_000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS scans (
+    scan_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    scan_date TEXT NOT NULL,
+    imported_at TEXT NOT NULL,
+    source TEXT,
+    import_mode TEXT NOT NULL,
+    assets INTEGER NOT NULL DEFAULT 0,
+    new_assets INTEGER NOT NULL DEFAULT 0,
+    findings INTEGER NOT NULL DEFAULT 0,
+    critical INTEGER NOT NULL DEFAULT 0,
+    hidden INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS scans_date ON scans (scan_date);
+
+CREATE TABLE IF NOT EXISTS assets (
+    asset_id TEXT PRIMARY KEY,
+    ip_address TEXT,
+    hostname TEXT,
+    os TEXT,
+    last_scanned TEXT,
+    status TEXT,
+    asset_type TEXT,
+    first_scan_id INTEGER NOT NULL REFERENCES scans (scan_id),
+    last_scan_id INTEGER NOT NULL REFERENCES scans (scan_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS assets_ip ON assets (ip_address);
+CREATE INDEX IF NOT EXISTS assets_hostname ON assets (hostname);
+
+CREATE TABLE IF NOT EXISTS findings (
+    finding_key INTEGER PRIMARY KEY,
+    asset_id TEXT NOT NULL,
+    cve_id TEXT,
+    plugin_id TEXT,
+    severity TEXT,
+    cvss_score REAL,
+    description TEXT,
+    discovery_date TEXT,
+    remediated INTEGER NOT NULL,
+    first_scan_id INTEGER NOT NULL REFERENCES scans (scan_id),
+    last_scan_id INTEGER NOT NULL REFERENCES scans (scan_id)
+);
+"""
+
+FINDING_INDEXES = {
+    'findings_asset': 'asset_id',
+    'findings_cve': 'cve_id',
+    'findings_discovery': 'discovery_date'
+}
+
+ASSET_FIELDS = ['asset_id', 'ip_address', 'hostname', 'os', 'last_scanned', 'status', 'asset_type']
+FINDING_FIELDS = ['asset_id', 'cve_id', 'plugin_id', 'severity', 'cvss_score', 'description', 'discovery_date',
+                  'remediated']
+
+_FINDING_UPDATES = ', '.join(f"{f} = excluded.{f}" for f in FINDING_FIELDS[1:])
+_ASSET_UPDATES = ', '.join(f"{f} = excluded.{f}" for f in ASSET_FIELDS[1:])
+
+
+class ConnectionPool:
+    """Pool de conexiones SQLite reutilizables entre hilos
+
+    Las conexiones se crean bajo demanda (como mucho size abiertas en
+    reposo) en modo WAL, de modo que las lecturas de las páginas no
+    bloquean a un import en curso ni a otro proceso (el demonio).
+    """
+
+    def __init__(self, path, size=4, timeout=30.0):
+        self.path = path
+        self.timeout = timeout
+        self._idle = queue.LifoQueue(maxsize=size)
+
+    @contextmanager
+    def connection(self):
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            conn = self._connect()
+        try:
+            yield conn
+        finally:
+            try:
+                self._idle.put_nowait(conn)
+            except queue.Full:
+                conn.close()
+
+    def close(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=self.timeout, check_same_thread=False, isolation_level=None)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.execute('PRAGMA foreign_keys=ON')
+        conn.execute('PRAGMA cache_size=-65536')
+        return conn
+
+
+class ScanWriter:
+    """Escribe un import dentro de una única transacción (ver FindingsDatabase.import_scan)"""
+
+    def __init__(self, conn, scan_id, expected_rows=0):
+        self.conn = conn
+        self.scan_id = scan_id
+        self.assets = 0
+        self.new_assets = 0
+        self.findings = 0
+        self.critical = 0
+        self.bulk = False
+        self._expected_rows = expected_rows
+        self._added = 0
+        if expected_rows is not None and expected_rows >= BULK_LOAD_ROWS:
+            self._start_bulk()
+
+    def add_assets(self, assets):
+        """Alta o actualización de activos; cuenta los que no existían"""
+        before = self.conn.execute('SELECT COUNT(*) FROM assets').fetchone()[0]
+        rows = _rows(assets.assign(asset_type=asset_types(assets)), ASSET_FIELDS)
+        sql = (f"INSERT INTO assets ({', '.join(ASSET_FIELDS)}, first_scan_id, last_scan_id) "
+               f"VALUES ({', '.join('?' * len(ASSET_FIELDS))}, {self.scan_id}, {self.scan_id}) "
+               f"ON CONFLICT (asset_id) DO UPDATE SET {_ASSET_UPDATES}, last_scan_id = excluded.last_scan_id")
+        for start in range(0, len(rows), INSERT_BATCH):
+            self.conn.executemany(sql, rows[start:start + INSERT_BATCH])
+        self.assets += len(assets)
+        self.new_assets += self.conn.execute('SELECT COUNT(*) FROM assets').fetchone()[0] - before
+
+    def add_findings(self, findings, keys):
+        """Alta o actualización de hallazgos; keys es su huella (finding_keys.finding_hashes)
+
+        No cuenta para los totales del import: un delta solo guarda los cambios.
+        Las filas se insertan ordenadas por clave, que es el orden de la tabla.
+        """
+        self._added += len(findings)
+        if self._expected_rows is None and not self.bulk and self._added >= BULK_LOAD_ROWS:
+            self._start_bulk()
+        keys = np.asarray(keys, dtype=np.uint64).view(np.int64)
+        order = np.argsort(keys, kind='stable')
+        rows = [(key,) + row for key, row in zip(keys[order].tolist(),
+                                                  _rows(findings.iloc[order], FINDING_FIELDS))]
+        sql = (f"INSERT INTO findings (finding_key, {', '.join(FINDING_FIELDS)}, first_scan_id, last_scan_id) "
+               f"VALUES (?, {', '.join('?' * len(FINDING_FIELDS))}, {self.scan_id}, {self.scan_id}) "
+               f"ON CONFLICT (finding_key) DO UPDATE SET {_FINDING_UPDATES}, last_scan_id = excluded.last_scan_id")
+        for start in range(0, len(rows), INSERT_BATCH):
+            self.conn.executemany(sql, rows[start:start + INSERT_BATCH])
+
+    def count(self, findings):
+        """Suma un lote del escaneo a los totales del import (se guarden o no sus filas)"""
+        self.findings += len(findings)
+        self.critical += int((findings['severity'].astype(str) == 'Critical').sum())
+
+    def clear_findings(self):
+        """Vacía los hallazgos: una instantánea completa sustituye al estado anterior"""
+        self.conn.execute('DELETE FROM findings')
+
+    def _start_bulk(self):
+        """Elimina los índices de findings hasta el final de la carga (ver import_scan)"""
+        for name in FINDING_INDEXES:
+            self.conn.execute(f'DROP INDEX IF EXISTS {name}')
+        self.bulk = True
+
+
+class FindingsDatabase:
+    """Base de datos SQLite junto al almacén de escaneos
+
+    Estructura en disco:
+        <root>/findings.db (tablas scans, assets y findings)
+
+    Refleja el estado actual del almacén Parquet (ScanDataStore la actualiza
+    en cada escritura) y guarda el catálogo de imports, que así es común a
+    todas las sesiones y sobrevive a los reinicios. Las métricas y gráficos
+    siguen calculándose sobre el Parquet; la base sirve los listados de
+    hallazgos (por activo y por los filtros del panel detallado).
+    """
+
+    def __init__(self, root='./data_store', pool_size=4):
+        os.makedirs(root, exist_ok=True)
+        self.path = os.path.join(root, DB_FILE)
+        self.pool = ConnectionPool(self.path, pool_size)
+        with self.pool.connection() as conn:
+            conn.executescript(SCHEMA)
+            _add_asset_types(conn)
+            _create_finding_indexes(conn)
+
+    @contextmanager
+    def import_scan(self, scan_date, import_mode, source=None, expected_rows=0):
+        """Transacción de un import: crea su fila en scans y devuelve un ScanWriter
+
+        Si el bloque falla no queda nada del import en la base. Con
+        expected_rows >= BULK_LOAD_ROWS los índices de findings se eliminan
+        durante la carga y se vuelven a crear antes de confirmarla; con
+        expected_rows=None (tamaño desconocido) se eliminan en cuanto las filas
+        añadidas llegan a BULK_LOAD_ROWS.
+        """
+        with self.pool.connection() as conn:
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                scan_id = conn.execute(
+                    'INSERT INTO scans (scan_date, imported_at, source, import_mode) VALUES (?, ?, ?, ?)',
+                    (scan_date, datetime.now().isoformat(timespec='seconds'), source, import_mode)
+                ).lastrowid
+                writer = ScanWriter(conn, scan_id, expected_rows)
+                yield writer
+                if writer.bulk:
+                    _create_finding_indexes(conn)
+                conn.execute(
+                    'UPDATE scans SET assets = ?, new_assets = ?, findings = ?, critical = ? WHERE scan_id = ?',
+                    (writer.assets, writer.new_assets, writer.findings, writer.critical, scan_id)
+                )
+                conn.execute('COMMIT')
+            except BaseException:
+                conn.execute('ROLLBACK')
+                raise
+
+    def query(self, sql, params=()):
+        """Resultado de una consulta de lectura como DataFrame"""
+        with self.pool.connection() as conn:
+            return pd.read_sql_query(sql, conn, params=params)
+
+    def scans(self, limit=50, include_hidden=False):
+        """Imports registrados, del más reciente al más antiguo"""
+        where = '' if include_hidden else 'WHERE hidden = 0'
+        return self.query(f'SELECT * FROM scans {where} ORDER BY scan_id DESC LIMIT ?', (limit,))
+
+    def hide_scan(self, scan_id):
+        """Quita un import de la lista (sus datos siguen en el almacén)"""
+        with self.pool.connection() as conn:
+            conn.execute('UPDATE scans SET hidden = 1 WHERE scan_id = ?', (int(scan_id),))
+
+    def asset_findings(self, asset_id, open_only=False):
+        """Hallazgos de un activo, de mayor a menor CVSS"""
+        where = 'AND remediated = 0' if open_only else ''
+        return self.query(
+            f'SELECT * FROM findings WHERE asset_id = ? {where} ORDER BY cvss_score DESC', (asset_id,)
+        )
+
+    def findings(self, start_date=None, end_date=None, severities=None, asset_types=None, min_cvss=None,
+                 limit=1000):
+        """Hallazgos que cumplen los filtros, de mayor a menor CVSS (como mucho limit)
+
+        Los filtros son los de query_engine.VulnerabilityIndex.query: fechas de
+        descubrimiento inclusivas, severities con los valores de SEVERITIES y
+        asset_types con los de ASSET_TYPES; un filtro en None no restringe.
+        Cada hallazgo lleva la IP y el hostname de su activo.
+        """
+        conditions, params = [], []
+        if start_date is not None:
+            conditions.append('f.discovery_date >= ?')
+            params.append(str(start_date)[:10])
+        if end_date is not None:
+            conditions.append('f.discovery_date <= ?')
+            params.append(str(end_date)[:10])
+        for column, values in (('f.severity', severities), ('a.asset_type', asset_types)):
+            if values is not None:
+                conditions.append(f"{column} IN ({', '.join('?' * len(values))})")
+                params.extend(values)
+        if min_cvss is not None:
+            conditions.append('f.cvss_score >= ?')
+            params.append(float(min_cvss))
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+        return self.query(
+            f'SELECT a.ip_address, a.hostname, f.* FROM findings f JOIN assets a USING (asset_id) {where} '
+            f'ORDER BY f.cvss_score DESC LIMIT ?', (*params, int(limit))
+        )
+
+    def close(self):
+        self.pool.close()
+
+
+def _add_asset_types(conn):
+    """Añade y rellena la columna asset_type en bases creadas antes de que existiera"""
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        columns = {row[1] for row in conn.execute('PRAGMA table_info(assets)')}
+        if 'asset_type' not in columns:
+            conn.execute('ALTER TABLE assets ADD COLUMN asset_type TEXT')
+            assets = pd.read_sql_query('SELECT asset_id, hostname, os FROM assets', conn)
+            conn.executemany('UPDATE assets SET asset_type = ? WHERE asset_id = ?',
+                             zip(asset_types(assets).tolist(), assets['asset_id'].tolist()))
+        conn.execute('CREATE INDEX IF NOT EXISTS assets_type ON assets (asset_type)')
+        conn.execute('COMMIT')
+    except BaseException:
+        conn.execute('ROLLBACK')
+        raise
+
+
+def _create_finding_indexes(conn):
+    for name, columns in FINDING_INDEXES.items():
+        conn.execute(f'CREATE INDEX IF NOT EXISTS {name} ON findings ({columns})')
+
+
+def _rows(frame, fields):
+    """Filas como tuplas de tipos nativos de Python (NaN y categorías vacías pasan a NULL)"""
+    columns = []
+    for field in fields:
+        values = frame[field] if field in frame else pd.Series(None, index=frame.index)
+        if pd.api.types.is_bool_dtype(values):
+            values = values.astype(np.int64)
+        elif not pd.api.types.is_numeric_dtype(values):
+            values = values.astype(object)
+        columns.append(values.astype(object).where(values.notna(), None).tolist())
+    return list(zip(*columns))
@@ -0,0 +1,305 @@
+"""
+Módulo de trabajos en segundo plano
+Ejecuta imports, sincronizaciones y reportes fuera del hilo del script de Streamlit
+"""
+
+import itertools
+import multiprocessing
+import os
+import shutil
+import tempfile
+import threading
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from datetime import datetime
+
+from cve_index import CveIndex
+from data_store import ScanDataStore
+from sync_daemon import run_sync
+from tenable_importer import TenableDataImporter
+
+# Estados de un trabajo y su texto en la interfaz
+JOB_STATUSES = {
+    'pending': '⏳ En cola',
+    'running': '🔄 En curso',
+    'done': '✅ Completado',
+    'failed': '❌ Fallido'
+}
+
+class Job:
+    """Estado de un trabajo; lo actualiza el hilo que lo ejecuta y lo leen las páginas"""
+
+    def __init__(self, job_id, kind, description):
+        self.id = job_id
+        self.kind = kind
+        self.description = description
+        self.status = 'pending'
+        self.progress = 0.0
+        self.message = ''
+        self.result = None
+        self.error = None
+        self.submitted_at = datetime.now()
+        self.started_at = None
+        self.finished_at = None
+
+    @property
+    def finished(self):
+        return self.status in ('done', 'failed')
+
+    def update(self, progress=None, message=None):
+        """Informa del avance (0-1) y de un texto de estado"""
+        if progress is not None:
+            self.progress = min(max(float(progress), 0.0), 1.0)
+        if message is not None:
+            self.message = message
+
+
+class JobRunner:
+    """Pool de hilos con un registro de trabajos consultable
+
+    Pensado para vivir en st.cache_resource: es compartido por todas las
+    sesiones y sobrevive a las re-ejecuciones del script. Los trabajos
+    terminados se conservan hasta superar max_finished.
+    """
+
+    def __init__(self, max_workers=4, max_finished=50):
+        self.max_finished = max_finished
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='dashboard-job')
+        self._jobs = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def submit(self, kind, description, func, *args, **kwargs):
+        """Encola func(job, *args, **kwargs) y devuelve el Job que lo sigue"""
+        with self._lock:
+            job = Job(f"{kind}-{next(self._ids)}", kind, description)
+            self._jobs[job.id] = job
+            self._prune()
+        self._executor.submit(self._run, job, func, args, kwargs)
+        return job
+
+    def get(self, job_id):
+        return self._jobs.get(job_id)
+
+    def jobs(self, kind=None, active_only=False):
+        """Trabajos registrados, del más reciente al más antiguo"""
+        with self._lock:
+            jobs = list(self._jobs.values())
+        jobs = [j for j in jobs if (kind is None or j.kind == kind) and not (active_only and j.finished)]
+        return sorted(jobs, key=lambda j: j.submitted_at, reverse=True)
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait)
+
+    def _run(self, job, func, args, kwargs):
+        job.status = 'running'
+        job.started_at = datetime.now()
+        try:
+            job.result = func(job, *args, **kwargs)
+            job.update(progress=1.0)
+            job.status = 'done'
+        except Exception as e:
+            job.error = f"{type(e).__name__}: {e}"
+            job.message = traceback.format_exc(limit=3)
+            job.status = 'failed'
+        finally:
+            job.finished_at = datetime.now()
+
+    def _prune(self):
+        finished = sorted((j for j in self._jobs.values() if j.finished), key=lambda j: j.finished_at)
+        for job in finished[:max(len(finished) - self.max_finished, 0)]:
+            del self._jobs[job.id]
+
+
+def import_file_job(job, source, filename, store_dir, process_mode='Importación completa', deduplicate=True,
+                    validate_cves=False, nvd_feed_dir=None):
+    """Importa un archivo subido y lo guarda en el almacén
+
+    source es una ruta o un objeto tipo archivo (el UploadedFile de Streamlit)
+    y se lee por lotes sin copiarlo. process_mode acepta los modos de la página
+    de importación. Devuelve las estadísticas que muestra la página al terminar.
+    """
+
+    def progress(bytes_read, total_bytes, rows):
+        job.update(0.9 * bytes_read / total_bytes if total_bytes else None,
+                   f"{rows:,} registros ({bytes_read / 1024 / 1024:.1f} de {total_bytes / 1024 / 1024:.1f} MB)")
+
+    data = TenableDataImporter().ingest_file(source, filename, progress_callback=progress,
+                                             deduplicate=deduplicate)
+    return _store_import(job, data, filename, store_dir, process_mode, deduplicate, validate_cves, nvd_feed_dir)
+
+
+def import_files_job(job, files, store_dir, process_mode='Importación completa', deduplicate=True,
+                     validate_cves=False, nvd_feed_dir=None, max_workers=None):
+    """Importa varios archivos subidos [(nombre, ruta o archivo)] como un único escaneo
+
+    Los archivos se leen en paralelo en un pool de procesos (uno por núcleo
+    como mucho); los que no son rutas se vuelcan antes a temporales para no
+    pasarlos enteros a cada proceso. Se unen con merge_scans en el orden de subida y se guardan
+    en una sola escritura. El resultado añade el ritmo de lectura de cada
+    archivo a las estadísticas de import_file_job.
+    """
+
+    workers = max(min(max_workers or os.cpu_count() or 1, len(files)), 1)
+    scans = [None] * len(files)
+    file_stats = [None] * len(files)
+    started = time.perf_counter()
+
+    def collect(position, scan, seconds):
+        filename, source = files[position]
+        scans[position] = scan
+        records = len(scan['vulnerabilities'])
+        size = _source_size(source)
+        file_stats[position] = {
+            'filename': filename,
+            'bytes': size,
+            'records': records,
+            'seconds': round(seconds, 3),
+            'rows_per_s': round(records / seconds, 1) if seconds else None,
+            'bytes_per_s': round(size / seconds, 1) if seconds else None
+        }
+        done = sum(scan is not None for scan in scans)
+        job.update(0.8 * done / len(files), f"{done} de {len(files)} archivos leídos ({filename})")
+
+    if workers == 1:
+        # Con un solo núcleo el pool solo añadiría el arranque de procesos y la copia de resultados
+        for position, (filename, source) in enumerate(files):
+            collect(position, *_parse_file(source, filename, deduplicate))
+    else:
+        # spawn: el proceso del dashboard tiene hilos y fork no es seguro con ellos
+        with tempfile.TemporaryDirectory(prefix='dashboard-import-') as spool_dir, \
+                ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn')) as executor:
+            futures = {executor.submit(_parse_file, _spool(source, spool_dir, position), filename, deduplicate): position
+                       for position, (filename, source) in enumerate(files)}
+            for future in as_completed(futures):
+                collect(futures[future], *future.result())
+
+    job.update(0.85, "Uniendo archivos...")
+    data = TenableDataImporter().merge_scans(scans, deduplicate=deduplicate)
+    parse_s = time.perf_counter() - started
+
+    names = ', '.join(filename for filename, _ in files)
+    result = _store_import(job, data, names, store_dir, process_mode, deduplicate, validate_cves, nvd_feed_dir)
+    result.update(files=file_stats, workers=workers, parse_s=round(parse_s, 3),
+                  rows_per_s=round(len(data['vulnerabilities']) / parse_s, 1) if parse_s else None)
+    return result
+
+
+def _parse_file(source, filename, deduplicate):
+    """Lee un archivo en un proceso del pool; devuelve el escaneo y los segundos empleados"""
+    started = time.perf_counter()
+    data = TenableDataImporter().ingest_file(source, filename, deduplicate=deduplicate)
+    return data, time.perf_counter() - started
+
+
+def _is_path(source):
+    return isinstance(source, (str, bytes)) or hasattr(source, '__fspath__')
+
+
+def _spool(source, spool_dir, position):
+    """Ruta de source; si es un objeto tipo archivo se copia por bloques a spool_dir"""
+    if _is_path(source):
+        return source
+    path = os.path.join(spool_dir, str(position))
+    source.seek(0)
+    with open(path, 'wb') as spooled:
+        shutil.copyfileobj(source, spooled, 1 << 20)
+    return path
+
+
+def _source_size(source):
+    """Tamaño en bytes de una ruta o de un objeto tipo archivo"""
+    if _is_path(source):
+        return os.path.getsize(source)
+    size = getattr(source, 'size', None)
+    return size if size is not None else source.seek(0, os.SEEK_END)
+
+
+def _store_import(job, data, filename, store_dir, process_mode, deduplicate, validate_cves, nvd_feed_dir):
+    """Valida las CVE si se pidió, guarda el escaneo y resume el import"""
+    data['scan_metadata']['source_file'] = filename
+
+    cve_stats = None
+    if validate_cves:
+        job.update(message="Validando CVE...")
+        cve_index = CveIndex.from_feed_dir(nvd_feed_dir)
+        if cve_index is not None:
+            data['vulnerabilities'], cve_stats = cve_index.validate(data['vulnerabilities'])
+
+    job.update(0.95, "Guardando en el almacén...")
+    stored = _write(store_dir, data, process_mode)
+
+    vulns = data['vulnerabilities']
+    return {
+        'filename': filename,
+        'records': len(vulns),
+        'unique_cves': int(vulns['cve_id'].nunique()),
+        'new_assets': stored['new_assets'],
+        'critical_count': data['scan_metadata']['critical_count'],
+        'duplicates_dropped': data['scan_metadata']['duplicates_dropped'] if deduplicate else None,
+        'cve_stats': cve_stats,
+        'validate_cves': validate_cves,
+        'stored': stored
+    }
+
+
+def api_job(job, store_dir, url, access_key, secret_key, days_back=30, num_assets=500, filters=None,
+            max_findings=None, requests_per_second=10.0):
+    """Importa una exportación de la API de Tenable como actualización incremental"""
+
+    importer = TenableDataImporter()
+    importer.connect(access_key, secret_key, url, requests_per_second=requests_per_second)
+    try:
+        data = importer.import_from_api(
+            days_back=days_back, filters=filters, num_assets=num_assets, max_findings=max_findings,
+            progress_callback=lambda chunks, rows: job.update(message=f"{chunks:,} chunks, {rows:,} hallazgos")
+        )
+    finally:
+        importer.client.close()
+
+    # La exportación trae el estado de cada hallazgo (FIXED incluido) y puede estar
+    # filtrada o recortada: lo que no aparece no se da por remediado
+    job.update(0.95, "Guardando en el almacén...")
+    stored = _write(store_dir, data, "Actualización incremental", include_remediated=False)
+    return {'total_vulnerabilities': len(data['vulnerabilities']), 'stored': stored,
+            'api_stats': data['scan_metadata']['api_stats']}
+
+
+def sync_job(job, store_dir):
+    """Sincronización manual con la configuración guardada (la misma que ejecuta el demonio)"""
+    run = run_sync(store_dir, progress_callback=job.update)
+    if run['status'] == 'failed':
+        raise RuntimeError(run['error'])
+    return {'run': run}
+
+
+def report_job(job, data, output_dir='./exports', batch_size=100_000):
+    """Exporta el conjunto de datos a CSV y calcula su reporte en la misma pasada"""
+
+    vulns = data['vulnerabilities']
+    total = max(len(vulns), 1)
+
+    def batches():
+        for start in range(0, len(vulns), batch_size):
+            batch = vulns.iloc[start:start + batch_size]
+            job.update((start + len(batch)) / total, f"Exportando... {start + len(batch):,} hallazgos")
+            yield batch
+
+    return TenableDataImporter().export_to_csv(dict(data, vulnerabilities=batches()), output_dir,
+                                                with_report=True)
+
+
+def _write(store_dir, data, process_mode, include_remediated=None):
+    """Guarda en el almacén según el modo: completo reemplaza, el resto escribe el delta
+
+    include_remediated sustituye al valor que implica el modo (ver write_delta).
+    """
+    store = ScanDataStore(store_dir)
+    # Los imports se procesan en paralelo, pero escriben de uno en uno
+    with store.write_lock():
+        if process_mode == "Importación completa":
+            return store.write_snapshot(data)
+        incremental = process_mode == "Actualización incremental"
+        return store.write_delta(data, include_updated=incremental,
+                                 include_remediated=incremental if include_remediated is None else include_remediated)
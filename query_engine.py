@@ -0,0 +1,95 @@
+"""
+Módulo de consultas sobre vulnerabilidades
+Índices por columna para resolver los filtros del dashboard sin recorrer el DataFrame
+"""
+
+import numpy as np
+import pandas as pd
+
+from aggregations import ASSET_TYPES, asset_types, date_days, severity_codes
+from tenable_importer import SEVERITIES
+
+
+class VulnerabilityIndex:
+    """Índices precalculados sobre el DataFrame de vulnerabilidades
+
+    - Fechas de descubrimiento ordenadas: los rangos se resuelven por bisección.
+    - Severidad y tipo de activo: un bitmap empaquetado (1 bit por fila) por valor.
+    - CVSS ordenado: el mínimo se resuelve por bisección.
+
+    Cada filtro produce un bitmap y la combinación es su intersección (AND bit
+    a bit), de modo que nunca se evalúan condiciones fila a fila.
+    """
+
+    def __init__(self, data):
+        self.data = data
+        vulns = data['vulnerabilities']
+        self.size = len(vulns)
+
+        days = date_days(vulns['discovery_date'])
+        self._date_order = np.argsort(days, kind='stable')
+        self._sorted_days = days[self._date_order]
+
+        cvss = vulns['cvss_score'].to_numpy(dtype=np.float64)
+        self._cvss_order = np.argsort(cvss, kind='stable')
+        self._sorted_cvss = cvss[self._cvss_order]
+
+        severity = severity_codes(vulns['severity'])
+        self._severity_bitmaps = {sev: np.packbits(severity == i) for i, sev in enumerate(SEVERITIES)}
+
+        # Tipo de activo de cada hallazgo a través de la tabla de activos
+        assets = data['assets']
+        types = pd.Series(asset_types(assets).to_numpy(), index=assets['asset_id'].astype(str))
+        types = types[~types.index.duplicated(keep='last')]
+        codes, uniques = pd.factorize(pd.Series(vulns['asset_id']))
+        finding_types = np.append(types.reindex(pd.Index(uniques).astype(str)).to_numpy(), None)[codes]
+        self._asset_type_bitmaps = {t: np.packbits(finding_types == t) for t in ASSET_TYPES}
+
+    def query(self, start_date=None, end_date=None, severities=None, asset_types=None, min_cvss=None):
+        """Posiciones (ordenadas) de las filas que cumplen todos los filtros indicados
+
+        severities usa los valores de SEVERITIES y asset_types los de ASSET_TYPES;
+        un filtro en None no restringe.
+        """
+
+        bitmaps = []
+        if start_date is not None or end_date is not None:
+            lo = 0 if start_date is None else np.searchsorted(self._sorted_days, _day(start_date), 'left')
+            hi = self.size if end_date is None else np.searchsorted(self._sorted_days, _day(end_date), 'right')
+            bitmaps.append(self._rows_bitmap(self._date_order[lo:hi]))
+        if severities is not None:
+            bitmaps.append(self._union(self._severity_bitmaps, severities))
+        if asset_types is not None:
+            bitmaps.append(self._union(self._asset_type_bitmaps, asset_types))
+        if min_cvss is not None:
+            lo = np.searchsorted(self._sorted_cvss, min_cvss, 'left')
+            hi = np.searchsorted(self._sorted_cvss, np.inf, 'right')  # los NaN quedan al final
+            bitmaps.append(self._rows_bitmap(self._cvss_order[lo:hi]))
+
+        if not bitmaps:
+            return np.arange(self.size)
+        combined = bitmaps[0]
+        for bitmap in bitmaps[1:]:
+            combined = combined & bitmap
+        return np.flatnonzero(np.unpackbits(combined, count=self.size))
+
+    def filter(self, **filters):
+        """Mismo formato que simulate_scan_data con solo las vulnerabilidades filtradas"""
+        rows = self.query(**filters)
+        return dict(self.data, vulnerabilities=self.data['vulnerabilities'].iloc[rows])
+
+    def _rows_bitmap(self, rows):
+        mask = np.zeros(self.size, dtype=bool)
+        mask[rows] = True
+        return np.packbits(mask)
+
+    def _union(self, bitmaps, values):
+        result = np.zeros((self.size + 7) // 8, dtype=np.uint8)
+        for value in values:
+            if value in bitmaps:
+                result |= bitmaps[value]
+        return result
+
+
+def _day(value):
+    return int(date_days([value])[0])
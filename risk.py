@@ -0,0 +1,283 @@
+"""
+Módulo de riesgo y priorización
+Puntuación de riesgo por activo y prioridad por activo y CVE, calculadas en bloque sobre los arrays de hallazgos
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+
+from aggregations import asset_summary, date_days, severity_codes
+from atomic_files import write_atomic
+
+# Peso de cada severidad, en el orden de SEVERITIES (Info no suma riesgo)
+SEVERITY_WEIGHTS = np.array([1.0, 0.75, 0.45, 0.15, 0.0])
+
+# Reparto de la puntuación base de un hallazgo entre CVSS y severidad
+CVSS_SHARE = 0.6
+
+# La puntuación base se eleva a este exponente para que los hallazgos leves
+# apenas sumen: un Critical con CVSS 9 vale ~0.83, un Medium con CVSS 5 ~0.11
+BASE_EXPONENT = 3
+
+# Peso del estado del activo; los estados desconocidos cuentan como Active
+STATUS_WEIGHTS = {'Active': 1.0, 'Inactive': 0.6, 'Quarantined': 0.3}
+
+# La antigüedad y la exposición suben la prioridad hasta saturar en estos valores
+AGE_SATURATION_DAYS = 90
+EXPOSURE_SATURATION = 50
+
+# Umbrales de la columna Estado según el riesgo del activo (0-100)
+RISK_LEVELS = [(70, '🔴 Crítico'), (40, '🟡 Riesgo')]
+LOW_RISK_LABEL = '🟢 Seguro'
+
+# Columnas de los pares activo-CVE que guarda RiskStore (ver risk_pairs)
+PAIR_COLUMNS = ['asset_id', 'cve_id', 'base', 'cvss_score', 'description', 'first_day', 'open']
+PAIR_CATEGORIES = ['asset_id', 'cve_id', 'description']
+
+# Puntuación base máxima: log1p(-1) no es finito
+_MAX_BASE = 0.999
+
+
+def finding_base(vulnerabilities):
+    """Puntuación base (0-1) de cada hallazgo a partir de su CVSS y su severidad"""
+    cvss = np.nan_to_num(pd.to_numeric(vulnerabilities['cvss_score'], errors='coerce').to_numpy(dtype=np.float64))
+    severity = severity_codes(vulnerabilities['severity'])
+    weight = np.append(SEVERITY_WEIGHTS, 0.0)[severity]
+    base = CVSS_SHARE * np.clip(cvss, 0, 10) / 10 + (1 - CVSS_SHARE) * weight
+    return np.clip(base ** BASE_EXPONENT, 0, _MAX_BASE)
+
+
+def risk_pairs(vulnerabilities):
+    """Hallazgos abiertos agregados por activo y CVE
+
+    Cada par guarda la puntuación base máxima de sus hallazgos, con el CVSS y
+    la descripción de ese hallazgo, el día de descubrimiento más antiguo (-1
+    si no se conoce) y su número de hallazgos abiertos. Los hallazgos sin CVE
+    de un activo forman un par con cve_id nulo. Los pares de varios bloques
+    se combinan con merge_pairs.
+    """
+    vulns = vulnerabilities[~vulnerabilities['remediated'].to_numpy(dtype=bool)]
+    return merge_pairs([pd.DataFrame({
+        'asset_id': vulns['asset_id'].to_numpy(dtype=object),
+        'cve_id': vulns['cve_id'].to_numpy(dtype=object),
+        'base': finding_base(vulns),
+        'cvss_score': pd.to_numeric(vulns['cvss_score'], errors='coerce').to_numpy(dtype=np.float64),
+        'description': vulns['description'].to_numpy(dtype=object),
+        'first_day': date_days(vulns['discovery_date']),
+        'open': np.ones(len(vulns), dtype=np.int64)
+    })])
+
+
+def merge_pairs(frames):
+    """Combina resultados de risk_pairs: base máxima, día más antiguo y suma de abiertos por par"""
+    frames = [frame for frame in frames if len(frame)]
+    if not frames:
+        return _empty_pairs()
+    pairs = pd.concat(frames, ignore_index=True)
+    asset_codes, _ = pd.factorize(pairs['asset_id'], use_na_sentinel=False)
+    cve_codes, cves = pd.factorize(pairs['cve_id'], use_na_sentinel=False)
+    keys = asset_codes.astype(np.int64) * (len(cves) + 1) + cve_codes
+
+    # Por par y, dentro de cada par, de mayor a menor base: el primero representa al par
+    order = np.lexsort((-pairs['base'].to_numpy(dtype=np.float64), keys))
+    keys = keys[order]
+    starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+    days = pairs['first_day'].to_numpy(dtype=np.int64)[order]
+    unknown = np.iinfo(np.int64).max
+    oldest = np.minimum.reduceat(np.where(days >= 0, days, unknown), starts)
+
+    merged = pairs.iloc[order[starts]][PAIR_COLUMNS].reset_index(drop=True)
+    merged['first_day'] = np.where(oldest == unknown, -1, oldest)
+    merged['open'] = np.add.reduceat(pairs['open'].to_numpy(dtype=np.int64)[order], starts)
+    return merged
+
+
+def pair_priority(pairs, assets, reference_date=None):
+    """Prioridad (0-100) de cada par activo-CVE de risk_pairs
+
+    Parte de la puntuación base y la sube hasta el doble con la antigüedad
+    del hallazgo más antiguo (hasta AGE_SATURATION_DAYS días) y con la
+    exposición, el número de activos con la misma CVE abierta (hasta
+    EXPOSURE_SATURATION). Se pondera por el estado del activo. La antigüedad
+    se cuenta hasta reference_date (por defecto el día más reciente de los pares).
+    """
+    priority = 100 * _pair_scores(pairs, reference_date) * _asset_status(pairs, assets)
+    return np.round(priority, 2)
+
+
+def asset_risk(pairs, assets, reference_date=None):
+    """Riesgo (0-100) de cada activo, en el orden de assets
+
+    Es la probabilidad de que al menos uno de sus pares activo-CVE sea
+    explotable, tratando cada puntuación (base con antigüedad y exposición,
+    ver pair_priority) como una probabilidad independiente, ponderada por el
+    estado del activo.
+    """
+    asset_ids = pd.Index(assets['asset_id'].astype(str))
+    codes = asset_ids.get_indexer(pairs['asset_id'].astype(str))
+    known = codes >= 0
+    log_safe = np.bincount(codes[known], weights=np.log1p(-_pair_scores(pairs, reference_date)[known]),
+                           minlength=len(asset_ids))
+    return np.round(100 * (1 - np.exp(log_safe)) * status_weights(assets['status']), 1)
+
+
+def risk_labels(risk):
+    """Texto de la columna Estado para cada puntuación de riesgo"""
+    return np.select([risk >= threshold for threshold, _ in RISK_LEVELS],
+                     [label for _, label in RISK_LEVELS], LOW_RISK_LABEL)
+
+
+def asset_details(data, pairs, reference_date=None):
+    """Tabla de detalle por activo (ver aggregations.asset_summary) con su riesgo
+
+    La columna Estado pasa a depender del riesgo en vez de los recuentos.
+    """
+    risk = asset_risk(pairs, data['assets'], reference_date)
+    details = asset_summary(data)
+    details.insert(2, 'Riesgo', risk)
+    details['Estado'] = risk_labels(risk)
+    return details
+
+
+def status_weights(statuses):
+    codes, uniques = pd.factorize(pd.Series(statuses).astype(object))
+    lookup = np.array([STATUS_WEIGHTS.get(u, 1.0) for u in uniques] + [1.0])
+    return lookup[codes]
+
+
+def top_n(values, n):
+    """Posiciones de los n valores mayores, de mayor a menor
+
+    Selección parcial con argpartition (O(len)) y solo los n elegidos se ordenan.
+    """
+    values = np.asarray(values)
+    if n <= 0 or not len(values):
+        return np.empty(0, dtype=np.int64)
+    if n < len(values):
+        candidates = np.argpartition(values, -n)[-n:]
+    else:
+        candidates = np.arange(len(values))
+    return candidates[np.argsort(-values[candidates], kind='stable')]
+
+
+def top_cves(pairs, assets, n=10, reference_date=None):
+    """Las n CVE con mayor prioridad entre sus pares activo-CVE (ver risk_pairs)
+
+    Columnas CVE, Descripción, CVSS, Activos (activos con la CVE abierta),
+    Días (antigüedad del hallazgo abierto más antiguo) y Prioridad.
+    """
+
+    priority = pair_priority(pairs, assets, reference_date)
+    cve_codes, cves = pd.factorize(pairs['cve_id'])
+
+    # Pares con CVE, ordenados por CVE y de mayor a menor prioridad:
+    # el primero de cada grupo da la prioridad, el CVSS y la descripción de la CVE
+    rows = np.flatnonzero((cve_codes >= 0) & (priority > 0))
+    rows = rows[np.lexsort((-priority[rows], cve_codes[rows]))]
+    starts = np.flatnonzero(np.r_[True, cve_codes[rows][1:] != cve_codes[rows][:-1]]) if len(rows) else rows
+    first = rows[starts]
+    chosen = top_n(priority[first], n)
+    representative = first[chosen]
+
+    days = pairs['first_day'].to_numpy(dtype=np.int64)
+    today = _reference_day(days, reference_date)
+    # Los días desconocidos (-1) se tratan como el día de referencia
+    days = np.where(days[rows] >= 0, days[rows], today)
+    oldest = np.minimum.reduceat(days, starts)[chosen] if len(rows) else np.empty(0, dtype=np.int64)
+
+    return pd.DataFrame({
+        'CVE': np.asarray(cves, dtype=object)[cve_codes[representative]].astype(str),
+        'Descripción': pairs['description'].iloc[representative].astype(str).to_numpy(),
+        'CVSS': pairs['cvss_score'].to_numpy(dtype=np.float64)[representative],
+        'Activos': _cve_exposure(cve_codes, len(cves))[cve_codes[representative]],
+        'Días': today - oldest,
+        'Prioridad': priority[representative]
+    })
+
+
+class RiskStore:
+    """Pares activo-CVE de riesgo (ver risk_pairs) guardados junto al almacén de escaneos
+
+    Estructura en disco:
+        <root>/risk/risk_pairs.parquet (asset_id, cve_id, base, cvss_score, description, first_day, open)
+
+    Una instantánea completa los sustituye; un delta solo recalcula los pares
+    de los activos con hallazgos que cambiaron, a partir de su estado actual.
+    La antigüedad, la exposición y el estado de los activos cambian sin que
+    cambien sus hallazgos, así que se aplican al leer (ver asset_risk y top_cves).
+    """
+
+    def __init__(self, root='./data_store'):
+        self.path = os.path.join(root, 'risk')
+        self.file = os.path.join(self.path, 'risk_pairs.parquet')
+
+    def exists(self):
+        return os.path.exists(self.file)
+
+    def read(self):
+        if not self.exists():
+            return _empty_pairs()
+        return pd.read_parquet(self.file)
+
+    def replace(self, pairs):
+        """Sustituye todos los pares (pairs: uno o varios resultados de risk_pairs)"""
+        self._write(merge_pairs([pairs] if isinstance(pairs, pd.DataFrame) else pairs))
+
+    def recompute(self, vulnerabilities, asset_ids):
+        """Recalcula los pares de asset_ids a partir de todos sus hallazgos actuales"""
+        stored = self.read()
+        stored = stored[~stored['asset_id'].astype(str).isin(pd.Index(asset_ids).astype(str))]
+        self._write(pd.concat([stored, risk_pairs(vulnerabilities)], ignore_index=True))
+
+    def _write(self, pairs):
+        pairs = pairs[PAIR_COLUMNS].astype(dict.fromkeys(PAIR_CATEGORIES, 'category'))
+        write_atomic(self.file, lambda temp_file: pairs.to_parquet(temp_file, index=False))
+
+
+def _pair_scores(pairs, reference_date):
+    """Puntuación (0-1) de cada par: su base subida por la antigüedad y la exposición"""
+    days = pairs['first_day'].to_numpy(dtype=np.int64)
+    known = days >= 0
+    today = _reference_day(days, reference_date)
+    age = np.where(known, np.clip(today - days, 0, AGE_SATURATION_DAYS), 0) / AGE_SATURATION_DAYS
+
+    cve_codes, cves = pd.factorize(pairs['cve_id'])
+    exposure = np.append(_cve_exposure(cve_codes, len(cves)), 0)[cve_codes]
+    exposure = np.minimum(np.log1p(exposure) / np.log1p(EXPOSURE_SATURATION), 1.0)
+
+    base = pairs['base'].to_numpy(dtype=np.float64)
+    return np.clip(base * (1 + age) / 2 * (1 + exposure) / 2, 0, _MAX_BASE)
+
+
+def _asset_status(pairs, assets):
+    """Peso del estado del activo de cada par (1.0 si el activo no está en assets)"""
+    weights = pd.Series(status_weights(assets['status']), index=assets['asset_id'].astype(str))
+    weights = weights[~weights.index.duplicated(keep='last')]
+    return weights.reindex(pairs['asset_id'].astype(str)).fillna(1.0).to_numpy()
+
+
+def _cve_exposure(cve_codes, num_cves):
+    """Activos con cada CVE abierta: los pares son únicos por activo y CVE (cve_codes -1 sin CVE)"""
+    return np.bincount(cve_codes[cve_codes >= 0], minlength=num_cves)
+
+
+def _empty_pairs():
+    return pd.DataFrame({
+        'asset_id': pd.Series(dtype=object),
+        'cve_id': pd.Series(dtype=object),
+        'base': pd.Series(dtype=np.float64),
+        'cvss_score': pd.Series(dtype=np.float64),
+        'description': pd.Series(dtype=object),
+        'first_day': pd.Series(dtype=np.int64),
+        'open': pd.Series(dtype=np.int64)
+    })
+
+
+def _reference_day(days, reference_date):
+    """Día de referencia: reference_date o el día conocido más reciente"""
+    if reference_date is not None:
+        return int(date_days([reference_date])[0])
+    known = days >= 0
+    return int(days[known].max()) if known.any() else 0
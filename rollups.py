@@ -0,0 +1,206 @@
+"""
+Módulo de agregados temporales
+Recuentos precalculados de hallazgos por día, semana y mes para las tendencias
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+
+from aggregations import asset_types, date_days
+from atomic_files import write_atomic
+from segment_index import ip_to_int
+
+GRAINS = ['day', 'week', 'month']
+DIMENSIONS = ['severity', 'segment', 'asset_type']
+MEASURES = ['findings', 'open']
+ROLLUP_COLUMNS = ['bucket'] + DIMENSIONS + MEASURES
+
+MONTH_LABELS = ['Ene', 'Feb', 'Mar', 'Abr', 'May', 'Jun', 'Jul', 'Ago', 'Sep', 'Oct', 'Nov', 'Dic']
+
+# Valor de las dimensiones que no se pueden deducir (activo sin IP o desconocido)
+UNKNOWN = 'Desconocido'
+
+
+def asset_dimensions(assets):
+    """Segmento /24 y tipo de cada activo, indexados por asset_id"""
+    ips = ip_to_int(assets['ip_address'])
+    codes, networks = pd.factorize(np.where(ips >= 0, ips >> 8, -1))
+    labels = np.array([f"{n >> 16}.{(n >> 8) & 255}.{n & 255}.0/24" if n >= 0 else UNKNOWN for n in networks])
+    dims = pd.DataFrame({
+        'segment': labels[codes],
+        'asset_type': asset_types(assets).to_numpy()
+    }, index=pd.Index(assets['asset_id'].astype(str), name='asset_id'))
+    return dims[~dims.index.duplicated(keep='last')]
+
+
+def bucket_days(days, grain):
+    """Primer día (en días desde 1970) del periodo de cada fecha; -1 se conserva"""
+    if grain == 'day':
+        starts = days
+    elif grain == 'week':
+        # El 1 de enero de 1970 fue jueves: los periodos empiezan en lunes
+        starts = days - (days + 3) % 7
+    else:
+        starts = days.astype('datetime64[D]').astype('datetime64[M]').astype('datetime64[D]').astype(np.int64)
+    return np.where(days >= 0, starts, -1)
+
+
+def rollup_counts(vulnerabilities, dimensions, findings_weight=1, open_weight=None):
+    """Agregados por periodo, severidad, segmento y tipo de activo de un bloque de hallazgos
+
+    Los pesos (escalares o arrays por fila) indican cuánto suma cada fila a
+    findings y a open: +1 al añadir un hallazgo, -1 al cerrarlo, etc. Por
+    defecto cada fila cuenta como hallazgo y como abierto si no está remediado.
+    Devuelve un DataFrame por grano.
+    """
+
+    if open_weight is None:
+        open_weight = ~vulnerabilities['remediated'].to_numpy(dtype=bool)
+    size = len(vulnerabilities)
+
+    days = date_days(vulnerabilities['discovery_date'])
+    dims = dimensions.reindex(pd.Index(vulnerabilities['asset_id'].astype(str))).fillna(UNKNOWN)
+    frame = pd.DataFrame({
+        'severity': vulnerabilities['severity'].astype(str).to_numpy(),
+        'segment': dims['segment'].to_numpy(),
+        'asset_type': dims['asset_type'].to_numpy(),
+        'findings': np.broadcast_to(np.asarray(findings_weight, dtype=np.int64), size),
+        'open': np.broadcast_to(np.asarray(open_weight, dtype=np.int64), size)
+    })
+
+    counts = {}
+    for grain in GRAINS:
+        buckets = bucket_days(days, grain)
+        frame['bucket'] = buckets
+        grouped = frame[buckets >= 0].groupby(['bucket'] + DIMENSIONS, sort=False, observed=True)[MEASURES].sum()
+        counts[grain] = grouped.reset_index()
+    return counts
+
+
+def moved_counts(vulnerabilities, previous, dimensions):
+    """Agregados que trasladan los hallazgos de los activos cuyas dimensiones cambiaron
+
+    vulnerabilities es el estado almacenado; sus filas de activos con otro
+    segmento o tipo en dimensions que en previous restan en los valores
+    anteriores y suman en los nuevos. Devuelve None si no cambió ninguno.
+    """
+
+    common = previous.index.intersection(dimensions.index)
+    changed = (previous.loc[common, DIMENSIONS[1:]] != dimensions.loc[common, DIMENSIONS[1:]]).any(axis=1)
+    moved = common[changed.to_numpy()]
+    if not len(moved):
+        return None
+
+    rows = vulnerabilities[vulnerabilities['asset_id'].astype(str).isin(moved).to_numpy()]
+    is_open = ~rows['remediated'].to_numpy(dtype=bool)
+    return merge_counts([
+        rollup_counts(rows, previous, -1, -is_open.astype(np.int64)),
+        rollup_counts(rows, dimensions)
+    ])
+
+
+def select_rollup(rollup, start_date=None, end_date=None, **filters):
+    """Filtra un agregado y expresa cada periodo como texto 'YYYY-MM-DD'
+
+    filters acepta listas de valores para severity, segment y asset_type.
+    """
+
+    buckets = rollup['bucket'].to_numpy(dtype=np.int64)
+    mask = np.ones(len(rollup), dtype=bool)
+    if start_date is not None:
+        mask &= buckets >= date_days([start_date])[0]
+    if end_date is not None:
+        mask &= buckets <= date_days([end_date])[0]
+    for column, values in filters.items():
+        if values is not None:
+            mask &= rollup[column].isin(list(values)).to_numpy()
+
+    selected = rollup[mask].sort_values('bucket', kind='stable').reset_index(drop=True)
+    selected['bucket'] = selected['bucket'].to_numpy(dtype=np.int64).astype('datetime64[D]').astype(str)
+    return selected[ROLLUP_COLUMNS]
+
+
+def merge_counts(partials):
+    """Suma varios resultados de rollup_counts grano a grano"""
+    return {grain: _sum_frames([p[grain] for p in partials]) for grain in GRAINS}
+
+
+def _sum_frames(frames):
+    """Suma agregados del mismo grano y descarta las combinaciones que quedan a cero"""
+    frames = [f for f in frames if len(f)]
+    if not frames:
+        return pd.DataFrame({c: pd.Series(dtype=object if c in DIMENSIONS else np.int64) for c in ROLLUP_COLUMNS})
+    total = pd.concat(frames, ignore_index=True).groupby(['bucket'] + DIMENSIONS, sort=False)[MEASURES].sum()
+    return total[(total != 0).any(axis=1)].reset_index()
+
+
+class RollupStore:
+    """Agregados temporales guardados junto al almacén de escaneos
+
+    Estructura en disco:
+        <root>/rollups/<grano>.parquet (bucket, severity, segment, asset_type, findings, open)
+        <root>/rollups/asset_dimensions.parquet (segmento y tipo actuales de cada activo)
+
+    Cada import suma sus cambios a los agregados existentes, así que leer una
+    tendencia cuesta O(periodos) independientemente del histórico acumulado.
+    Si un activo cambia de segmento o de tipo, sus hallazgos se trasladan a
+    los valores nuevos (ver moved_counts).
+    """
+
+    def __init__(self, root='./data_store'):
+        self.path = os.path.join(root, 'rollups')
+
+    def exists(self):
+        return all(os.path.exists(self._file(grain)) for grain in GRAINS)
+
+    def read(self, grain='month', start_date=None, end_date=None, **filters):
+        """Agregados de un grano (ver select_rollup)"""
+        if not os.path.exists(self._file(grain)):
+            return select_rollup(_sum_frames([]))
+        return select_rollup(pd.read_parquet(self._file(grain)), start_date, end_date, **filters)
+
+    def dimensions(self, assets=None):
+        """Dimensiones de los activos guardadas, actualizadas con assets si se indica"""
+        dims_file = os.path.join(self.path, 'asset_dimensions.parquet')
+        stored = pd.read_parquet(dims_file) if os.path.exists(dims_file) else None
+        if assets is None:
+            return stored if stored is not None else pd.DataFrame(columns=['segment', 'asset_type'])
+
+        dims = asset_dimensions(assets)
+        if stored is not None:
+            dims = pd.concat([stored[~stored.index.isin(dims.index)], dims])
+        self._write(dims_file, dims, index=True)
+        return dims
+
+    def apply(self, counts, replace=False):
+        """Suma counts (ver rollup_counts) a los agregados; con replace los sustituye"""
+        for grain in GRAINS:
+            frames = [counts[grain]]
+            if not replace and os.path.exists(self._file(grain)):
+                frames.append(pd.read_parquet(self._file(grain)))
+            self._write(self._file(grain), _sum_frames(frames))
+
+    def _file(self, grain):
+        return os.path.join(self.path, f"{grain}.parquet")
+
+    def _write(self, path, frame, index=False):
+        write_atomic(path, lambda temp_file: frame.to_parquet(temp_file, index=index))
+
+
+def trend_series(rollup, severities=None):
+    """Serie por periodo (total y críticas) a partir de un agregado ya leído"""
+    if severities is not None:
+        rollup = rollup[rollup['severity'].isin(list(severities))]
+    series = pd.DataFrame({
+        'total': rollup.groupby('bucket')['findings'].sum(),
+        'critical': rollup[rollup['severity'] == 'Critical'].groupby('bucket')['findings'].sum()
+    }).fillna(0).astype(np.int64)
+    series.index.name = 'bucket'
+    return series.reset_index()
+
+
+def month_label(bucket):
+    """'2024-04-01' -> 'Abr 2024'"""
+    return f"{MONTH_LABELS[int(bucket[5:7]) - 1]} {bucket[:4]}"
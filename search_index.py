@@ -0,0 +1,109 @@
+"""
+Módulo de búsqueda de activos
+Índice de trigramas sobre IP y hostname para búsquedas por prefijo y subcadena
+"""
+
+import numpy as np
+import pandas as pd
+
+# Separador entre campos; las consultas nunca lo contienen (text_input es de una línea)
+_SEPARATOR = '\n'
+
+
+class AssetSearchIndex:
+    """Índice invertido de trigramas (bytes UTF-8, sin distinguir mayúsculas)
+
+    Cada activo se indexa como '\\n<ip>\\n<hostname>\\n\\n'. Los trigramas se
+    guardan ordenados junto con las filas que los contienen, de modo que las
+    filas de un trigrama (o de todos los que empiezan por uno o dos bytes) son
+    un tramo contiguo localizable por bisección.
+
+    - Consultas de 1-2 caracteres: unión del tramo de trigramas que empiezan por ellas.
+    - Consultas más largas: intersección de las listas de sus trigramas y
+      comprobación final de la subcadena sobre los candidatos.
+    - Prefijos: la misma búsqueda anteponiendo el separador.
+    """
+
+    def __init__(self, assets, columns=('ip_address', 'hostname')):
+        text = pd.Series(_SEPARATOR, index=assets.index)
+        for column in columns:
+            text = text + assets[column].astype(object).fillna('').astype(str) + _SEPARATOR
+        text = (text + _SEPARATOR).str.lower()
+        self.size = len(text)
+
+        encoded = np.array([t.encode('utf-8') for t in text], dtype=bytes)
+        self._matrix = encoded.view(np.uint8).reshape(self.size, encoded.dtype.itemsize)
+        matrix = self._matrix.astype(np.int32)
+
+        # Trigramas por posición; los que incluyen relleno (byte 0) se descartan
+        trigrams = (matrix[:, :-2] << 16) | (matrix[:, 1:-1] << 8) | matrix[:, 2:]
+        present = matrix[:, 2:] != 0
+        rows = np.broadcast_to(np.arange(self.size, dtype=np.int64)[:, None], trigrams.shape)[present]
+
+        # Trigrama y fila en un único entero: al ordenarlo, las filas de cada
+        # trigrama quedan ascendentes y los duplicados contiguos
+        postings = np.sort((trigrams[present].astype(np.int64) << 32) | rows)
+        postings = postings[np.r_[True, postings[1:] != postings[:-1]]]
+        self._keys = (postings >> 32).astype(np.int32)
+        self._rows = (postings & 0xFFFFFFFF).astype(np.int32)
+
+    def search(self, query, prefix=False):
+        """Posiciones (ordenadas) de los activos cuya IP o hostname contiene query
+
+        Con prefix=True solo coinciden los campos que empiezan por query.
+        """
+
+        query = str(query).strip().lower()
+        if not query:
+            return np.arange(self.size)
+        if prefix:
+            query = _SEPARATOR + query
+        needle = query.encode('utf-8')
+
+        if len(needle) < 3:
+            lo, hi = self._range(needle)
+            mask = np.zeros(self.size, dtype=bool)
+            mask[self._rows[lo:hi]] = True
+            return np.flatnonzero(mask)
+
+        postings = []
+        for i in range(len(needle) - 2):
+            lo, hi = self._range(needle[i:i + 3])
+            if lo == hi:
+                return np.array([], dtype=np.int64)
+            postings.append(self._rows[lo:hi])
+
+        postings.sort(key=len)
+        candidates = postings[0]
+        marker = np.zeros(self.size, dtype=bool)
+        for rows in postings[1:]:
+            if not len(candidates):
+                break
+            marker[rows] = True
+            candidates = candidates[marker[candidates]]
+            marker[rows] = False
+
+        if len(needle) == 3:
+            return candidates.astype(np.int64)
+
+        # Los trigramas pueden aparecer separados: se comprueba la subcadena completa
+        return candidates[self._contains(candidates, needle)].astype(np.int64)
+
+    def _contains(self, candidates, needle):
+        """Máscara de los candidatos cuyo texto contiene needle, comparando bytes en bloque"""
+        block = self._matrix[candidates]
+        span = block.shape[1] - len(needle) + 1
+        if span <= 0:
+            return np.zeros(len(candidates), dtype=bool)
+        found = block[:, :span] == needle[0]
+        for i in range(1, len(needle)):
+            found &= block[:, i:i + span] == needle[i]
+        return found.any(axis=1)
+
+    def _range(self, needle):
+        """Tramo de self._keys cuyos trigramas empiezan por needle (1 a 3 bytes)"""
+        start = int.from_bytes(needle.ljust(3, b'\0'), 'big')
+        end = start + (1 << (8 * (3 - len(needle))))
+        # Límites con el dtype de las claves para que searchsorted no convierta el array
+        bounds = np.searchsorted(self._keys, np.array([start, end], dtype=self._keys.dtype), 'left')
+        return int(bounds[0]), int(bounds[1])
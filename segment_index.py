@@ -0,0 +1,125 @@
+"""
+Módulo de segmentos de red
+Índice de activos por dirección IPv4 para agregar hallazgos por CIDR
+"""
+
+import ipaddress
+
+import numpy as np
+import pandas as pd
+
+SEGMENT_COLUMNS = ['Segmento', 'Activos', 'Vulnerabilidades', 'Críticas']
+_IPV4_PATTERN = r'^(\d{1,3})\.(\d{1,3})\.(\d{1,3})\.(\d{1,3})$'
+
+
+def ip_to_int(values):
+    """Convierte direcciones IPv4 en texto a enteros (-1 si no son válidas)
+
+    Solo se interpretan los valores distintos.
+    """
+    codes, uniques = pd.factorize(pd.Series(values))
+    octets = pd.Series(uniques, dtype=object).astype(str).str.strip().str.extract(_IPV4_PATTERN)
+    parsed = octets.apply(pd.to_numeric, errors='coerce').to_numpy(dtype=np.float64).reshape(-1, 4)
+    valid = ~np.isnan(parsed).any(axis=1) & (np.nan_to_num(parsed) <= 255).all(axis=1)
+    ints = (np.nan_to_num(parsed).astype(np.int64) << np.array([24, 16, 8, 0])).sum(axis=1)
+    return np.append(np.where(valid, ints, -1), -1)[codes]
+
+
+def parse_cidr(cidr):
+    """Rango [inicio, fin) de enteros de un CIDR IPv4; acepta también una IP suelta"""
+    network = ipaddress.ip_network(str(cidr).strip(), strict=False)
+    if network.version != 4:
+        raise ValueError(f"Solo se admiten segmentos IPv4: {cidr}")
+    start = int(network.network_address)
+    return start, start + network.num_addresses
+
+
+class SegmentIndex:
+    """Activos ordenados por IP con sumas acumuladas de sus hallazgos
+
+    Un CIDR es un rango contiguo de enteros, así que sus activos se localizan
+    con dos búsquedas binarias y sus totales son diferencias de las sumas
+    acumuladas: el coste no depende del número de activos del segmento.
+    """
+
+    def __init__(self, data):
+        assets = data['assets']
+        vulns = data['vulnerabilities']
+
+        ips = ip_to_int(assets['ip_address'])
+        asset_ids = assets['asset_id'].astype(str)
+        valid = (ips >= 0) & ~asset_ids.duplicated(keep='last').to_numpy()
+        order = np.flatnonzero(valid)[np.argsort(ips[valid], kind='stable')]
+        self.ips = ips[order]
+        self.asset_ids = asset_ids.to_numpy()[order]
+        self._asset_rows = order
+
+        # Hallazgos abiertos (y críticos) por activo, alineados con self.ips
+        is_open = ~vulns['remediated'].to_numpy(dtype=bool)
+        is_critical = is_open & (vulns['severity'].astype(str).to_numpy() == 'Critical')
+        codes = pd.Index(self.asset_ids).get_indexer(vulns['asset_id'].astype(str))
+        known = codes >= 0
+        open_counts = np.bincount(codes[known & is_open], minlength=len(order))
+        critical_counts = np.bincount(codes[known & is_critical], minlength=len(order))
+
+        self._open_cumsum = np.concatenate([[0], np.cumsum(open_counts)])
+        self._critical_cumsum = np.concatenate([[0], np.cumsum(critical_counts)])
+        self._finding_positions = codes
+
+    def _bounds(self, cidr):
+        start, end = parse_cidr(cidr)
+        return np.searchsorted(self.ips, start, 'left'), np.searchsorted(self.ips, end, 'left')
+
+    def asset_rows(self, cidrs):
+        """Posiciones en data['assets'] de los activos de cualquiera de los CIDR"""
+        return np.sort(self._asset_rows[self.asset_mask(cidrs)])
+
+    def asset_mask(self, cidrs):
+        """Máscara (en el orden del índice) de los activos de cualquiera de los CIDR"""
+        coverage = np.zeros(len(self.ips) + 1, dtype=np.int64)
+        for cidr in cidrs:
+            lo, hi = self._bounds(cidr)
+            coverage[lo] += 1
+            coverage[hi] -= 1
+        return np.cumsum(coverage[:-1]) > 0
+
+    def finding_mask(self, cidrs):
+        """Máscara de las filas de vulnerabilidades cuyos activos están en los CIDR"""
+        mask = self.asset_mask(cidrs)
+        positions = self._finding_positions
+        return np.where(positions >= 0, np.append(mask, False)[positions], False)
+
+    def summary(self, cidrs):
+        """Activos, hallazgos abiertos y críticos de la unión de los CIDR (sin contar dos veces)"""
+        if isinstance(cidrs, str):
+            lo, hi = self._bounds(cidrs)
+            return {
+                'assets': int(hi - lo),
+                'vulnerabilities': int(self._open_cumsum[hi] - self._open_cumsum[lo]),
+                'critical': int(self._critical_cumsum[hi] - self._critical_cumsum[lo])
+            }
+        mask = self.asset_mask(cidrs)
+        return {
+            'assets': int(mask.sum()),
+            'vulnerabilities': int(np.diff(self._open_cumsum)[mask].sum()),
+            'critical': int(np.diff(self._critical_cumsum)[mask].sum())
+        }
+
+    def segments(self, prefix=24, limit=None):
+        """Resumen por segmento de longitud prefix, ordenado por hallazgos abiertos"""
+
+        if not len(self.ips):
+            return pd.DataFrame(columns=SEGMENT_COLUMNS)
+
+        networks = self.ips >> (32 - prefix) << (32 - prefix)
+        starts = np.flatnonzero(np.r_[True, networks[1:] != networks[:-1]])
+        ends = np.r_[starts[1:], len(networks)]
+
+        segments = pd.DataFrame({
+            'Segmento': [f"{ipaddress.IPv4Address(int(n))}/{prefix}" for n in networks[starts]],
+            'Activos': ends - starts,
+            'Vulnerabilidades': self._open_cumsum[ends] - self._open_cumsum[starts],
+            'Críticas': self._critical_cumsum[ends] - self._critical_cumsum[starts]
+        })
+        segments = segments.sort_values(['Vulnerabilidades', 'Activos'], ascending=False, kind='stable')
+        return segments.head(limit).reset_index(drop=True) if limit else segments.reset_index(drop=True)
@@ -0,0 +1,297 @@
+"""
+Módulo de sincronización automática
+Proceso programado que importa hallazgos de la API de Tenable y aplica la retención del almacén
+
+Uso:
+    python sync_daemon.py --store ./data_store          # bucle según la configuración guardada
+    python sync_daemon.py --store ./data_store --once   # una sincronización y termina
+"""
+
+import argparse
+import json
+import os
+import time
+from datetime import datetime, timedelta
+
+from atomic_files import write_atomic
+from data_store import ScanDataStore
+from tenable_importer import TenableDataImporter
+
+# Horas entre sincronizaciones; Manual no programa ninguna
+SYNC_FREQUENCIES = {
+    'Cada 24 horas': 24,
+    'Cada 12 horas': 12,
+    'Cada 6 horas': 6,
+    'Cada hora': 1,
+    'Manual': None
+}
+
+DEFAULT_CONFIG = {
+    'frequency': 'Cada 24 horas',
+    'time_of_day': '02:00',
+    'retention_days': 90,
+    'api_url': 'https://cloud.tenable.com',
+    'access_key': '',
+    'secret_key': '',
+    'days_back': 30,
+    'num_assets': 500,
+    'requests_per_second': 10.0
+}
+
+# Segundos entre revisiones de la configuración del bucle principal
+POLL_SECONDS = 60
+
+# Reintentos de una sincronización programada que falla; la espera se duplica en cada uno
+SYNC_RETRIES = 3
+RETRY_SECONDS = 300
+
+SYNC_DIR = 'sync'
+CONFIG_FILE = 'config.json'
+HISTORY_FILE = 'history.jsonl'
+HEARTBEAT_FILE = 'daemon.json'
+
+
+def _path(store_dir, name):
+    return os.path.join(store_dir, SYNC_DIR, name)
+
+
+def _write_json(path, payload, mode=None):
+    def write(temp_file):
+        with open(temp_file, 'w') as f:
+            json.dump(payload, f, indent=2)
+
+    write_atomic(path, write, mode)
+
+
+def load_config(store_dir):
+    """Configuración guardada, completada con los valores por defecto"""
+    path = _path(store_dir, CONFIG_FILE)
+    if not os.path.exists(path):
+        return dict(DEFAULT_CONFIG)
+    with open(path) as f:
+        saved = json.load(f)
+    return dict(DEFAULT_CONFIG, **{key: value for key, value in saved.items() if key in DEFAULT_CONFIG})
+
+
+def save_config(store_dir, config):
+    """Guarda la configuración; el demonio la relee en cada revisión
+
+    Incluye las claves de la API, así que el archivo solo lo puede leer su propietario.
+    """
+    config = dict(DEFAULT_CONFIG, **{key: value for key, value in config.items() if key in DEFAULT_CONFIG})
+    if config['frequency'] not in SYNC_FREQUENCIES:
+        raise ValueError(f"Frecuencia no soportada: {config['frequency']}")
+    config['retention_days'] = int(config['retention_days'])
+    config['num_assets'] = min(max(int(config['num_assets']), 50), 5000)
+    _write_json(_path(store_dir, CONFIG_FILE), config, mode=0o600)
+    return config
+
+
+def api_configured(config):
+    """Indica si la configuración tiene la URL y las claves de la API"""
+    return all(config.get(key) for key in ('api_url', 'access_key', 'secret_key'))
+
+
+def next_run(config, last_run=None, now=None):
+    """Próxima sincronización programada (None en modo Manual)
+
+    Los turnos se cuentan desde time_of_day cada N horas. Se devuelve el
+    primero posterior a la última ejecución; si el demonio estuvo parado y
+    ese turno ya pasó, la fecha devuelta es pasada y se sincroniza en cuanto
+    arranca (una sola vez, no una por turno perdido).
+    """
+
+    hours = SYNC_FREQUENCIES.get(config['frequency'])
+    if hours is None:
+        return None
+
+    now = now or datetime.now()
+    hour, minute = (int(part) for part in config['time_of_day'].split(':')[:2])
+    anchor = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+    period = timedelta(hours=hours)
+
+    # Sin ejecuciones previas se espera al siguiente turno a partir de ahora
+    reference = last_run if last_run is not None else now - timedelta(microseconds=1)
+    turns = (reference - anchor) // period + 1
+    return anchor + turns * period
+
+
+def next_retry(run):
+    """Hora del reintento tras la ejecución run (la última del historial), o None
+
+    Solo se reintenta una ejecución fallida, como mucho SYNC_RETRIES veces
+    seguidas; la espera es RETRY_SECONDS y se duplica en cada intento.
+    """
+    if run is None or run['status'] != 'failed':
+        return None
+    attempt = run.get('attempt', 1)
+    if attempt > SYNC_RETRIES:
+        return None
+    return datetime.fromisoformat(run['finished_at']) + timedelta(seconds=RETRY_SECONDS * 2 ** (attempt - 1))
+
+
+def read_history(store_dir, limit=None):
+    """Ejecuciones registradas, de la más reciente a la más antigua"""
+    path = _path(store_dir, HISTORY_FILE)
+    if not os.path.exists(path):
+        return []
+    with open(path) as f:
+        runs = [json.loads(line) for line in f if line.strip()]
+    runs.reverse()
+    return runs[:limit] if limit else runs
+
+
+def last_run(store_dir):
+    """Inicio de la última sincronización registrada"""
+    history = read_history(store_dir, limit=1)
+    return datetime.fromisoformat(history[0]['started_at']) if history else None
+
+
+def _append_history(store_dir, run):
+    path = _path(store_dir, HISTORY_FILE)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'a') as f:
+        f.write(json.dumps(run) + '\n')
+
+
+def apply_retention(store, retention_days, now=None):
+    """Elimina las particiones más antiguas que retention_days"""
+    cutoff = (now or datetime.now()) - timedelta(days=int(retention_days))
+    return store.drop_partitions_before(cutoff.strftime('%Y-%m-%d'))
+
+
+def run_sync(store_dir, config=None, progress_callback=None, attempt=1):
+    """Una sincronización: importa una exportación de la API como delta y aplica la retención
+
+    Usa la URL y las claves guardadas en la configuración. Como en api_job,
+    la exportación trae el estado de cada hallazgo (FIXED incluido), así que
+    lo que no aparece en ella no se da por remediado. Registra en el
+    historial la duración, las filas importadas, su ritmo y las particiones
+    eliminadas, también si falla. progress_callback recibe (progreso 0-1 o
+    None, texto) y attempt es el número de intento (ver next_retry).
+    Devuelve el registro de la ejecución.
+    """
+
+    config = config or load_config(store_dir)
+    store = ScanDataStore(store_dir)
+    progress = progress_callback or (lambda fraction, message: None)
+
+    started = datetime.now()
+    clock = time.perf_counter()
+    run = {
+        'started_at': started.isoformat(timespec='seconds'),
+        'frequency': config['frequency'],
+        'attempt': attempt,
+        'status': 'ok',
+        'rows': 0,
+        'assets': 0,
+        'new': 0,
+        'updated': 0,
+        'remediated': 0,
+        'partitions_dropped': [],
+        'error': None
+    }
+
+    try:
+        if not api_configured(config):
+            raise ValueError("Falta la URL o las claves de la API de Tenable en la configuración")
+
+        def downloaded(chunks, rows):
+            run['rows'] = rows
+            progress(None, f"Descargando... {chunks:,} chunks, {rows:,} hallazgos")
+
+        importer = TenableDataImporter()
+        importer.connect(config['access_key'], config['secret_key'], config['api_url'],
+                         requests_per_second=float(config['requests_per_second']))
+        try:
+            data = importer.import_from_api(days_back=int(config['days_back']), num_assets=int(config['num_assets']),
+                                            progress_callback=downloaded)
+        finally:
+            importer.client.close()
+        run['rows'] = len(data['vulnerabilities'])
+        run['assets'] = len(data['assets'])
+
+        progress(0.85, "Guardando en el almacén...")
+        with store.write_lock():
+            stored = store.write_delta(data, include_remediated=False)
+            progress(0.95, "Aplicando retención...")
+            run['partitions_dropped'] = apply_retention(store, config['retention_days'])
+        run.update(new=stored['new'], updated=stored['updated'], remediated=stored['remediated'])
+    except Exception as e:
+        run['status'] = 'failed'
+        run['error'] = f"{type(e).__name__}: {e}"
+
+    run['duration_s'] = round(time.perf_counter() - clock, 3)
+    run['rows_per_s'] = round(run['rows'] / run['duration_s'], 1) if run['duration_s'] else None
+    run['finished_at'] = datetime.now().isoformat(timespec='seconds')
+    _append_history(store_dir, run)
+    return run
+
+
+def daemon_status(store_dir, now=None):
+    """Último latido del demonio; 'alive' indica si sigue revisando la configuración"""
+    path = _path(store_dir, HEARTBEAT_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        status = json.load(f)
+    age = ((now or datetime.now()) - datetime.fromisoformat(status['updated_at'])).total_seconds()
+    status['alive'] = age <= 2 * status.get('poll_seconds', POLL_SECONDS)
+    return status
+
+
+def run_forever(store_dir, poll_seconds=POLL_SECONDS):
+    """Bucle del demonio: relee la configuración y sincroniza cuando toca
+
+    Una sincronización fallida se reintenta con espera exponencial (ver
+    next_retry) salvo que antes llegue el siguiente turno o el modo sea Manual.
+    """
+    while True:
+        config = load_config(store_dir)
+        now = datetime.now()
+        due, attempt = _due(store_dir, config, now)
+        if due is not None and due <= now:
+            run = run_sync(store_dir, config, attempt=attempt)
+            print(f"[{run['finished_at']}] {run['status']} (intento {attempt}): "
+                  f"{run['rows']:,} filas en {run['duration_s']:.1f}s", flush=True)
+            due, _ = _due(store_dir, config)
+
+        _write_json(_path(store_dir, HEARTBEAT_FILE), {
+            'pid': os.getpid(),
+            'updated_at': datetime.now().isoformat(timespec='seconds'),
+            'poll_seconds': poll_seconds,
+            'next_run': due.isoformat(timespec='seconds') if due else None
+        })
+
+        # Se duerme hasta el próximo turno, pero nunca más de poll_seconds
+        wait = poll_seconds if due is None else (due - datetime.now()).total_seconds()
+        time.sleep(min(max(wait, 1), poll_seconds))
+
+
+def _due(store_dir, config, now=None):
+    """Próxima sincronización (turno o reintento) y su número de intento"""
+    history = read_history(store_dir, limit=1)
+    last = history[0] if history else None
+    scheduled = next_run(config, datetime.fromisoformat(last['started_at']) if last else None, now)
+    retry = next_retry(last)
+    if scheduled is None or retry is None or scheduled <= retry:
+        return scheduled, 1
+    return retry, last.get('attempt', 1) + 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sincronización automática con la API de Tenable")
+    parser.add_argument('--store', default='./data_store', help="Directorio del almacén de escaneos")
+    parser.add_argument('--once', action='store_true', help="Sincroniza una vez y termina")
+    parser.add_argument('--poll', type=int, default=POLL_SECONDS, help="Segundos entre revisiones")
+    args = parser.parse_args()
+
+    if args.once:
+        run = run_sync(args.store)
+        print(json.dumps(run, indent=2))
+        return
+    run_forever(args.store, args.poll)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,369 @@
+"""
+Módulo cliente de la API de Tenable
+Flujo de exportación (solicitar, consultar estado, descargar chunks) con descargas concurrentes
+"""
+
+import random
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# Respuestas que se reintentan: límite de peticiones y errores transitorios del servidor
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# Estados de una exportación que la dan por terminada sin datos
+FAILED_EXPORT_STATUSES = {'ERROR', 'CANCELLED'}
+
+
+class TenableApiError(Exception):
+    """Error de la API de Tenable (URL no válida, respuesta no válida o reintentos agotados)"""
+
+    def __init__(self, message, status_code=None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class TokenBucket:
+    """Limitador de ritmo: rate peticiones por segundo con ráfagas de hasta burst
+
+    pause() detiene a todos los que esperan turno, p. ej. durante el
+    Retry-After de un 429. rate=None no limita el ritmo (solo las pausas).
+    """
+
+    def __init__(self, rate=None, burst=None):
+        self.rate = rate
+        self.capacity = burst or max(rate or 1, 1)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def try_acquire(self):
+        """Toma un turno si lo hay; si no, devuelve los segundos que faltan para el siguiente"""
+        with self._lock:
+            now = time.monotonic()
+            if now < self._paused_until:
+                return self._paused_until - now
+            if self.rate is None:
+                return 0.0
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0.0
+            return (1 - self._tokens) / self.rate
+
+    def acquire(self):
+        """Espera turno; devuelve los segundos esperados"""
+        waited = 0.0
+        while True:
+            delay = self.try_acquire()
+            if not delay:
+                return waited
+            time.sleep(delay)
+            waited += delay
+
+    def pause(self, seconds):
+        """Sin turnos durante seconds; después se reanuda sin ráfaga acumulada"""
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+            self._tokens = 0.0
+            self._updated = self._paused_until
+
+
+class AdaptiveConcurrency:
+    """Límite de peticiones simultáneas con aumento aditivo y reducción a la mitad (AIMD)
+
+    Tras cada tanda de `limit` respuestas correctas el límite sube en uno.
+    Baja a la mitad ante un 429/5xx o un error de red, y cuando la latencia
+    media de las descargas supera latency_factor veces la mejor observada
+    (el servidor empieza a encolar). Entre dos reducciones deben llegar al
+    menos `limit` respuestas, para no reaccionar varias veces al mismo pico.
+    """
+
+    def __init__(self, initial, maximum, minimum=1, latency_factor=2.0):
+        self.limit = min(max(initial, minimum), maximum)
+        self.minimum = minimum
+        self.maximum = maximum
+        self.latency_factor = latency_factor
+        self.peak = self.limit
+        self._active = 0
+        self._successes = 0
+        self._since_decrease = 0
+        self._best_latency = None
+        self._average_latency = None
+        self._condition = threading.Condition()
+
+    def acquire(self):
+        with self._condition:
+            while self._active >= self.limit:
+                self._condition.wait()
+            self._active += 1
+
+    def release(self, ok=True, latency=None):
+        with self._condition:
+            self._active -= 1
+            self._since_decrease += 1
+            if latency is not None:
+                self._best_latency = min(self._best_latency or latency, latency)
+                self._average_latency = (latency if self._average_latency is None
+                                         else 0.8 * self._average_latency + 0.2 * latency)
+
+            if not ok or (latency is not None
+                          and self._average_latency > self.latency_factor * self._best_latency):
+                self._decrease()
+            else:
+                self._successes += 1
+                if self._successes >= self.limit and self.limit < self.maximum:
+                    self.limit += 1
+                    self.peak = max(self.peak, self.limit)
+                    self._successes = 0
+            self._condition.notify_all()
+
+    def _decrease(self):
+        if self._since_decrease < self.limit:
+            return
+        self.limit = max(self.limit // 2, self.minimum)
+        self._successes = 0
+        self._since_decrease = 0
+        # La latencia se vuelve a medir con el nuevo límite
+        self._average_latency = None
+
+
+class RequestStats:
+    """Estadísticas de una importación: peticiones, bytes y tiempo de espera por el limitador"""
+
+    def __init__(self):
+        self.requests = 0
+        self.bytes = 0
+        self.throttled = 0
+        self.errors = 0
+        self.throttled_s = 0.0
+        self.started = time.monotonic()
+        self._lock = threading.Lock()
+
+    def record(self, size=0, throttled=False, error=False):
+        with self._lock:
+            self.requests += 1
+            self.bytes += size
+            self.throttled += int(throttled)
+            self.errors += int(error)
+
+    def wait(self, seconds):
+        with self._lock:
+            self.throttled_s += seconds
+
+    def as_dict(self, concurrency=None):
+        elapsed = max(time.monotonic() - self.started, 1e-9)
+        stats = {
+            'requests': self.requests,
+            'bytes': self.bytes,
+            'throttled_responses': self.throttled,
+            'errors': self.errors,
+            'elapsed_s': round(elapsed, 3),
+            'requests_per_s': round(self.requests / elapsed, 2),
+            'bytes_per_s': round(self.bytes / elapsed, 1),
+            # Suma entre hilos: puede superar elapsed_s
+            'throttled_s': round(self.throttled_s, 3)
+        }
+        if concurrency is not None:
+            stats.update(concurrency=concurrency.limit, peak_concurrency=concurrency.peak)
+        return stats
+
+
+def retry_after_seconds(value):
+    """Segundos indicados por una cabecera Retry-After (número o fecha HTTP), o None"""
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        moment = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max((moment - datetime.now(timezone.utc)).total_seconds(), 0.0)
+
+
+class TenableApiClient:
+    """Cliente de la exportación de vulnerabilidades de Tenable.io
+
+    Usa una sesión HTTP con un pool de max_workers conexiones: los chunks se
+    descargan en paralelo en cuanto la exportación los publica, sin esperar a
+    que termine. Cada petición pasa por un TokenBucket (requests_per_second)
+    y por un límite de concurrencia adaptativo de hasta max_workers. Las
+    peticiones fallidas por red, 429 o 5xx se reintentan; un 429 pausa a
+    todos los hilos durante su Retry-After (o la espera exponencial).
+    """
+
+    def __init__(self, url, access_key, secret_key, max_workers=8, max_retries=5, backoff=0.5, timeout=30,
+                 poll_interval=2.0, requests_per_second=10.0):
+        self.url = url.rstrip('/')
+        self.max_workers = max_workers
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.poll_interval = poll_interval
+        self.bucket = TokenBucket(requests_per_second, burst=max_workers)
+        self.concurrency = AdaptiveConcurrency(max(max_workers // 2, 1), max_workers)
+        self.stats = RequestStats()
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_workers)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.session.headers.update({
+            'X-ApiKeys': f"accessKey={access_key};secretKey={secret_key}",
+            'Accept': 'application/json'
+        })
+
+    def close(self):
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def reset_stats(self):
+        """Empieza unas estadísticas nuevas (una por importación)"""
+        self.stats = RequestStats()
+
+    def run_stats(self):
+        return self.stats.as_dict(self.concurrency)
+
+    def request(self, method, path, latency_signal=False, **kwargs):
+        """Petición con limitación de ritmo y reintentos; devuelve el JSON de la respuesta
+
+        Con latency_signal la latencia de la respuesta ajusta la concurrencia
+        (solo las descargas de chunks, que tienen un tamaño comparable).
+        """
+        for attempt in range(self.max_retries + 1):
+            self.concurrency.acquire()
+            self.stats.wait(self.bucket.acquire())
+            started = time.monotonic()
+            try:
+                response = self.session.request(method, f"{self.url}{path}", timeout=self.timeout, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as exc:
+                self.concurrency.release(ok=False)
+                self.stats.record(error=True)
+                if attempt == self.max_retries:
+                    raise TenableApiError(f"{method} {path}: {exc}") from exc
+            except requests.RequestException as exc:
+                # URL mal formada, esquema no soportado...: reintentar no lo arregla
+                self.concurrency.release(ok=False)
+                self.stats.record(error=True)
+                raise TenableApiError(f"{method} {path}: {exc}") from exc
+            else:
+                retry = response.status_code in RETRY_STATUSES
+                self.concurrency.release(ok=not retry,
+                                         latency=time.monotonic() - started if latency_signal else None)
+                self.stats.record(len(response.content), throttled=response.status_code == 429,
+                                  error=response.status_code >= 400)
+                if response.status_code < 400:
+                    try:
+                        return response.json()
+                    except ValueError as exc:
+                        raise TenableApiError(f"{method} {path}: la respuesta no es JSON válido",
+                                              response.status_code) from exc
+                if not retry or attempt == self.max_retries:
+                    raise TenableApiError(f"{method} {path}: HTTP {response.status_code}", response.status_code)
+                if response.status_code == 429:
+                    # El límite es de la cuenta: esperan todas las peticiones, no solo esta
+                    delay = retry_after_seconds(response.headers.get('Retry-After'))
+                    self.bucket.pause(delay if delay is not None else self._backoff(attempt))
+                    continue
+            delay = self._backoff(attempt)
+            time.sleep(delay)
+            self.stats.wait(delay)
+
+    def _backoff(self, attempt):
+        return self.backoff * 2 ** attempt * random.uniform(0.5, 1.5)
+
+    def session_info(self):
+        """Datos de la cuenta; sirve para comprobar las credenciales"""
+        return self.request('GET', '/session')
+
+    def export_vulnerabilities(self, filters=None, num_assets=500):
+        """Solicita una exportación y devuelve su UUID
+
+        num_assets es el número de activos por chunk (50-5000 en Tenable.io).
+        """
+        payload = {'num_assets': int(num_assets), 'filters': filters or {}}
+        return self.request('POST', '/vulns/export', json=payload)['export_uuid']
+
+    def export_status(self, export_uuid):
+        return self.request('GET', f"/vulns/export/{export_uuid}/status")
+
+    def cancel_export(self, export_uuid):
+        """Cancela una exportación en curso (Tenable deja de preparar sus chunks)"""
+        return self.request('POST', f"/vulns/export/{export_uuid}/cancel")
+
+    def download_chunk(self, export_uuid, chunk_id):
+        """Hallazgos de un chunk (lista de registros JSON anidados)"""
+        return self.request('GET', f"/vulns/export/{export_uuid}/chunks/{chunk_id}", latency_signal=True)
+
+    def iter_chunks(self, export_uuid):
+        """Genera (chunk_id, registros) a medida que se descargan, en orden de llegada
+
+        Se consulta el estado cada poll_interval segundos mientras la
+        exportación sigue en curso. Como mucho hay 2 * max_workers descargas
+        pendientes, así que la memoria no depende del tamaño de la exportación.
+        Si el generador se cierra antes de terminar (p. ej. al alcanzar un
+        máximo de filas) no se espera a las descargas en curso: las pendientes
+        se cancelan y, si la exportación no había terminado, también se cancela.
+        """
+
+        submitted = set()
+        pending = set()
+        finished = False
+        completed = False
+        next_poll = 0.0
+        executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='tenable-chunk')
+        try:
+            while True:
+                queued = []
+                if not finished and time.monotonic() >= next_poll:
+                    status = self.export_status(export_uuid)
+                    if status['status'] in FAILED_EXPORT_STATUSES:
+                        finished = True
+                        raise TenableApiError(f"La exportación {export_uuid} terminó con estado {status['status']}")
+                    finished = status['status'] == 'FINISHED'
+                    queued = [c for c in status.get('chunks_available', []) if c not in submitted]
+                    next_poll = time.monotonic() + self.poll_interval
+
+                for chunk_id in queued:
+                    submitted.add(chunk_id)
+                    pending.add(executor.submit(self._download, export_uuid, chunk_id))
+                    while len(pending) >= 2 * self.max_workers:
+                        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                        for future in done:
+                            yield future.result()
+
+                if finished and not pending:
+                    completed = True
+                    return
+                timeout = None if finished else max(next_poll - time.monotonic(), 0)
+                done, pending = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+                if not pending and not finished:
+                    time.sleep(max(next_poll - time.monotonic(), 0))
+        finally:
+            # Las descargas que ya están en marcha terminan solas; su resultado se descarta
+            executor.shutdown(wait=completed, cancel_futures=True)
+            if not finished:
+                try:
+                    self.cancel_export(export_uuid)
+                except TenableApiError:
+                    pass
+
+    def _download(self, export_uuid, chunk_id):
+        return chunk_id, self.download_chunk(export_uuid, chunk_id)
@@ -1,12 +1,83 @@
 """
 Módulo para importar datos desde Tenable Security Center
-Simula la integración con Tenable API
+Importa exportaciones de la API y archivos, y genera escaneos simulados
 """
 
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
+import io
 import json
+import os
+import re
+import shutil
+import sys
+import tempfile
+import xml.etree.ElementTree as ET
+from contextlib import closing
+
+from finding_keys import finding_hashes, sorted_contains
+from tenable_api import TenableApiClient
+
+SEVERITIES = ['Critical', 'High', 'Medium', 'Low', 'Info']
+OS_NAMES = ['Windows Server 2022', 'Ubuntu 22.04', 'CentOS 7', 'Windows 11']
+ASSET_STATUSES = ['Active', 'Inactive', 'Quarantined']
+
+VULN_TEMPLATES = [
+    "Remote Code Execution vulnerability in {} service",
+    "Privilege Escalation via {}",
+    "SQL Injection in {} endpoint",
+    "Cross-Site Scripting (XSS) in {}",
+    "Buffer Overflow in {} component",
+    "Information Disclosure via {}",
+    "Denial of Service in {} service"
+]
+
+VULN_COMPONENTS = ['HTTP', 'SSH', 'Database', 'Web Application', 'API', 'File System', 'Network']
+
+ASSET_COLUMNS = ['asset_id', 'ip_address', 'hostname', 'os', 'last_scanned', 'status']
+VULN_COLUMNS = ['asset_id', 'cve_id', 'severity', 'cvss_score', 'plugin_id',
+                'description', 'discovery_date', 'remediated']
+SUPPORTED_FORMATS = ('csv', 'json', 'nessus', 'xlsx')
+
+# Columnas de texto repetitivo: categóricas (cada valor distinto una vez y un
+# código entero por fila; las fechas 'YYYY-MM-DD' ocupan así 1-2 bytes por fila)
+ASSET_CATEGORIES = ['os', 'last_scanned', 'status']
+VULN_CATEGORIES = ['asset_id', 'cve_id', 'severity', 'plugin_id', 'description', 'discovery_date']
+
+# Nombres de columna conocidos en exportaciones de Tenable (CSV, JSON aplanado,
+# .nessus) para cada columna del esquema, en orden de preferencia
+COLUMN_ALIASES = {
+    'asset_id': ['asset_id', 'asset.uuid', 'asset uuid', 'asset.id', 'host id'],
+    'ip_address': ['ip_address', 'asset.ipv4', 'ip address', 'ipv4', 'host-ip', 'host'],
+    'hostname': ['hostname', 'asset.hostname', 'asset.fqdn', 'dns name', 'fqdn',
+                 'host-fqdn', 'netbios name'],
+    'os': ['os', 'asset.operating_system', 'operating system', 'operating-system'],
+    'last_scanned': ['last_scanned', 'last_found', 'last seen', 'host_end'],
+    'status': ['status'],
+    'cve_id': ['cve_id', 'cve', 'plugin.cve'],
+    'severity': ['severity', 'risk', 'risk_factor'],
+    'cvss_score': ['cvss_score', 'cvss v3.0 base score', 'cvss3_base_score',
+                   'plugin.cvss3_base_score', 'cvss', 'cvss v2.0 base score',
+                   'cvss_base_score', 'plugin.cvss_base_score'],
+    'plugin_id': ['plugin_id', 'plugin id', 'plugin.id', 'pluginid'],
+    'description': ['description', 'name', 'plugin name', 'plugin.name', 'pluginname'],
+    'discovery_date': ['discovery_date', 'first_found', 'first discovered', 'first seen'],
+    'remediated': ['remediated', 'state', 'vulnerability state']
+}
+
+SEVERITY_ALIASES = {
+    'critical': 'Critical', 'high': 'High', 'medium': 'Medium', 'low': 'Low',
+    'info': 'Info', 'informational': 'Info', 'none': 'Info',
+    '4': 'Critical', '3': 'High', '2': 'Medium', '1': 'Low', '0': 'Info'
+}
+
+
+def _categorical_from_ints(values, formatter):
+    """Convierte enteros en un Categorical formateando solo los valores únicos"""
+    uniques, codes = np.unique(values, return_inverse=True)
+    return pd.Categorical.from_codes(codes.ravel(), [formatter(v) for v in uniques.tolist()])
+
 
 class TenableDataImporter:
     """Clase para importar y procesar datos de Tenable"""
@@ -15,22 +86,83 @@ class TenableDataImporter:
         self.connected = False
         self.last_scan_date = None
         
-    def connect(self, api_key, secret_key, url="https://cloud.tenable.com"):
-        """Simula conexión a Tenable API"""
-        # En un caso real, aquí iría la lógica de autenticación
+    def connect(self, api_key, secret_key, url="https://cloud.tenable.com", max_workers=8, requests_per_second=10.0):
+        """Conecta con la API de Tenable y comprueba las credenciales
+        
+        Devuelve los datos de la cuenta (GET /session). Lanza TenableApiError
+        si las credenciales no son válidas o el servicio no responde.
+        """
+        client = TenableApiClient(url, api_key, secret_key, max_workers=max_workers,
+                                  requests_per_second=requests_per_second)
+        try:
+            account = client.session_info()
+        except Exception:
+            client.close()
+            raise
+        self.client = client
         self.connected = True
         self.api_key = api_key
         self.url = url
-        return True
+        return account
     
-    def simulate_scan_data(self, days_back=30, num_assets=100):
-        """Genera datos de escaneo simulados"""
+    def import_from_api(self, days_back=None, filters=None, num_assets=500, max_findings=None,
+                        progress_callback=None, deduplicate=False):
+        """Importa hallazgos con una exportación de la API (requiere connect)
+        
+        Cada chunk se normaliza en cuanto llega, igual que un lote de archivo,
+        sin esperar al resto de la exportación. days_back limita la exportación
+        a los hallazgos vistos en los últimos días y max_findings detiene la
+        descarga al alcanzar ese número de filas. progress_callback(chunks,
+        filas) se invoca después de cada chunk. Devuelve el mismo diccionario
+        que ingest_file, con las estadísticas de la API en
+        scan_metadata['api_stats'].
+        """
+        if not self.connected:
+            raise RuntimeError("No hay conexión con Tenable: llama antes a connect()")
+        
+        filters = dict(filters or {})
+        if days_back:
+            filters.setdefault('since', int((datetime.now() - timedelta(days=days_back)).timestamp()))
+        self.client.reset_stats()
+        export_uuid = self.client.export_vulnerabilities(filters, num_assets)
+        
+        def batches():
+            chunks = rows = 0
+            # Se cierra en cuanto se alcanza max_findings: cancela las descargas y la exportación
+            with closing(self.client.iter_chunks(export_uuid)) as downloads:
+                for _, records in downloads:
+                    if not records:
+                        continue
+                    batch = _normalize_findings(_export_frame(records))
+                    if max_findings:
+                        batch = batch.iloc[:max_findings - rows]
+                    chunks += 1
+                    rows += len(batch)
+                    if progress_callback is not None:
+                        progress_callback(chunks, rows)
+                    yield batch
+                    if max_findings and rows >= max_findings:
+                        return
+        
+        data = self._ingest_batches(batches(), deduplicate)
+        data['scan_metadata'].update(source_file=f"{self.url}/vulns/export/{export_uuid}", export_uuid=export_uuid,
+                                     api_stats=self.client.run_stats())
+        return data
+    
+    def simulate_scan_data(self, days_back=30, num_assets=100, vectorized=False, seed=42):
+        """Genera datos de escaneo simulados
+
+        Con vectorized=True todo el escaneo se genera en bloque con arrays de
+        NumPy (pensado para pruebas de carga con decenas de miles de activos).
+        """
         
-        np.random.seed(42)
+        if vectorized:
+            return self._simulate_scan_data_vectorized(days_back, num_assets, seed)
+        
+        np.random.seed(seed)
         
         # Generar fechas
         end_date = datetime.now()
-        start_date = end_date - timedelta(days=days_back)
         
         assets = []
         vulnerabilities = []
@@ -44,17 +176,16 @@ class TenableDataImporter:
                 'asset_id': asset_id,
                 'ip_address': ip,
                 'hostname': f"SVR-{np.random.choice(['DB', 'WEB', 'APP', 'FILE'])}-{i:03d}",
-                'os': np.random.choice(['Windows Server 2022', 'Ubuntu 22.04', 'CentOS 7', 'Windows 11']),
+                'os': np.random.choice(OS_NAMES),
                 'last_scanned': (end_date - timedelta(days=np.random.randint(0, days_back))).strftime('%Y-%m-%d'),
-                'status': np.random.choice(['Active', 'Inactive', 'Quarantined'], p=[0.8, 0.15, 0.05])
+                'status': np.random.choice(ASSET_STATUSES, p=[0.8, 0.15, 0.05])
             }
             assets.append(asset)
             
             # Generar vulnerabilidades para cada activo
             num_vulns = np.random.randint(0, 50)
             for v in range(num_vulns):
-                severity = np.random.choice(['Critical', 'High', 'Medium', 'Low', 'Info'], 
-                                           p=[0.05, 0.15, 0.30, 0.40, 0.10])
+                severity = np.random.choice(SEVERITIES, p=[0.05, 0.15, 0.30, 0.40, 0.10])
                 
                 vulnerability = {
                     'asset_id': asset_id,
@@ -68,7 +199,7 @@ class TenableDataImporter:
                 }
                 vulnerabilities.append(vulnerability)
         
-        return {
+        return normalize_schema({
             'assets': pd.DataFrame(assets),
             'vulnerabilities': pd.DataFrame(vulnerabilities),
             'scan_metadata': {
@@ -77,33 +208,232 @@ class TenableDataImporter:
                 'total_vulnerabilities': len(vulnerabilities),
                 'critical_count': len([v for v in vulnerabilities if v['severity'] == 'Critical'])
             }
+        })
+    
+    def _simulate_scan_data_vectorized(self, days_back, num_assets, seed):
+        """Genera el mismo esquema que simulate_scan_data en modo vectorizado"""
+        
+        data = self.simulate_scan_stream(days_back, num_assets, batch_size=None, seed=seed)
+        data['vulnerabilities'] = next(data['vulnerabilities'])
+        return data
+    
+    def simulate_scan_stream(self, days_back=30, num_assets=100, batch_size=100_000, seed=42):
+        """Genera un escaneo simulado por lotes de tamaño acotado
+        
+        Devuelve el mismo diccionario que simulate_scan_data, pero
+        'vulnerabilities' es un generador de DataFrames de como máximo
+        batch_size filas (None = un único lote). 'critical_count' en
+        scan_metadata se va completando a medida que se consumen los lotes.
+        """
+        
+        rng = np.random.default_rng(seed)
+        end_date = datetime.now()
+        dates = [(end_date - timedelta(days=d)).strftime('%Y-%m-%d') for d in range(days_back)]
+        
+        # Generar activos
+        asset_ids = pd.Index([f"ASSET-{i:04d}" for i in range(num_assets)])
+        octet_3 = rng.integers(1, 200, num_assets).astype(str)
+        octet_4 = rng.integers(1, 255, num_assets).astype(str)
+        roles = np.array(['DB', 'WEB', 'APP', 'FILE'])[rng.integers(0, 4, num_assets)]
+        
+        assets = pd.DataFrame({
+            'asset_id': asset_ids,
+            'ip_address': np.char.add(np.char.add(np.char.add('172.22.', octet_3), '.'), octet_4),
+            'hostname': [f"SVR-{role}-{i:03d}" for i, role in enumerate(roles)],
+            'os': pd.Categorical.from_codes(rng.integers(0, len(OS_NAMES), num_assets), OS_NAMES),
+            'last_scanned': pd.Categorical.from_codes(rng.integers(0, days_back, num_assets), dates),
+            'status': pd.Categorical.from_codes(
+                rng.choice(len(ASSET_STATUSES), num_assets, p=[0.8, 0.15, 0.05]), ASSET_STATUSES
+            )
+        })
+        
+        # Solo el número de vulnerabilidades por activo se calcula por adelantado
+        vulns_per_asset = rng.integers(0, 50, num_assets)
+        asset_ends = np.cumsum(vulns_per_asset)
+        total = int(asset_ends[-1]) if num_assets else 0
+        
+        metadata = {
+            'scan_date': end_date.strftime('%Y-%m-%d %H:%M:%S'),
+            'total_assets': num_assets,
+            'total_vulnerabilities': total,
+            'critical_count': 0
+        }
+        
+        return {
+            'assets': assets,
+            'vulnerabilities': self._vulnerability_batches(
+                rng, asset_ids, asset_ends, dates, batch_size or max(total, 1), metadata
+            ),
+            'scan_metadata': metadata
         }
     
-    def _generate_vuln_description(self):
-        """Genera descripciones de vulnerabilidades realistas"""
-        templates = [
-            "Remote Code Execution vulnerability in {} service",
-            "Privilege Escalation via {}",
-            "SQL Injection in {} endpoint",
-            "Cross-Site Scripting (XSS) in {}",
-            "Buffer Overflow in {} component",
-            "Information Disclosure via {}",
-            "Denial of Service in {} service"
-        ]
+    def _vulnerability_batches(self, rng, asset_ids, asset_ends, dates, batch_size, metadata):
+        """Genera las vulnerabilidades simuladas lote a lote"""
         
-        components = ['HTTP', 'SSH', 'Database', 'Web Application', 'API', 'File System', 'Network']
+        total = int(asset_ends[-1]) if len(asset_ends) else 0
+        descriptions = [t.format(c) for t in VULN_TEMPLATES for c in VULN_COMPONENTS]
         
-        template = np.random.choice(templates)
-        component = np.random.choice(components)
+        for start in range(0, max(total, 1), batch_size):
+            rows = np.arange(start, min(start + batch_size, total))
+            size = len(rows)
+            severity_codes = rng.choice(len(SEVERITIES), size, p=[0.05, 0.15, 0.30, 0.40, 0.10])
+            metadata['critical_count'] += int((severity_codes == 0).sum())
+            
+            yield pd.DataFrame({
+                'asset_id': pd.Categorical.from_codes(
+                    np.searchsorted(asset_ends, rows, side='right'), asset_ids
+                ),
+                'cve_id': _categorical_from_ints(
+                    rng.integers(3, 5, size) * 10000 + rng.integers(1000, 9999, size),
+                    lambda v: f"CVE-202{v // 10000}-{v % 10000}"
+                ),
+                'severity': pd.Categorical.from_codes(severity_codes, SEVERITIES),
+                'cvss_score': np.round(rng.uniform(0, 10, size), 1),
+                'plugin_id': _categorical_from_ints(
+                    rng.integers(10000, 99999, size), lambda v: f"PLUGIN-{v}"
+                ),
+                'description': pd.Categorical.from_codes(
+                    rng.integers(0, len(descriptions), size), descriptions
+                ),
+                'discovery_date': pd.Categorical.from_codes(rng.integers(0, len(dates), size), dates),
+                'remediated': rng.random(size) < 0.3
+            })
+    
+    def ingest_file(self, source, filename=None, batch_size=50_000, progress_callback=None,
+                    deduplicate=False):
+        """Importa un archivo exportado de Tenable (CSV, JSON, .nessus o .xlsx)
+        
+        Devuelve el mismo diccionario que simulate_scan_data. El archivo se lee
+        por lotes, así que el consumo de memoria depende del resultado y no del
+        tamaño del archivo. progress_callback(bytes_leidos, bytes_totales, filas)
+        se invoca después de cada lote. Con deduplicate=True los hallazgos
+        repetidos se descartan al vuelo (ver FindingDeduplicator).
+        """
+        
+        data = self._ingest_batches(self.iter_file_batches(source, filename, batch_size, progress_callback),
+                                    deduplicate)
+        data['scan_metadata']['source_file'] = filename or getattr(source, 'name', str(source))
+        return data
+    
+    def _ingest_batches(self, normalized_batches, deduplicate=False):
+        """Reúne lotes normalizados (ver _normalize_findings) en el formato de simulate_scan_data"""
+        
+        assets = pd.DataFrame(columns=ASSET_COLUMNS)
+        batches = []
+        deduplicator = FindingDeduplicator() if deduplicate else None
+        
+        for batch in normalized_batches:
+            if deduplicator is not None:
+                batch = deduplicator.filter(batch)
+            assets = pd.concat([assets, batch[ASSET_COLUMNS]], ignore_index=True)
+            assets = assets.drop_duplicates('asset_id', keep='last')
+            batches.append(_compact(batch[VULN_COLUMNS], VULN_CATEGORIES))
+        
+        vulnerabilities = _concat_categorical(batches, VULN_COLUMNS)
+        if deduplicator is not None:
+            deduplicator.close()
+        
+        return _scan_result(assets, vulnerabilities, deduplicator.duplicates if deduplicator is not None else 0)
+    
+    def merge_scans(self, scans, deduplicate=False):
+        """Une varios escaneos (p. ej. archivos leídos en paralelo) en uno solo
+        
+        Los hallazgos pasan en orden por el mismo FindingDeduplicator que los
+        lotes de ingest_file y de cada activo queda su último registro, así que
+        el resultado es el de importar los archivos uno detrás de otro.
+        """
+        
+        deduplicator = FindingDeduplicator() if deduplicate else None
+        batches = []
+        duplicates = 0
+        for scan in scans:
+            vulnerabilities = scan['vulnerabilities']
+            if deduplicator is not None:
+                vulnerabilities = deduplicator.filter(vulnerabilities)
+            batches.append(_compact(vulnerabilities, VULN_CATEGORIES))
+            duplicates += scan['scan_metadata'].get('duplicates_dropped', 0)
+        if deduplicator is not None:
+            duplicates += deduplicator.duplicates
+            deduplicator.close()
+        
+        assets = pd.concat([scan['assets'] for scan in scans] or [pd.DataFrame(columns=ASSET_COLUMNS)],
+                           ignore_index=True)
+        return _scan_result(assets.drop_duplicates('asset_id', keep='last'),
+                            _concat_categorical(batches, VULN_COLUMNS), duplicates)
+    
+    def iter_nessus_batches(self, source, batch_size=50_000, progress_callback=None):
+        """Lee un archivo .nessus de cualquier tamaño por lotes
+        
+        El XML se recorre con iterparse y cada ReportHost/ReportItem se libera
+        al procesarse, así que la memoria es constante. Cada lote tiene las
+        columnas del DataFrame de vulnerabilidades (VULN_COLUMNS).
+        """
+        
+        for batch in self.iter_file_batches(source, batch_size=batch_size,
+                                            progress_callback=progress_callback, file_format='nessus'):
+            yield batch[VULN_COLUMNS]
+    
+    def iter_file_batches(self, source, filename=None, batch_size=50_000, progress_callback=None,
+                          file_format=None):
+        """Lee un archivo exportado y genera lotes normalizados al esquema
+        
+        Cada lote contiene las columnas de ASSET_COLUMNS y VULN_COLUMNS (una
+        fila por hallazgo). source puede ser una ruta o un objeto tipo archivo
+        binario, como el UploadedFile de Streamlit. El formato se deduce de la
+        extensión salvo que se indique file_format.
+        """
+        
+        filename = filename or getattr(source, 'name', str(source))
+        file_format = file_format or filename.rsplit('.', 1)[-1].lower()
+        if file_format not in SUPPORTED_FORMATS:
+            raise ValueError(f"Formato no soportado: .{file_format}")
+        
+        handle = open(source, 'rb') if isinstance(source, (str, bytes)) or hasattr(source, '__fspath__') else source
+        try:
+            total_bytes = _stream_size(handle)
+            counter = _CountingReader(handle)
+            stream = io.BufferedReader(counter, buffer_size=1 << 20)
+            
+            if file_format == 'csv':
+                frames = pd.read_csv(stream, chunksize=batch_size, dtype=str, keep_default_na=False,
+                                     na_values=[''])
+            elif file_format == 'json':
+                frames = _json_frames(io.TextIOWrapper(stream, encoding='utf-8-sig'), batch_size)
+            elif file_format == 'nessus':
+                frames = _nessus_frames(stream, batch_size)
+            else:
+                frames = _xlsx_frames(handle, batch_size, counter, total_bytes)
+            
+            rows = 0
+            for frame in frames:
+                batch = _normalize_findings(frame)
+                rows += len(batch)
+                if progress_callback is not None:
+                    progress_callback(min(counter.bytes_read, total_bytes), total_bytes, rows)
+                yield batch
+        finally:
+            if handle is not source:
+                handle.close()
+    
+    def _generate_vuln_description(self):
+        """Genera descripciones de vulnerabilidades realistas"""
+        template = np.random.choice(VULN_TEMPLATES)
+        component = np.random.choice(VULN_COMPONENTS)
         
         return template.format(component)
     
-    def export_to_csv(self, data, output_dir='./exports'):
-        """Exporta datos a CSV"""
+    def export_to_csv(self, data, output_dir='./exports', with_report=False):
+        """Exporta datos a CSV
+        
+        'vulnerabilities' puede ser un DataFrame o un iterable de lotes
+        (ver simulate_scan_stream); los lotes se escriben a medida que llegan.
+        Con with_report=True el reporte se calcula en la misma pasada.
+        """
         import os
         os.makedirs(output_dir, exist_ok=True)
         
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        report = _ReportAccumulator() if with_report else None
         
         # Exportar activos
         assets_file = f"{output_dir}/tenable_assets_{timestamp}.csv"
@@ -111,34 +441,494 @@ class TenableDataImporter:
         
         # Exportar vulnerabilidades
         vulns_file = f"{output_dir}/tenable_vulnerabilities_{timestamp}.csv"
-        data['vulnerabilities'].to_csv(vulns_file, index=False)
+        for i, batch in enumerate(_iter_batches(data['vulnerabilities'])):
+            batch.to_csv(vulns_file, index=False, mode='w' if i == 0 else 'a', header=i == 0)
+            if report is not None:
+                report.update(batch)
         
         # Exportar metadatos
         metadata_file = f"{output_dir}/tenable_metadata_{timestamp}.json"
         with open(metadata_file, 'w') as f:
             json.dump(data['scan_metadata'], f, indent=2)
         
-        return {
+        files = {
             'assets_file': assets_file,
             'vulnerabilities_file': vulns_file,
             'metadata_file': metadata_file
         }
+        if report is not None:
+            files['report'] = report.result(data['assets'])
+        return files
+    
+    def export_to_parquet(self, data, output_dir='./data_store', scan_date=None):
+        """Guarda los datos en el almacén columnar, particionados por fecha de escaneo
+        
+        A diferencia de export_to_csv no crea archivos nuevos en cada llamada:
+        la instantánea de esa fecha se reemplaza (ver data_store.ScanDataStore).
+        """
+        from data_store import ScanDataStore
+        
+        return ScanDataStore(output_dir).write_snapshot(data, scan_date)
     
     def generate_report(self, data):
-        """Genera un reporte de análisis"""
+        """Genera un reporte de análisis
+        
+        Acepta 'vulnerabilities' como DataFrame o como iterable de lotes.
+        """
         
-        vuln_df = data['vulnerabilities']
+        report = _ReportAccumulator()
+        for batch in _iter_batches(data['vulnerabilities']):
+            report.update(batch)
         
-        report = {
+        return report.result(data['assets'])
+
+
+def _scan_result(assets, vulnerabilities, duplicates_dropped):
+    """Diccionario con el formato de simulate_scan_data para un import de archivos"""
+    return {
+        'assets': _compact(assets.reset_index(drop=True), ASSET_CATEGORIES),
+        'vulnerabilities': vulnerabilities,
+        'scan_metadata': {
+            'scan_date': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            'source_file': None,
+            'total_assets': len(assets),
+            'total_vulnerabilities': len(vulnerabilities),
+            'critical_count': int((vulnerabilities['severity'] == 'Critical').sum()),
+            'duplicates_dropped': duplicates_dropped
+        }
+    }
+
+
+class FindingDeduplicator:
+    """Descarta hallazgos repetidos en un flujo de lotes con memoria acotada
+    
+    Cada fila se reduce a la huella de 8 bytes de su clave (ver
+    finding_keys.finding_hashes), la misma con la que el almacén identifica un
+    hallazgo: de cada clave se conserva la primera fila. Las huellas vistas se guardan
+    en un array ordenado; al superar max_memory_hashes se vuelcan a disco como
+    un tramo ordenado que se consulta mapeado en memoria con búsqueda binaria.
+    """
+    
+    def __init__(self, max_memory_hashes=4_000_000, spill_dir=None):
+        self.max_memory_hashes = max_memory_hashes
+        self.spill_dir = spill_dir
+        self.duplicates = 0
+        self.rows_seen = 0
+        self._memory = np.empty(0, dtype=np.uint64)
+        self._runs = []
+        self._temp_dir = None
+    
+    def filter(self, batch):
+        """Devuelve el lote sin las filas ya vistas (en este u otros lotes)"""
+        hashes = finding_hashes(batch)
+        keep = ~pd.Series(hashes).duplicated().to_numpy()
+        for seen in [self._memory] + self._runs:
+            keep &= ~sorted_contains(seen, hashes)
+        
+        self.rows_seen += len(batch)
+        self.duplicates += int(len(batch) - keep.sum())
+        self._remember(np.sort(hashes[keep]))
+        return batch[keep]
+    
+    def close(self):
+        """Libera los tramos volcados a disco"""
+        self._runs = []
+        if self._temp_dir is not None:
+            shutil.rmtree(self._temp_dir, ignore_errors=True)
+            self._temp_dir = None
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.close()
+    
+    def _remember(self, new_hashes):
+        self._memory = np.insert(self._memory, np.searchsorted(self._memory, new_hashes), new_hashes)
+        if len(self._memory) >= self.max_memory_hashes:
+            self._spill()
+    
+    def _spill(self):
+        if self._temp_dir is None:
+            self._temp_dir = tempfile.mkdtemp(prefix='tenable_dedup_', dir=self.spill_dir)
+        run_file = os.path.join(self._temp_dir, f"run_{len(self._runs):04d}.npy")
+        np.save(run_file, self._memory)
+        self._runs.append(np.load(run_file, mmap_mode='r'))
+        self._memory = np.empty(0, dtype=np.uint64)
+
+
+def _iter_batches(vulnerabilities):
+    """Normaliza un DataFrame o un iterable de DataFrames a un iterable de lotes"""
+    if isinstance(vulnerabilities, pd.DataFrame):
+        return [vulnerabilities]
+    return vulnerabilities
+
+
+class _ReportAccumulator:
+    """Acumula las métricas de generate_report lote a lote"""
+    
+    def __init__(self):
+        self.total = 0
+        self.remediated = 0
+        self.severity_counts = pd.Series(dtype='int64')
+        self.cve_counts = pd.Series(dtype='int64')
+        self.critical_assets = set()
+    
+    def update(self, vuln_df):
+        self.total += len(vuln_df)
+        self.remediated += int(vuln_df['remediated'].sum())
+        self.severity_counts = self.severity_counts.add(
+            vuln_df['severity'].value_counts(), fill_value=0
+        )
+        self.cve_counts = self.cve_counts.add(vuln_df['cve_id'].value_counts(), fill_value=0)
+        self.critical_assets.update(vuln_df.loc[vuln_df['severity'] == 'Critical', 'asset_id'].unique())
+    
+    def result(self, assets_df):
+        severity = self.severity_counts[self.severity_counts > 0].astype(int)
+        top_cves = self.cve_counts.astype(int).sort_values(ascending=False, kind='stable').head(10)
+        remediation = self.remediated / self.total if self.total else float('nan')
+        
+        return {
             'summary': {
-                'total_assets': len(data['assets']),
-                'total_vulnerabilities': len(vuln_df),
-                'critical_assets': len(vuln_df[vuln_df['severity'] == 'Critical']['asset_id'].unique()),
-                'remediation_rate': f"{vuln_df['remediated'].mean() * 100:.1f}%"
+                'total_assets': len(assets_df),
+                'total_vulnerabilities': self.total,
+                'critical_assets': len(self.critical_assets),
+                'remediation_rate': f"{remediation * 100:.1f}%"
             },
-            'severity_distribution': vuln_df['severity'].value_counts().to_dict(),
-            'top_vulnerabilities': vuln_df['cve_id'].value_counts().head(10).to_dict(),
-            'assets_at_risk': data['assets'][data['assets']['status'] == 'Active'].shape[0]
+            'severity_distribution': severity.sort_values(ascending=False, kind='stable').to_dict(),
+            'top_vulnerabilities': top_cves.to_dict(),
+            'assets_at_risk': assets_df[assets_df['status'] == 'Active'].shape[0]
         }
-        
-        return report
\ No newline at end of file
+
+
+class _CountingReader(io.RawIOBase):
+    """Envoltorio de lectura que cuenta los bytes consumidos del origen"""
+    
+    def __init__(self, raw):
+        self.raw = raw
+        self.bytes_read = 0
+    
+    def readable(self):
+        return True
+    
+    def readinto(self, buffer):
+        data = self.raw.read(len(buffer))
+        size = len(data)
+        buffer[:size] = data
+        self.bytes_read += size
+        return size
+
+
+def _stream_size(handle):
+    """Tamaño total en bytes de un objeto tipo archivo, sin mover su posición"""
+    size = getattr(handle, 'size', None)
+    if size is not None:
+        return size
+    position = handle.tell()
+    size = handle.seek(0, io.SEEK_END)
+    handle.seek(position)
+    return size - position
+
+
+def _json_records(text_stream, chunk_size=1 << 20):
+    """Decodifica objetos JSON de un arreglo o de JSON Lines sin cargar todo el archivo"""
+    decoder = json.JSONDecoder()
+    separators = re.compile(r'[\s,]*')
+    buffer, position, eof = '', 0, False
+    in_array = None
+    
+    while True:
+        position = separators.match(buffer, position).end()
+        if in_array is None and position < len(buffer):
+            in_array = buffer[position] == '['
+            if in_array:
+                position += 1
+            continue
+        if in_array and buffer.startswith(']', position):
+            return
+        if position < len(buffer):
+            try:
+                record, end = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                if eof:
+                    raise ValueError("Archivo JSON inválido o truncado")
+            else:
+                if end < len(buffer) or eof:
+                    position = end
+                    # Exportación envuelta: {"vulnerabilities": [...]}
+                    if isinstance(record, dict) and isinstance(record.get('vulnerabilities'), list):
+                        yield from record['vulnerabilities']
+                    else:
+                        yield record
+                    continue
+        if eof:
+            return
+        chunk = text_stream.read(chunk_size)
+        eof = not chunk
+        buffer, position = buffer[position:] + chunk, 0
+
+
+def _json_frames(text_stream, batch_size):
+    records = []
+    for record in _json_records(text_stream):
+        records.append(record)
+        if len(records) >= batch_size:
+            yield _flatten_records(records)
+            records = []
+    if records:
+        yield _flatten_records(records)
+
+
+def _flatten_records(records):
+    """Aplana registros JSON anidados (asset.*, plugin.*) en columnas"""
+    frame = pd.json_normalize(records)
+    if 'asset.operating_system' in frame:
+        frame['asset.operating_system'] = frame['asset.operating_system'].str.get(0)
+    return frame
+
+
+# Campos de un registro de exportación de la API que usa _normalize_findings
+_EXPORT_FIELDS = {
+    'asset.uuid': ('asset', 'uuid'), 'asset.ipv4': ('asset', 'ipv4'), 'asset.hostname': ('asset', 'hostname'),
+    'asset.fqdn': ('asset', 'fqdn'), 'asset.operating_system': ('asset', 'operating_system'),
+    'plugin.id': ('plugin', 'id'), 'plugin.name': ('plugin', 'name'), 'plugin.cve': ('plugin', 'cve'),
+    'plugin.cvss3_base_score': ('plugin', 'cvss3_base_score'),
+    'plugin.cvss_base_score': ('plugin', 'cvss_base_score'),
+    'severity': (None, 'severity'), 'state': (None, 'state'),
+    'first_found': (None, 'first_found'), 'last_found': (None, 'last_found')
+}
+
+
+def _export_frame(records):
+    """Equivalente a _flatten_records para los registros de la API, leyendo solo los campos usados
+
+    pd.json_normalize aplana todos los campos anidados; aquí cada columna es
+    una comprensión sobre los registros, varias veces más rápida por chunk.
+    """
+    columns = {}
+    for column, (parent, key) in _EXPORT_FIELDS.items():
+        if parent is None:
+            columns[column] = [r.get(key) for r in records]
+        else:
+            columns[column] = [(r.get(parent) or {}).get(key) for r in records]
+    if not any(v is not None for v in columns['asset.fqdn']):
+        del columns['asset.fqdn']
+    columns['asset.operating_system'] = [v[0] if isinstance(v, list) and v else v
+                                         for v in columns['asset.operating_system']]
+    frame = pd.DataFrame(columns)
+    # Sin CVSSv3 se usa el v2, como hace _normalize_findings con columnas ausentes
+    frame['plugin.cvss3_base_score'] = frame['plugin.cvss3_base_score'].fillna(frame['plugin.cvss_base_score'])
+    return frame
+
+
+def _nessus_frames(stream, batch_size):
+    """Lee un archivo .nessus por ReportHost/ReportItem con memoria constante
+    
+    Cada elemento se procesa al cerrarse y se elimina de su padre, de modo que
+    el árbol en memoria nunca crece más allá del ReportItem en curso.
+    """
+    rows = []
+    parents = []
+    host = {}
+    try:
+        for event, element in ET.iterparse(stream, events=('start', 'end')):
+            if event == 'start':
+                parents.append(element)
+                if element.tag == 'ReportHost':
+                    host = {'name': element.get('name')}
+                continue
+            
+            parents.pop()
+            if element.tag == 'tag' and parents and parents[-1].tag == 'HostProperties':
+                host[element.get('name')] = element.text
+                continue
+            if element.tag == 'HostProperties':
+                pass
+            elif element.tag == 'ReportItem':
+                rows.append(_nessus_row(host, element))
+                if len(rows) >= batch_size:
+                    yield pd.DataFrame(rows)
+                    rows = []
+            elif element.tag != 'ReportHost':
+                continue
+            
+            element.clear()
+            if parents:
+                parents[-1].remove(element)
+    except ET.ParseError as exc:
+        raise ValueError(f"Archivo .nessus inválido: {exc}") from exc
+    if rows:
+        yield pd.DataFrame(rows)
+
+
+def _nessus_row(host, item):
+    """Convierte un ReportItem (y las propiedades de su host) en una fila"""
+    return {
+        'asset_id': host.get('host-uuid') or host.get('tenable-uuid'),
+        'ip_address': host.get('host-ip') or host['name'],
+        'hostname': host.get('hostname') or host.get('host-fqdn') or host.get('netbios-name'),
+        'os': host.get('operating-system'),
+        'last_scanned': host.get('HOST_END'),
+        'cve_id': [cve.text for cve in item.iter('cve')],
+        'severity': item.get('severity') or item.findtext('risk_factor'),
+        'cvss_score': item.findtext('cvss3_base_score') or item.findtext('cvss_base_score'),
+        'plugin_id': item.get('pluginID'),
+        'description': item.get('pluginName'),
+        'discovery_date': host.get('HOST_START')
+    }
+
+
+def _xlsx_frames(handle, batch_size, counter, total_bytes):
+    """Lee una hoja .xlsx en modo solo lectura (requiere openpyxl)"""
+    try:
+        from openpyxl import load_workbook
+    except ImportError as exc:
+        raise ValueError("Se requiere openpyxl para importar archivos .xlsx") from exc
+    
+    sheet = load_workbook(handle, read_only=True, data_only=True).active
+    rows = sheet.iter_rows(values_only=True)
+    header = [str(name) for name in next(rows, ())]
+    total_rows = max((sheet.max_row or 1) - 1, 1)
+    batch, done = [], 0
+    
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            done += len(batch)
+            counter.bytes_read = total_bytes * min(done / total_rows, 1)
+            yield pd.DataFrame(batch, columns=header, dtype=str)
+            batch = []
+    counter.bytes_read = total_bytes
+    if batch:
+        yield pd.DataFrame(batch, columns=header, dtype=str)
+
+
+def _normalize_findings(frame):
+    """Mapea un lote con columnas de Tenable al esquema de activos/vulnerabilidades"""
+    lowered = {str(column).strip().lower(): column for column in frame.columns}
+    columns = {}
+    for target, aliases in COLUMN_ALIASES.items():
+        source = next((lowered[a] for a in aliases if a in lowered), None)
+        columns[target] = frame[source] if source is not None else pd.Series(np.nan, index=frame.index)
+    df = pd.DataFrame(columns)
+    
+    # Las exportaciones JSON traen varias CVE por hallazgo: una fila por CVE
+    df = df.explode('cve_id', ignore_index=True)
+    
+    today = datetime.now().strftime('%Y-%m-%d')
+    df['asset_id'] = df['asset_id'].fillna(df['ip_address']).fillna(df['hostname']).fillna('UNKNOWN')
+    df['severity'] = df['severity'].astype(str).str.strip().str.lower().map(SEVERITY_ALIASES).fillna('Info')
+    df['cvss_score'] = pd.to_numeric(df['cvss_score'], errors='coerce').round(1)
+    df['plugin_id'] = _format_plugin_ids(df['plugin_id'])
+    df['discovery_date'] = _format_dates(df['discovery_date']).fillna(today)
+    df['last_scanned'] = _format_dates(df['last_scanned']).fillna(df['discovery_date'])
+    df['status'] = df['status'].fillna('Active')
+    
+    remediated = df['remediated']
+    if remediated.dtype != bool:
+        remediated = remediated.astype(str).str.strip().str.lower().isin(
+            ['true', '1', 'fixed', 'remediated', 'resolved']
+        )
+    df['remediated'] = remediated
+    
+    return df
+
+
+def _format_plugin_ids(values):
+    """Normaliza los IDs de plugin al formato PLUGIN-<id>"""
+    text = values.astype('string').str.strip().str.replace(r'\.0$', '', regex=True)
+    text = text.where(~text.str.fullmatch(r'\d+', na=False), 'PLUGIN-' + text)
+    return text.astype(object).where(text.notna(), None)
+
+
+def _format_dates(values):
+    """Convierte fechas en cualquier formato conocido a 'YYYY-MM-DD'"""
+    uniques = pd.Series(values.dropna().unique())
+    if uniques.empty:
+        return pd.Series(None, index=values.index, dtype=object)
+    # Las fechas se repiten mucho: se interpretan solo los valores únicos
+    parsed = pd.to_datetime(uniques, errors='coerce', utc=True, format='mixed')
+    formatted = parsed.dt.strftime('%Y-%m-%d').astype(object).where(parsed.notna(), None)
+    return values.map(dict(zip(uniques, formatted)))
+
+
+def normalize_schema(data):
+    """Aplica los tipos compactos del esquema a activos y vulnerabilidades
+
+    Texto repetitivo como categóricas (severity con las categorías de
+    SEVERITIES), cvss_score como float64 y remediated como bool. plugin_id,
+    cve_id y las fechas siguen siendo texto, solo que categórico: no se
+    convierten a enteros ni a datetime64 (ver plugin_numbers para los
+    plugins como int32).
+    """
+    data['assets'] = _compact(data['assets'], ASSET_CATEGORIES)
+    data['vulnerabilities'] = _compact(data['vulnerabilities'], VULN_CATEGORIES)
+    return data
+
+
+def _compact(df, categories):
+    df = df.copy()
+    for column in categories:
+        if column in df and not isinstance(df[column].dtype, pd.CategoricalDtype):
+            df[column] = df[column].astype('category')
+    if 'severity' in df and list(df['severity'].cat.categories) != SEVERITIES:
+        df['severity'] = df['severity'].cat.set_categories(SEVERITIES)
+    if 'cvss_score' in df:
+        df['cvss_score'] = pd.to_numeric(df['cvss_score'], errors='coerce').astype(np.float64)
+    if 'remediated' in df and df['remediated'].dtype != bool:
+        df['remediated'] = df['remediated'].fillna(False).astype(bool)
+    return df
+
+
+def plugin_numbers(values):
+    """Número de cada plugin ('PLUGIN-<id>') como int32; -1 si falta o no es válido
+
+    Solo se interpretan los valores distintos.
+    """
+    codes, uniques = pd.factorize(pd.Series(values))
+    text = pd.Series(uniques, dtype=object).astype('string').str.extract(r'(\d+)$')[0]
+    numbers = pd.to_numeric(text, errors='coerce').fillna(-1).to_numpy(dtype=np.int32)
+    return np.append(numbers, np.int32(-1))[codes]
+
+
+def memory_report(data):
+    """Memoria por columna con los tipos actuales frente a texto en objetos Python
+
+    object_bytes es lo que ocuparía la columna como object con un str por fila
+    (lo que produce leer un CSV sin tipos); se calcula sin materializarla.
+    Las columnas numéricas y booleanas cuentan igual en ambos casos.
+    """
+    rows = []
+    for table in ('assets', 'vulnerabilities'):
+        for column, values in data[table].items():
+            size = int(values.memory_usage(deep=True, index=False))
+            rows.append({'table': table, 'column': column, 'dtype': str(values.dtype), 'bytes': size,
+                         'object_bytes': _object_bytes(values, size)})
+    report = pd.DataFrame(rows, columns=['table', 'column', 'dtype', 'bytes', 'object_bytes'])
+    report['ratio'] = (report['object_bytes'] / report['bytes'].clip(lower=1)).round(1)
+    return report
+
+
+def _object_bytes(values, size):
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        codes = values.cat.codes.to_numpy()
+        counts = np.bincount(codes[codes >= 0], minlength=len(values.cat.categories))
+        sizes = np.array([sys.getsizeof(str(v)) for v in values.cat.categories], dtype=np.int64)
+        return int(8 * len(values) + counts @ sizes)
+    if pd.api.types.is_numeric_dtype(values) or pd.api.types.is_bool_dtype(values):
+        return size
+    return int(values.astype(object).memory_usage(deep=True, index=False))
+
+
+def _concat_categorical(frames, columns):
+    """Concatena lotes unificando las categorías de cada columna categórica"""
+    if not frames:
+        return pd.DataFrame(columns=columns)
+    result = {}
+    for column in columns:
+        parts = [frame[column] for frame in frames]
+        if isinstance(parts[0].dtype, pd.CategoricalDtype):
+            result[column] = pd.api.types.union_categoricals(parts)
+        else:
+            result[column] = pd.concat(parts, ignore_index=True)
+    return pd.DataFrame(result)
\ No newline at end of file
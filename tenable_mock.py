@@ -0,0 +1,274 @@
+"""
+Servidor de pruebas de la API de Tenable
+Implementa el flujo de exportación de vulnerabilidades con datos simulados, para probar sin conexión
+
+Uso:
+    python tenable_mock.py --port 8835 --assets 5000
+    (en la página de importación: URL http://127.0.0.1:8835 y cualquier Access/Secret Key)
+"""
+
+import argparse
+import json
+import math
+import random
+import re
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+from tenable_api import TokenBucket
+from tenable_importer import TenableDataImporter, plugin_numbers
+
+_STATUS_PATH = re.compile(r'^/vulns/export/([\w-]+)/status$')
+_CHUNK_PATH = re.compile(r'^/vulns/export/([\w-]+)/chunks/(\d+)$')
+_CANCEL_PATH = re.compile(r'^/vulns/export/([\w-]+)/cancel$')
+
+
+def finding_records(data):
+    """Convierte un escaneo simulado en registros con el formato de exportación de Tenable.io"""
+    assets = data['assets'].set_index('asset_id')
+    vulns = data['vulnerabilities']
+    ids = vulns['asset_id'].astype(str).to_numpy()
+    ips = assets['ip_address'].reindex(ids).to_numpy()
+    hostnames = assets['hostname'].reindex(ids).to_numpy()
+    systems = assets['os'].astype(str).reindex(ids).to_numpy()
+    plugin_ids = plugin_numbers(vulns['plugin_id'])
+    dates = (vulns['discovery_date'].astype(str) + 'T00:00:00.000Z').to_numpy()
+    states = np.where(vulns['remediated'].to_numpy(dtype=bool), 'FIXED', 'OPEN')
+
+    return [
+        {
+            'asset': {'uuid': asset_id, 'ipv4': ip, 'hostname': hostname, 'operating_system': [system]},
+            'plugin': {'id': int(plugin_id), 'name': name, 'cve': [cve], 'cvss3_base_score': float(score)},
+            'severity': severity.lower(),
+            'state': state,
+            'first_found': date,
+            'last_found': date
+        }
+        for asset_id, ip, hostname, system, plugin_id, name, cve, score, severity, state, date in zip(
+            ids, ips, hostnames, systems, plugin_ids, vulns['description'].astype(str), vulns['cve_id'].astype(str),
+            vulns['cvss_score'], vulns['severity'].astype(str), states, dates
+        )
+    ]
+
+
+class MockTenableServer(ThreadingHTTPServer):
+    """Servidor HTTP con el estado de las exportaciones
+
+    Cada exportación genera un escaneo con simulate_scan_data y lo reparte en
+    chunks de num_assets activos, serializados de antemano para que la prueba
+    mida al cliente y no al generador. Los chunks se publican uno a uno cada
+    chunk_delay segundos, como hace Tenable mientras procesa la exportación,
+    hasta que se cancela (POST /vulns/export/<uuid>/cancel).
+
+    Fallos y límites inyectables:
+    - fail_rate: fracción de las peticiones que responde 503.
+    - rate_limit: peticiones por segundo admitidas; el resto recibe 429 con
+      Retry-After (segundos enteros, como la API real).
+    - latency/capacity: cada descarga tarda latency segundos, multiplicados
+      por las descargas simultáneas que superan capacity (servidor saturado).
+    """
+
+    daemon_threads = True
+
+    def __init__(self, address, num_assets=1000, days_back=30, chunk_delay=0.05, fail_rate=0.0, seed=42,
+                 rate_limit=None, latency=0.0, capacity=4):
+        super().__init__(address, MockTenableHandler)
+        self.num_assets = num_assets
+        self.days_back = days_back
+        self.chunk_delay = chunk_delay
+        self.fail_rate = fail_rate
+        self.seed = seed
+        # Los fallos inyectados dependen de la semilla, no del azar global
+        self.random = random.Random(seed)
+        self.limiter = TokenBucket(rate_limit) if rate_limit else None
+        self.latency = latency
+        self.capacity = capacity
+        self.exports = {}
+        self.requests = 0
+        self.throttled = 0
+        self.downloading = 0
+        self._chunks = {}
+        self.lock = threading.Lock()
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def create_export(self, num_assets):
+        export_uuid = str(uuid.uuid4())
+        with self.lock:
+            chunks = self._chunks.get(num_assets)
+        if chunks is None:
+            chunks = self._build_chunks(num_assets)
+            with self.lock:
+                self._chunks[num_assets] = chunks
+        with self.lock:
+            self.exports[export_uuid] = {'created': time.monotonic(), 'chunks': chunks, 'cancelled': False}
+        return export_uuid
+
+    def _build_chunks(self, num_assets):
+        """Chunks serializados; con la misma semilla son iguales en cada exportación"""
+        data = TenableDataImporter().simulate_scan_data(days_back=self.days_back, num_assets=self.num_assets,
+                                                        vectorized=True, seed=self.seed)
+        records = finding_records(data)
+        # Los hallazgos vienen ordenados por activo: cada chunk agrupa num_assets activos
+        asset_ids = data['vulnerabilities']['asset_id'].astype(str).to_numpy()
+        starts = np.flatnonzero(np.r_[True, asset_ids[1:] != asset_ids[:-1]])[::num_assets]
+        bounds = np.r_[starts, len(records)] if len(records) else np.array([0, 0])
+        return [json.dumps(records[start:end]).encode() for start, end in zip(bounds[:-1], bounds[1:])]
+
+    def export_status(self, export_uuid):
+        export = self.exports[export_uuid]
+        published = int((time.monotonic() - export['created']) / self.chunk_delay) if self.chunk_delay else None
+        available = len(export['chunks']) if published is None else min(published, len(export['chunks']))
+        if export['cancelled']:
+            state = 'CANCELLED'
+        else:
+            state = 'FINISHED' if available == len(export['chunks']) else 'PROCESSING'
+        return {
+            'status': state,
+            'chunks_available': list(range(1, available + 1)),
+            'chunks_failed': [],
+            'chunks_cancelled': [],
+            'total_chunks': len(export['chunks'])
+        }
+
+
+class MockTenableHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        if not self._accept():
+            return
+        if self.path == '/session':
+            return self._send(200, {'username': 'mock@tenable.local', 'container_name': 'Defense Center (mock)'})
+        match = _STATUS_PATH.match(self.path)
+        if match and match.group(1) in self.server.exports:
+            return self._send(200, self.server.export_status(match.group(1)))
+        match = _CHUNK_PATH.match(self.path)
+        if match and match.group(1) in self.server.exports:
+            chunks = self.server.exports[match.group(1)]['chunks']
+            chunk_id = int(match.group(2))
+            if 1 <= chunk_id <= len(self.server.export_status(match.group(1))['chunks_available']):
+                self._simulate_latency()
+                return self._send(200, body=chunks[chunk_id - 1])
+        self._send(404, {'error': 'Not found'})
+
+    def do_POST(self):
+        if not self._accept():
+            return
+        length = int(self.headers.get('Content-Length') or 0)
+        payload = json.loads(self.rfile.read(length) or b'{}')
+        match = _CANCEL_PATH.match(self.path)
+        if match and match.group(1) in self.server.exports:
+            self.server.exports[match.group(1)]['cancelled'] = True
+            return self._send(200, {'status': 'CANCELLED'})
+        if self.path != '/vulns/export':
+            return self._send(404, {'error': 'Not found'})
+        num_assets = min(max(int(payload.get('num_assets', 500)), 50), 5000)
+        self._send(200, {'export_uuid': self.server.create_export(num_assets)})
+
+    def _accept(self):
+        """Comprueba las credenciales e inyecta límites y fallos transitorios"""
+        server = self.server
+        with server.lock:
+            server.requests += 1
+        if 'accessKey=' not in self.headers.get('X-ApiKeys', ''):
+            self._send(401, {'error': 'Invalid Credentials'})
+            return False
+        if server.limiter is not None:
+            wait_s = server.limiter.try_acquire()
+            if wait_s:
+                with server.lock:
+                    server.throttled += 1
+                self._send(429, {'error': 'Too Many Requests'}, headers={'Retry-After': str(math.ceil(wait_s))})
+                return False
+        with server.lock:
+            failed = server.fail_rate and server.random.random() < server.fail_rate
+        if failed:
+            self._send(503, {'error': 'Service Unavailable'})
+            return False
+        return True
+
+    def _simulate_latency(self):
+        server = self.server
+        if not server.latency:
+            return
+        with server.lock:
+            server.downloading += 1
+            load = server.downloading
+        try:
+            time.sleep(server.latency * max(1.0, load / server.capacity))
+        finally:
+            with server.lock:
+                server.downloading -= 1
+
+    def _send(self, status, payload=None, body=None, headers=None):
+        body = body if body is not None else json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_mock_server(port=0, **options):
+    """Arranca el servidor en un hilo; devuelve el servidor (su URL en server.url)"""
+    server = MockTenableServer(('127.0.0.1', port), **options)
+    threading.Thread(target=server.serve_forever, daemon=True, name='tenable-mock').start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Servidor de pruebas de la API de Tenable")
+    parser.add_argument('--port', type=int, default=8835)
+    parser.add_argument('--assets', type=int, default=1000, help="Activos por exportación")
+    parser.add_argument('--days', type=int, default=30, help="Días de hallazgos simulados")
+    parser.add_argument('--chunk-delay', type=float, default=0.05, help="Segundos entre chunks publicados")
+    parser.add_argument('--fail-rate', type=float, default=0.0, help="Fracción de peticiones que responden 503")
+    parser.add_argument('--rate-limit', type=float, default=None, help="Peticiones/s admitidas (el resto, 429)")
+    parser.add_argument('--latency', type=float, default=0.0, help="Segundos por descarga de chunk")
+    parser.add_argument('--capacity', type=int, default=4, help="Descargas simultáneas sin degradar la latencia")
+    parser.add_argument('--client-rate', type=float, default=10.0, help="Peticiones/s del cliente (--benchmark)")
+    parser.add_argument('--benchmark', action='store_true', help="Mide una importación completa y termina")
+    args = parser.parse_args()
+
+    server = start_mock_server(args.port, num_assets=args.assets, days_back=args.days,
+                               chunk_delay=args.chunk_delay, fail_rate=args.fail_rate, rate_limit=args.rate_limit,
+                               latency=args.latency, capacity=args.capacity)
+    if not args.benchmark:
+        print(f"Servidor de pruebas de Tenable en {server.url}", flush=True)
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            return
+
+    # La exportación se genera antes de medir: solo cuenta el cliente
+    server.create_export(500)
+    importer = TenableDataImporter()
+    importer.connect('mock', 'mock', server.url, requests_per_second=args.client_rate)
+    started = time.perf_counter()
+    data = importer.import_from_api()
+    elapsed = time.perf_counter() - started
+    rows = len(data['vulnerabilities'])
+    stats = data['scan_metadata']['api_stats']
+    print(f"{rows:,} hallazgos de {len(data['assets']):,} activos en {elapsed:.2f}s "
+          f"({rows / elapsed:,.0f} filas/s, {server.requests:,} peticiones, {server.throttled:,} con 429)")
+    print(f"Cliente: {stats['requests_per_s']:.1f} peticiones/s, {stats['bytes_per_s'] / 1e6:.1f} MB/s, "
+          f"{stats['throttled_s']:.1f}s en espera, concurrencia final {stats['concurrency']} "
+          f"(máxima {stats['peak_concurrency']})")
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
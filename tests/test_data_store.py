@@ -0,0 +1,100 @@
+import pandas as pd
+
+from data_store import ScanDataStore
+from tenable_importer import TenableDataImporter
+
+
+def subset(data, asset_ids):
+    """Escaneo con solo los activos indicados y sus hallazgos"""
+    assets = data['assets'][data['assets']['asset_id'].isin(asset_ids)]
+    vulns = data['vulnerabilities'][data['vulnerabilities']['asset_id'].isin(asset_ids)]
+    return dict(data, assets=assets.reset_index(drop=True), vulnerabilities=vulns.reset_index(drop=True))
+
+
+def test_delta_with_subset_of_assets_keeps_inventory(tmp_path):
+    store = ScanDataStore(str(tmp_path))
+    data = TenableDataImporter().simulate_scan_data(num_assets=40, seed=1, vectorized=True)
+    store.write_snapshot(data, scan_date='2024-01-01')
+
+    partial = subset(data, data['assets']['asset_id'].head(5))
+    partial['assets'] = partial['assets'].assign(ip_address='10.0.0.1')
+    store.write_delta(partial, scan_date='2024-01-02', include_remediated=False)
+
+    assets = store.load_snapshot()['assets']
+    assert len(assets) == 40
+    assert set(assets['asset_id'].astype(str)) == set(data['assets']['asset_id'].astype(str))
+    updated = assets.set_index(assets['asset_id'].astype(str))['ip_address']
+    assert (updated[partial['assets']['asset_id'].astype(str)] == '10.0.0.1').all()
+    assert store.database.query('SELECT COUNT(*) AS n FROM assets')['n'][0] == len(assets)
+
+
+def test_delta_adds_new_assets(tmp_path):
+    store = ScanDataStore(str(tmp_path))
+    data = TenableDataImporter().simulate_scan_data(num_assets=20, seed=1, vectorized=True)
+    ids = data['assets']['asset_id']
+    store.write_snapshot(subset(data, ids.head(15)), scan_date='2024-01-01')
+    store.write_delta(subset(data, ids.tail(5)), scan_date='2024-01-02', include_remediated=False)
+
+    assets = store.current_assets()
+    assert len(assets) == 20
+    assert not assets['asset_id'].astype(str).duplicated().any()
+
+
+def test_older_delta_does_not_overwrite_newer_inventory(tmp_path):
+    store = ScanDataStore(str(tmp_path))
+    data = TenableDataImporter().simulate_scan_data(num_assets=10, seed=1, vectorized=True)
+    store.write_snapshot(data, scan_date='2024-01-05')
+
+    extra = TenableDataImporter().simulate_scan_data(num_assets=12, seed=2, vectorized=True)
+    older = subset(extra, extra['assets']['asset_id'])
+    older['assets'] = older['assets'].assign(ip_address='10.9.9.9')
+    store.write_delta(older, scan_date='2024-01-01', include_remediated=False)
+
+    current = store.current_assets()
+    by_id = current.set_index(current['asset_id'].astype(str))['ip_address']
+    original = data['assets'].set_index(data['assets']['asset_id'].astype(str))['ip_address']
+    new_ids = sorted(set(extra['assets']['asset_id'].astype(str)) - set(original.index))
+    assert len(current) == len(original) + len(new_ids)
+    assert (by_id[original.index] == original).all()
+    assert pd.Series(by_id[new_ids] == '10.9.9.9').all()
+
+
+def test_partial_import_only_remediates_its_assets(tmp_path):
+    store = ScanDataStore(str(tmp_path))
+    data = TenableDataImporter().simulate_scan_data(num_assets=30, seed=1, vectorized=True)
+    data['vulnerabilities']['remediated'] = False
+    store.write_snapshot(data, scan_date='2024-01-01')
+
+    # Archivo de un solo escáner: cinco activos, y a cada uno le falta su primer hallazgo
+    ids = data['assets']['asset_id'].head(5)
+    partial = subset(data, ids)
+    vulns = partial['vulnerabilities']
+    first = ~vulns['asset_id'].astype(str).duplicated().to_numpy()
+    partial['vulnerabilities'] = vulns[~first].reset_index(drop=True)
+    result = store.write_delta(partial, scan_date='2024-01-02')
+
+    assert result['remediated'] == 5
+    current = store.current_vulnerabilities()
+    closed = current[current['remediated'].to_numpy(dtype=bool)]
+    assert set(closed['asset_id'].astype(str)) == set(ids.astype(str))
+    assert store.database.query('SELECT COUNT(*) AS n FROM findings WHERE remediated = 1')['n'][0] == 5
+
+
+def test_delta_from_batches_matches_single_frame(tmp_path):
+    importer = TenableDataImporter()
+    data = importer.simulate_scan_data(num_assets=30, seed=1, vectorized=True)
+    rescan = importer.simulate_scan_data(num_assets=30, seed=2, vectorized=True)
+    vulns = pd.concat([data['vulnerabilities'].iloc[100:], rescan['vulnerabilities']], ignore_index=True)
+
+    results = []
+    for name, batches in [('frame', vulns), ('batches', (vulns.iloc[i:i + 97] for i in range(0, len(vulns), 97)))]:
+        store = ScanDataStore(str(tmp_path / name))
+        store.write_snapshot(data, scan_date='2024-01-01')
+        result = store.write_delta(dict(data, vulnerabilities=batches), scan_date='2024-01-02')
+        results.append(({k: result[k] for k in ('new', 'updated', 'unchanged', 'remediated')},
+                        store.current_vulnerabilities().sort_values(['asset_id', 'plugin_id', 'cve_id'])
+                        .reset_index(drop=True).astype(str)))
+
+    assert results[0][0] == results[1][0]
+    assert results[0][0]['remediated'] > 0
+    pd.testing.assert_frame_equal(results[0][1], results[1][1])
@@ -0,0 +1,26 @@
+import os
+
+import pytest
+
+from data_store import LOCK_FILE, ScanDataStore
+from dataset_registry import DatasetRegistry, StaleVersionError
+from tenable_importer import TenableDataImporter
+
+
+def test_stale_version_is_not_materialized(tmp_path):
+    store = ScanDataStore(str(tmp_path))
+    importer = TenableDataImporter()
+    store.write_snapshot(importer.simulate_scan_data(num_assets=10, seed=1, vectorized=True), scan_date='2024-01-01')
+    version = store.version()
+
+    # Un import publica entre el cálculo de la versión y la lectura
+    store.write_snapshot(importer.simulate_scan_data(num_assets=12, seed=2, vectorized=True), scan_date='2024-01-02')
+    registry = DatasetRegistry(str(tmp_path))
+    with pytest.raises(StaleVersionError):
+        registry.open(version)
+    assert registry.versions() == []
+    assert not os.path.exists(os.path.join(str(tmp_path), LOCK_FILE))
+
+    data = registry.open(store.version())
+    assert len(data['assets']) == 12
+    assert registry.versions() == [store.version()]
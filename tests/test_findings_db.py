@@ -0,0 +1,59 @@
+import findings_db
+from aggregations import asset_types
+from finding_keys import finding_hashes
+from findings_db import FINDING_INDEXES, FindingsDatabase
+from query_engine import VulnerabilityIndex
+from tenable_importer import TenableDataImporter
+
+
+def test_unknown_size_switches_to_bulk_load(tmp_path, monkeypatch):
+    monkeypatch.setattr(findings_db, 'BULK_LOAD_ROWS', 100)
+    database = FindingsDatabase(str(tmp_path))
+    vulns = TenableDataImporter().simulate_scan_data(num_assets=10, seed=1, vectorized=True)['vulnerabilities']
+
+    with database.import_scan('2024-01-01', 'delta', expected_rows=None) as catalog:
+        catalog.add_findings(vulns.iloc[:50], finding_hashes(vulns.iloc[:50]))
+        assert not catalog.bulk
+        catalog.add_findings(vulns.iloc[50:], finding_hashes(vulns.iloc[50:]))
+        assert catalog.bulk
+
+    indexes = set(database.query("SELECT name FROM sqlite_master WHERE type = 'index'")['name'])
+    assert set(FINDING_INDEXES) <= indexes
+    assert database.query('SELECT COUNT(*) AS n FROM findings')['n'][0] == len(vulns)
+
+
+def test_filtered_findings_match_vulnerability_index(tmp_path):
+    data = TenableDataImporter().simulate_scan_data(num_assets=60, seed=2, vectorized=True)
+    vulns = data['vulnerabilities'].drop_duplicates(['asset_id', 'plugin_id', 'cve_id']).reset_index(drop=True)
+    data = dict(data, vulnerabilities=vulns)
+    database = FindingsDatabase(str(tmp_path))
+    with database.import_scan('2024-01-01', 'full') as catalog:
+        catalog.add_assets(data['assets'])
+        catalog.add_findings(vulns, finding_hashes(vulns))
+
+    dates = sorted(vulns['discovery_date'].astype(str).unique())
+    filters = dict(start_date=dates[5], end_date=dates[-5], severities=('Critical', 'High'),
+                   asset_types=('Servidores', 'Workstations'), min_cvss=5.0)
+    expected = VulnerabilityIndex(data).filter(**filters)['vulnerabilities']
+    found = database.findings(limit=len(vulns), **filters)
+
+    assert 0 < len(found) < len(vulns)
+    key = ['asset_id', 'plugin_id', 'cve_id']
+    assert (sorted(map(tuple, found[key].to_numpy().tolist()))
+            == sorted(map(tuple, expected[key].astype(str).to_numpy().tolist())))
+    assert found['cvss_score'].is_monotonic_decreasing
+    assert len(database.findings(limit=10, **filters)) == 10
+
+
+def test_existing_database_gets_asset_types(tmp_path):
+    assets = TenableDataImporter().simulate_scan_data(num_assets=20, seed=3, vectorized=True)['assets']
+    database = FindingsDatabase(str(tmp_path))
+    with database.import_scan('2024-01-01', 'full') as catalog:
+        catalog.add_assets(assets)
+    with database.pool.connection() as conn:
+        conn.execute('DROP INDEX assets_type')
+        conn.execute('ALTER TABLE assets DROP COLUMN asset_type')
+    database.close()
+
+    types = FindingsDatabase(str(tmp_path)).query('SELECT asset_id, asset_type FROM assets ORDER BY asset_id')
+    assert types['asset_type'].tolist() == asset_types(assets.sort_values('asset_id')).tolist()
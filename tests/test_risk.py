@@ -0,0 +1,46 @@
+import numpy as np
+import pandas as pd
+
+from data_store import ScanDataStore
+from risk import asset_risk, risk_pairs, top_cves
+from tenable_importer import TenableDataImporter
+
+
+def finding(asset_id, cve_id, discovery_date, severity='Critical', cvss_score=9.0):
+    return {'asset_id': asset_id, 'cve_id': cve_id, 'severity': severity, 'cvss_score': cvss_score,
+            'plugin_id': f"PLUGIN-{cve_id[-4:]}", 'description': cve_id, 'discovery_date': discovery_date,
+            'remediated': False}
+
+
+def test_age_and_exposure_raise_asset_risk():
+    assets = pd.DataFrame({'asset_id': ['A', 'B', 'C', 'D'], 'status': 'Active'})
+    vulns = pd.DataFrame([
+        finding('A', 'CVE-2024-0001', '2024-03-30'),
+        finding('B', 'CVE-2024-0002', '2024-01-01'),
+        finding('C', 'CVE-2024-0003', '2024-03-30'),
+        finding('D', 'CVE-2024-0003', '2024-03-30')
+    ])
+    risk = asset_risk(risk_pairs(vulns), assets, '2024-03-31')
+    # Mismo hallazgo: B es más antiguo y C comparte la CVE con D
+    assert risk[1] > risk[0]
+    assert risk[2] > risk[0]
+
+    top = top_cves(risk_pairs(vulns), assets, 2, '2024-03-31')
+    assert list(top['CVE']) == ['CVE-2024-0002', 'CVE-2024-0003']
+    assert top['Activos'].tolist() == [1, 2]
+
+
+def test_incremental_pairs_match_full_recompute(tmp_path):
+    store = ScanDataStore(str(tmp_path))
+    data = TenableDataImporter().simulate_scan_data(num_assets=40, seed=1, vectorized=True)
+    store.write_snapshot(data, scan_date='2024-01-01')
+
+    vulns = data['vulnerabilities'].copy()
+    touched = vulns['asset_id'].isin(data['assets']['asset_id'].head(4)).to_numpy()
+    vulns.loc[touched, 'remediated'] = ~vulns.loc[touched, 'remediated'].to_numpy(dtype=bool)
+    store.write_delta(dict(data, vulnerabilities=vulns), scan_date='2024-01-02')
+
+    assets = store.current_assets()
+    incremental = asset_risk(store.risk.read(), assets, '2024-01-02')
+    full = asset_risk(risk_pairs(store.current_vulnerabilities()), assets, '2024-01-02')
+    np.testing.assert_allclose(incremental, full)
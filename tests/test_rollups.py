@@ -0,0 +1,38 @@
+import pandas as pd
+import pytest
+
+from data_store import ScanDataStore
+from rollups import GRAINS
+from tenable_importer import TenableDataImporter
+
+
+def rollups(store):
+    return {grain: store.rollups.read(grain).sort_values(['bucket', 'severity', 'segment', 'asset_type'])
+            .reset_index(drop=True) for grain in GRAINS}
+
+
+@pytest.mark.parametrize('include_remediated', [False, True])
+def test_asset_ip_change_matches_rebuild(tmp_path, include_remediated):
+    store = ScanDataStore(str(tmp_path))
+    importer = TenableDataImporter()
+    data = importer.simulate_scan_data(num_assets=30, seed=1, vectorized=True)
+    store.write_snapshot(data, scan_date='2024-01-01')
+
+    # Rescan: dos activos cambian de IP (otro /24) y llegan hallazgos nuevos
+    rescan = importer.simulate_scan_data(num_assets=30, seed=2, vectorized=True)
+    assets = data['assets'].copy()
+    assets['ip_address'] = assets['ip_address'].astype(object)
+    moved = assets['asset_id'].head(2)
+    assets.loc[assets['asset_id'].isin(moved), 'ip_address'] = ['10.200.1.5', '10.200.2.7']
+    vulns = pd.concat([data['vulnerabilities'], rescan['vulnerabilities']], ignore_index=True)
+    store.write_delta(dict(data, assets=assets, vulnerabilities=vulns), scan_date='2024-01-02',
+                      include_remediated=include_remediated)
+
+    incremental = rollups(store)
+    segments = set(incremental['day']['segment'])
+    assert {'10.200.1.0/24', '10.200.2.0/24'} <= segments
+
+    store.rebuild_rollups()
+    rebuilt = rollups(store)
+    for grain in GRAINS:
+        pd.testing.assert_frame_equal(incremental[grain], rebuilt[grain], check_dtype=False)
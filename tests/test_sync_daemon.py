@@ -0,0 +1,38 @@
+import json
+from datetime import datetime, timedelta
+
+import sync_daemon
+from sync_daemon import RETRY_SECONDS, SYNC_RETRIES, load_config, next_retry, save_config
+
+
+def _run(status, attempt, finished_at):
+    return {'status': status, 'attempt': attempt, 'started_at': finished_at.isoformat(),
+            'finished_at': finished_at.isoformat()}
+
+
+def test_failed_sync_is_retried_with_backoff():
+    finished = datetime(2024, 1, 1, 2, 0)
+    delays = [next_retry(_run('failed', attempt, finished)) - finished for attempt in range(1, SYNC_RETRIES + 1)]
+    assert delays == [timedelta(seconds=RETRY_SECONDS * 2 ** i) for i in range(SYNC_RETRIES)]
+    assert next_retry(_run('failed', SYNC_RETRIES + 1, finished)) is None
+    assert next_retry(_run('ok', 1, finished)) is None
+    assert next_retry(None) is None
+
+
+def test_retry_is_due_before_next_turn(tmp_path):
+    config = dict(sync_daemon.DEFAULT_CONFIG, frequency='Cada 24 horas', time_of_day='02:00')
+    failed_at = datetime(2024, 1, 1, 2, 0)
+    sync_daemon._append_history(str(tmp_path), _run('failed', 1, failed_at))
+
+    due, attempt = sync_daemon._due(str(tmp_path), config, failed_at)
+    assert (due, attempt) == (failed_at + timedelta(seconds=RETRY_SECONDS), 2)
+
+    # En modo Manual no se reintenta
+    assert sync_daemon._due(str(tmp_path), dict(config, frequency='Manual'), failed_at) == (None, 1)
+
+
+def test_unknown_config_keys_are_dropped(tmp_path):
+    save_config(str(tmp_path), {'frequency': 'Cada hora', 'auto_remediate': True})
+    with open(tmp_path / 'sync' / 'config.json') as f:
+        assert 'auto_remediate' not in json.load(f)
+    assert load_config(str(tmp_path))['frequency'] == 'Cada hora'
@@ -0,0 +1,76 @@
+import time
+
+import pytest
+
+from tenable_api import TokenBucket
+from tenable_importer import TenableDataImporter
+from tenable_mock import start_mock_server
+
+
+@pytest.fixture
+def mock_server():
+    servers = []
+
+    def start(**options):
+        server = start_mock_server(**options)
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+def expected_findings(server):
+    data = TenableDataImporter().simulate_scan_data(days_back=server.days_back, num_assets=server.num_assets,
+                                                    vectorized=True, seed=server.seed)
+    return len(data['vulnerabilities'])
+
+
+def test_token_bucket_pause_blocks_everyone():
+    bucket = TokenBucket(rate=None)
+    bucket.pause(0.3)
+    started = time.monotonic()
+    assert bucket.acquire() >= 0.25
+    assert time.monotonic() - started >= 0.25
+    assert bucket.try_acquire() == 0.0
+
+
+def test_client_backs_off_on_throttling_and_errors(mock_server):
+    server = mock_server(num_assets=120, chunk_delay=0.01, rate_limit=4, fail_rate=0.2, seed=3)
+    importer = TenableDataImporter()
+    # El cliente pide más ritmo del que admite el servidor: recibirá 429 con Retry-After
+    importer.connect('mock', 'mock', server.url, requests_per_second=50)
+    importer.client.backoff = 0.05
+    importer.client.max_retries = 10
+    try:
+        data = importer.import_from_api(num_assets=50)
+    finally:
+        importer.client.close()
+
+    stats = data['scan_metadata']['api_stats']
+    assert len(data['vulnerabilities']) == expected_findings(server)
+    assert server.throttled > 0
+    assert stats['throttled_responses'] == server.throttled
+    assert stats['errors'] > stats['throttled_responses']
+    # Cada 429 trae Retry-After >= 1 s y pausa a todos los hilos
+    assert stats['throttled_s'] >= 1.0
+
+
+def test_max_findings_cancels_export(mock_server):
+    server = mock_server(num_assets=400, chunk_delay=0.5)
+    importer = TenableDataImporter()
+    importer.connect('mock', 'mock', server.url, requests_per_second=None)
+    importer.client.poll_interval = 0.1
+    started = time.monotonic()
+    try:
+        data = importer.import_from_api(num_assets=50, max_findings=10)
+    finally:
+        importer.client.close()
+
+    assert len(data['vulnerabilities']) == 10
+    # Ocho chunks a 0,5 s cada uno: sin cancelar tardaría unos 4 s
+    assert time.monotonic() - started < 2.0
+    export_uuid = data['scan_metadata']['export_uuid']
+    assert server.export_status(export_uuid)['status'] == 'CANCELLED'
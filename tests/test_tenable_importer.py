@@ -0,0 +1,43 @@
+import os
+
+import pandas as pd
+
+from tenable_importer import FindingDeduplicator, TenableDataImporter
+
+
+def scan_batches(data, size):
+    vulns = data['vulnerabilities']
+    return [vulns.iloc[start:start + size] for start in range(0, len(vulns), size)]
+
+
+def test_deduplicator_drops_repeated_keys_across_batches():
+    data = TenableDataImporter().simulate_scan_data(num_assets=20, seed=1, vectorized=True)
+    vulns = data['vulnerabilities']
+    # Escaneo solapado: las mismas claves con otra fecha y otro estado
+    repeated = vulns.head(50).assign(discovery_date='2024-02-01', remediated=True)
+    with FindingDeduplicator() as deduplicator:
+        kept = [deduplicator.filter(batch) for batch in scan_batches(data, 64) + [repeated]]
+
+    result = pd.concat(kept, ignore_index=True)
+    assert len(result) == len(vulns)
+    assert deduplicator.duplicates == len(repeated)
+    assert deduplicator.rows_seen == len(vulns) + len(repeated)
+    pd.testing.assert_frame_equal(result.astype(str), vulns.reset_index(drop=True).astype(str))
+
+
+def test_deduplicator_spills_to_disk(tmp_path):
+    data = TenableDataImporter().simulate_scan_data(num_assets=20, seed=1, vectorized=True)
+    vulns = data['vulnerabilities']
+    deduplicator = FindingDeduplicator(max_memory_hashes=100, spill_dir=str(tmp_path))
+    first = [deduplicator.filter(batch) for batch in scan_batches(data, 64)]
+    assert len(deduplicator._runs) > 1
+    assert any(name.startswith('tenable_dedup_') for name in os.listdir(tmp_path))
+
+    # Los repetidos se detectan aunque sus huellas estén en tramos volcados
+    second = [deduplicator.filter(batch) for batch in scan_batches(data, 97)]
+    deduplicator.close()
+
+    assert sum(len(batch) for batch in first) == len(vulns)
+    assert sum(len(batch) for batch in second) == 0
+    assert deduplicator.duplicates == len(vulns)
+    assert os.listdir(tmp_path) == []